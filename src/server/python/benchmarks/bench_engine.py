@@ -0,0 +1,138 @@
+# bench_engine.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the SQLite engine profiles of the 'daily_quote' project.
+
+It runs the same mixed workload, concurrent page reads and single quote
+inserts, against a database configured with SQLite's defaults (rollback
+journal, 'synchronous=FULL', no memory mapping) and against the production
+profile of the settings (WAL, 'synchronous=NORMAL', memory mapping, larger
+cache and separate read-only and read-write engines).
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.bench_engine --readers 4 --writers 2 --seconds 5
+"""
+
+import argparse
+import asyncio
+import dataclasses
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from sqlmodel import SQLModel, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from daily_quote.database import create_async_engines, create_sync_engine
+from daily_quote.quote_model import Quote
+from daily_quote.settings import Settings
+
+# The configuration the application used before engine profiles existed,
+# without SQL echo, which would only make it slower.
+BASELINE = Settings(journal_mode="DELETE", synchronous="FULL", mmap_size=0,
+                    cache_size=-2000, temp_store="DEFAULT")
+
+# The production profile, as configured by default.
+TUNED = Settings()
+
+
+def seed(settings: Settings, rows: int):
+    """
+    Create the database and fill it with generated quotes.
+
+    Args:
+        settings (Settings): The settings of the database to create.
+        rows (int): The number of quotes to insert.
+    """
+    engine = create_sync_engine(settings)
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    with sqlite3.connect(settings.database_path) as connection:
+        connection.executemany(
+            "INSERT INTO quote (author, text) VALUES (?, ?)",
+            ((f"Author {i % 1000}", f"Quote number {i}")
+             for i in range(rows)))
+    connection.close()
+
+
+async def run_workload(settings: Settings, rows: int, readers: int,
+                       writers: int, seconds: float):
+    """
+    Run concurrent readers and writers for a fixed duration.
+
+    Args:
+        settings (Settings): The settings of the engines to benchmark.
+        rows (int): The number of quotes in the database.
+        readers (int): The number of concurrent reading tasks.
+        writers (int): The number of concurrent writing tasks.
+        seconds (float): The duration of the run.
+
+    Returns:
+        dict: The number of reads and writes per second.
+    """
+    write_engine, read_engine = create_async_engines(settings)
+    counts = {"reads": 0, "writes": 0}
+    deadline = time.perf_counter() + seconds
+
+    async def read():
+        async with AsyncSession(read_engine) as session:
+            while time.perf_counter() < deadline:
+                after_id = random.randint(0, rows)
+                (await session.exec(select(Quote).where(
+                    Quote.id > after_id).order_by(Quote.id).limit(10))).all()
+                counts["reads"] += 1
+
+    async def write():
+        async with AsyncSession(write_engine) as session:
+            while time.perf_counter() < deadline:
+                # Texts must differ, as duplicate quotes are rejected.
+                session.add(Quote(author="Writer",
+                                  text=f"A new quote {random.random()}"))
+                await session.commit()
+                counts["writes"] += 1
+
+    await asyncio.gather(*[read() for _ in range(readers)],
+                         *[write() for _ in range(writers)])
+    await write_engine.dispose()
+    await read_engine.dispose()
+    return {name: count / seconds for name, count in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    for name, profile in (("baseline", BASELINE), ("tuned", TUNED)):
+        with tempfile.TemporaryDirectory() as directory:
+            settings = dataclasses.replace(
+                profile, database_path=str(Path(directory) / "bench.db"),
+                read_pool_size=max(profile.read_pool_size, args.readers))
+            seed(settings, args.rows)
+            results = asyncio.run(run_workload(
+                settings, args.rows, args.readers, args.writers,
+                args.seconds))
+        print(f"{name:>10}: {results['reads']:10.1f} reads/s "
+              f"{results['writes']:10.1f} writes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bench_listing.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the serialization of quote listings of the 'daily_quote'
+project.
+
+It reads pages of quotes at random shallow offsets, so that skipping rows
+does not hide the cost of serialization, from a seeded temporary database
+and measures the CPU time spent per page, including the SQLite work done in
+the driver thread, by the former path, which built ORM objects and
+validated each of them against the response model, and by the lean path,
+which encodes bare rows with the standard library encoder or with 'orjson'.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.bench_listing --rows 100000 --limit 100
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from daily_quote import serialization
+from daily_quote.quote_model import Quote, QuoteResponse
+from daily_quote.serialization import dump_quote_rows
+from .seed import seed_database
+
+quote_list_adapter = TypeAdapter(List[QuoteResponse])
+
+
+async def orm_page(session: AsyncSession, offset: int, limit: int) -> bytes:
+    quotes = (await session.exec(
+        select(Quote).order_by(Quote.id).offset(offset).limit(limit))).all()
+    return quote_list_adapter.dump_json(
+        [QuoteResponse.model_validate(quote) for quote in quotes])
+
+
+async def rows_page(session: AsyncSession, offset: int, limit: int) -> bytes:
+    rows = (await session.exec(
+        select(Quote.id, Quote.author, Quote.text).order_by(Quote.id)
+        .offset(offset).limit(limit))).all()
+    return dump_quote_rows(rows)
+
+
+async def measure(path: Path, rows: int, limit: int, repeat: int) -> dict:
+    """
+    Measure the CPU time per page of each serialization path.
+
+    Every path reads the same pages, after a warm-up reading them all once.
+
+    Args:
+        path (Path): The path of the database file.
+        rows (int): The number of quotes in the database.
+        limit (int): The number of quotes per page.
+        repeat (int): The number of pages read by each path.
+
+    Returns:
+        dict: The CPU time per page, in microseconds, for each path.
+    """
+    rng = random.Random(0)
+    offsets = [rng.randrange(max(1, min(rows - limit, 1000)))
+               for _ in range(repeat)]
+    paths = {"orm_and_response_model": (orm_page, None),
+             "rows_and_json": (rows_page, None)}
+    if serialization.orjson is not None:
+        paths["rows_and_orjson"] = (rows_page, serialization.orjson)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    results = {}
+    async with AsyncSession(engine) as session:
+        for offset in offsets:
+            await rows_page(session, offset, limit)
+        for name, (read_page, orjson) in paths.items():
+            serialization.orjson = orjson
+            start = time.process_time()
+            for offset in offsets:
+                await read_page(session, offset, limit)
+            results[name] = (time.process_time() - start) / repeat * 1e6
+    await engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    orjson = serialization.orjson
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.db"
+        seed_database(path, args.rows)
+        try:
+            results = asyncio.run(
+                measure(path, args.rows, args.limit, args.repeat))
+        finally:
+            serialization.orjson = orjson
+    baseline = results["orm_and_response_model"]
+    for name, microseconds in results.items():
+        print(f"{name:>24}: {microseconds:8.1f} us CPU per page "
+              f"({baseline / microseconds:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
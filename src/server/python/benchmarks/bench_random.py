@@ -0,0 +1,110 @@
+# bench_random.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the random quote sampling of the 'daily_quote' project.
+
+It seeds a temporary database, deletes a share of the quotes to leave gaps
+in the IDs, then compares the time taken to draw quotes by rejection
+sampling with the time taken by the naive 'ORDER BY RANDOM()' query.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.bench_random --rows 1000000 --n 10
+"""
+
+import argparse
+import asyncio
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from daily_quote.quote_model import Quote
+from daily_quote.sampling import sample_quotes
+
+
+def seed(path: Path, rows: int, gap_every: int):
+    """
+    Create the database and fill it with generated quotes.
+
+    Args:
+        path (Path): The path of the database file.
+        rows (int): The number of quotes to insert.
+        gap_every (int): Delete one quote out of this many to leave gaps.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO quote (author, text) VALUES (?, ?)",
+            ((f"Author {i % 1000}", f"Quote number {i}")
+             for i in range(rows)))
+        connection.execute(
+            "DELETE FROM quote WHERE id % ? = 0", (gap_every,))
+
+
+async def measure(path: Path, n: int, repeat: int):
+    """
+    Time both ways of drawing n random quotes.
+
+    Args:
+        path (Path): The path of the database file.
+        n (int): The number of quotes drawn per call.
+        repeat (int): The number of calls timed for each method.
+
+    Returns:
+        dict: The median time of a call, in milliseconds, for each method.
+    """
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    naive = select(Quote).order_by(func.random()).limit(n)
+    timings = {"rejection_sampling": [], "order_by_random": []}
+    async with AsyncSession(engine) as session:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await sample_quotes(session, n)
+            timings["rejection_sampling"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            (await session.exec(naive)).all()
+            timings["order_by_random"].append(time.perf_counter() - start)
+    await engine.dispose()
+    return {name: statistics.median(values) * 1000
+            for name, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--n", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--gap-every", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "bench.db"
+        seed(path, args.rows, args.gap_every)
+        results = asyncio.run(measure(path, args.n, args.repeat))
+    for name, milliseconds in results.items():
+        print(f"{name:>20}: {milliseconds:9.3f} ms per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# bench_snapshot.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the quote snapshot of the 'daily_quote' project.
+
+It builds the snapshot of a seeded database, then reads pages at random
+offsets, pages after random IDs, quotes of the day and random quotes, once
+through SQLite as the routes do without a snapshot and once through the
+snapshot, each in a fresh process. It reports the median latency of each
+read and the memory of each process, split between its private memory and
+the file pages it maps, which the operating system shares between workers.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.bench_snapshot --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from daily_quote.daily import pick_daily_quote
+from daily_quote.database import create_async_engines
+from daily_quote.quote_model import Quote
+from daily_quote.sampling import sample_quotes
+from daily_quote.serialization import dump_quote_rows
+from daily_quote.settings import Settings
+from daily_quote.snapshot import QuoteSnapshot, build_snapshot
+from .run import DATA_DIRECTORY
+from .seed import seed_database
+
+
+def memory() -> dict:
+    """
+    Read the resident memory of the current process.
+
+    Returns:
+        dict: The private and file-backed resident memory, in MiB.
+    """
+    fields = {}
+    for line in Path("/proc/self/status").read_text().splitlines():
+        name, _, value = line.partition(":")
+        if name in ("RssAnon", "RssFile"):
+            fields[name] = int(value.split()[0]) / 1024
+    return fields
+
+
+async def read_sqlite(database: str, rows: int, repeat: int) -> dict:
+    # The read-only engine of the application, with its pragmas.
+    _, engine = create_async_engines(Settings(database_path=database))
+    rng = random.Random(0)
+    timings = {"page": [], "after_id": [], "daily": [], "random": []}
+    async with AsyncSession(engine) as session:
+        for i in range(repeat):
+            columns = select(Quote.id, Quote.author, Quote.text)
+            start = time.perf_counter()
+            dump_quote_rows((await session.exec(columns.order_by(
+                Quote.id).offset(rng.randrange(rows)).limit(100))).all())
+            timings["page"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            dump_quote_rows((await session.exec(columns.where(
+                Quote.id > rng.randrange(rows)).order_by(Quote.id).limit(
+                    100))).all())
+            timings["after_id"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await pick_daily_quote(session, date(2000, 1, 1) + timedelta(i))
+            timings["daily"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            await sample_quotes(session, 10, rng)
+            timings["random"].append(time.perf_counter() - start)
+    await engine.dispose()
+    return timings
+
+
+def read_snapshot(path: str, rows: int, repeat: int) -> dict:
+    snapshot = QuoteSnapshot(path)
+    rng = random.Random(0)
+    timings = {"page": [], "after_id": [], "daily": [], "random": []}
+    for i in range(repeat):
+        start = time.perf_counter()
+        snapshot.page(rng.randrange(rows), 100)
+        timings["page"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        snapshot.page(0, 100, rng.randrange(rows))
+        timings["after_id"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        snapshot.daily(date(2000, 1, 1) + timedelta(i))
+        timings["daily"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        snapshot.sample(10, rng)
+        timings["random"].append(time.perf_counter() - start)
+    return timings
+
+
+def worker(mode: str, database: str, snapshot: str, rows: int, repeat: int):
+    if mode == "sqlite":
+        timings = asyncio.run(read_sqlite(database, rows, repeat))
+    else:
+        timings = read_snapshot(snapshot, rows, repeat)
+    print(json.dumps({
+        "latency_us": {name: statistics.median(values) * 1e6
+                       for name, values in timings.items()},
+        "memory_mib": memory()}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--worker", choices=["sqlite", "snapshot"],
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    database = DATA_DIRECTORY / f"quotes-{args.rows}.db"
+    snapshot = DATA_DIRECTORY / f"quotes-{args.rows}.snapshot"
+    if args.worker:
+        worker(args.worker, str(database), str(snapshot), args.rows,
+               args.repeat)
+        return
+
+    if not database.exists():
+        DATA_DIRECTORY.mkdir(exist_ok=True)
+        seed_database(database, args.rows)
+    start = time.perf_counter()
+    build_snapshot(str(database), str(snapshot))
+    print(f"Built the snapshot of {args.rows} quotes in "
+          f"{time.perf_counter() - start:.1f} s, "
+          f"{snapshot.stat().st_size / 2 ** 20:.0f} MiB")
+    for mode in ("sqlite", "snapshot"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_snapshot", "--worker",
+             mode, "--rows", str(args.rows), "--repeat", str(args.repeat)],
+            capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        latencies = "  ".join(f"{name} {value:8.1f} us" for name, value
+                              in result["latency_us"].items())
+        print(f"{mode:>8}: {latencies}  private "
+              f"{result['memory_mib']['RssAnon']:.0f} MiB, mapped "
+              f"{result['memory_mib']['RssFile']:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# bench_startup.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Benchmark of the cold start of the 'daily_quote' project.
+
+It measures, in fresh processes, the time taken to import the application,
+then the time from launching a uvicorn server to its first successful
+response, against a seeded database that is already up to date, as when
+autoscaling adds a worker. The median and the slowest of the runs are
+reported.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.bench_startup --rows 1000000 --runs 10
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List
+import httpx
+from .seed import seed_database
+
+DATA_DIRECTORY = Path(__file__).parent / ".data"
+
+# The statement timing the import of the application in a fresh process.
+IMPORT_SCRIPT = """
+import time
+start = time.perf_counter()
+import daily_quote.main
+print(time.perf_counter() - start)
+"""
+
+
+def measure_import() -> float:
+    """
+    Import the application in a new interpreter.
+
+    Returns:
+        float: The number of seconds the import took.
+    """
+    return float(subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], capture_output=True,
+        text=True, check=True).stdout)
+
+
+def measure_first_response(workers: int, timeout: float = 30.0) -> float:
+    """
+    Launch a uvicorn server and wait for its first successful response.
+
+    Args:
+        workers (int): The number of uvicorn worker processes.
+        timeout (float): The number of seconds to wait for the server.
+
+    Returns:
+        float: The number of seconds from the launch to the response.
+
+    Raises:
+        RuntimeError: If the server did not respond within the timeout.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "daily_quote.main:app",
+         "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"])
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            while time.perf_counter() - start < timeout:
+                try:
+                    if client.get("/quotes/daily").status_code == 200:
+                        return time.perf_counter() - start
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        raise RuntimeError("The server did not start")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(name: str, durations: List[float]):
+    """
+    Print the median and the slowest of a list of durations.
+
+    Args:
+        name (str): The name of the measure.
+        durations (List[float]): The durations, in seconds.
+    """
+    print(f"{name:>16}: median {statistics.median(durations) * 1000:8.1f} "
+          f"ms, max {max(durations) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--database", type=Path,
+                        help="an existing database to start against")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="the number of uvicorn workers")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    database = args.database
+    if database is None:
+        database = DATA_DIRECTORY / f"quotes-{args.rows}.db"
+        if not database.exists():
+            DATA_DIRECTORY.mkdir(exist_ok=True)
+            print(f"Seeding {database}...", file=sys.stderr)
+            seed_database(database, args.rows)
+    os.environ["DAILY_QUOTE_DATABASE_PATH"] = str(database.resolve())
+
+    # A first start brings the schema up to date and warms the file cache,
+    # so that the runs measure the start of a worker, not a migration.
+    measure_first_response(args.workers)
+    summarize("import", [measure_import() for _ in range(args.runs)])
+    summarize("first response", [measure_first_response(args.workers)
+                                 for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
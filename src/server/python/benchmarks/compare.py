@@ -0,0 +1,65 @@
+# compare.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Comparison of two result files written by 'benchmarks.run'.
+
+It prints, for every scenario found in both files, the throughput and the
+99th percentile latency of each run and their ratio, flagging the scenarios
+slower than a tolerance.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.compare before.json after.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="the fraction of throughput a scenario may "
+                        "lose before it is flagged as a regression")
+    args = parser.parse_args()
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+
+    print(f"{'scenario':>18}  {'req/s before':>12}  {'req/s after':>11}  "
+          f"{'ratio':>6}  {'p99 before':>10}  {'p99 after':>9}")
+    regressions = 0
+    for name, old in before["results"].items():
+        new = after["results"].get(name)
+        if new is None:
+            continue
+        ratio = new["requests_per_second"] / old["requests_per_second"]
+        flag = ""
+        if ratio < 1 - args.tolerance:
+            flag = "  regression"
+            regressions += 1
+        print(f"{name:>18}  {old['requests_per_second']:12.1f}  "
+              f"{new['requests_per_second']:11.1f}  {ratio:6.2f}  "
+              f"{old['p99_ms']:10.2f}  {new['p99_ms']:9.2f}{flag}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
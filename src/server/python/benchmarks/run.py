@@ -0,0 +1,359 @@
+# run.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Load benchmark of the quotes API of the 'daily_quote' project.
+
+It seeds a database of the requested size, or reuses a previously seeded
+one, and copies it so that every run starts from the same data. It then
+drives each scenario with a fixed number of concurrent clients for a fixed
+duration, either in-process through the ASGI interface or over HTTP
+against a local uvicorn server. The throughput and latency percentiles of
+every scenario are written as JSON, along with the commit they were
+measured on, so that runs can be compared with 'benchmarks.compare'.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.run --rows 1000000 --mode http --output after.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import secrets
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import httpx
+from .seed import WORDS, seed_database
+
+# The directory where seeded databases are kept between runs.
+DATA_DIRECTORY = Path(__file__).parent / ".data"
+
+# Added to the texts of the new quotes, which would otherwise be the same
+# from one run to the next, as the random number generators are seeded.
+RUN_ID = secrets.token_hex(4)
+
+# A scenario builds the method, URL and JSON body of the next request from
+# a random number generator and the number of quotes in the database.
+Scenario = Callable[[random.Random, int], Tuple[str, str, Optional[dict]]]
+
+SCENARIOS: Dict[str, Scenario] = {
+    "get_shallow": lambda rng, rows: (
+        "GET", f"/quotes/?offset={rng.randint(0, 1000)}&limit=100", None),
+    "get_deep": lambda rng, rows: (
+        "GET", f"/quotes/?offset={rng.randint(rows * 9 // 10, rows)}"
+        "&limit=100", None),
+    "get_after_id_deep": lambda rng, rows: (
+        "GET", f"/quotes/?after_id={rng.randint(rows * 9 // 10, rows)}"
+        "&limit=100", None),
+    "get_author": lambda rng, rows: (
+        "GET", f"/quotes/?author=Author%20{rng.randint(0, rows // 50)}",
+        None),
+    "daily": lambda rng, rows: ("GET", "/quotes/daily", None),
+    "random": lambda rng, rows: ("GET", "/quotes/random?n=10", None),
+    "search": lambda rng, rows: (
+        "GET", f"/quotes/search?q={rng.choice(WORDS)}", None),
+    "authors": lambda rng, rows: ("GET", "/authors/", None),
+    # Writes come last, as they change the database the reads run against.
+    "post": lambda rng, rows: (
+        "POST", "/quotes/", {"author": "Benchmark",
+                             "text": f"Quote {RUN_ID} {rng.random()}"}),
+}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Return the value below which the given fraction of values fall.
+
+    Args:
+        values (List[float]): The sorted values.
+        fraction (float): The fraction, between 0 and 1.
+
+    Returns:
+        float: The percentile, using the nearest-rank method.
+    """
+    if not values:
+        return math.nan
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+async def drive(client: httpx.AsyncClient, scenario: Scenario, rows: int,
+                concurrency: int, duration: float) -> dict:
+    """
+    Send requests of a scenario from concurrent clients for a duration.
+
+    Args:
+        client (httpx.AsyncClient): The client sending the requests.
+        scenario (Scenario): The scenario building the requests.
+        rows (int): The number of quotes in the database.
+        concurrency (int): The number of concurrent clients.
+        duration (float): The number of seconds to send requests for.
+
+    Returns:
+        dict: The number of requests and errors, the throughput, the
+        goodput, which only counts successful requests, and the latency
+        percentiles in milliseconds.
+    """
+    latencies: List[float] = []
+    errors = 0
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def worker(index: int):
+        nonlocal errors
+        rng = random.Random(index)
+        while time.perf_counter() < deadline:
+            method, url, body = scenario(rng, rows)
+            sent = time.perf_counter()
+            retry_after = None
+            try:
+                response = await client.request(method, url, json=body)
+                if response.status_code >= 400:
+                    errors += 1
+                    retry_after = response.headers.get("retry-after")
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - sent)
+            if retry_after is not None:
+                # Back off as asked, as well-behaved clients do, rather than
+                # retrying at once in a loop.
+                await asyncio.sleep(float(retry_after))
+
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "goodput_per_second": (len(latencies) - errors) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def run_scenarios(client: httpx.AsyncClient, names: List[str],
+                        rows: int, concurrency: int,
+                        duration: float) -> Dict[str, dict]:
+    """
+    Drive every selected scenario in turn with the same client.
+
+    Args:
+        client (httpx.AsyncClient): The client sending the requests.
+        names (List[str]): The names of the scenarios to run.
+        rows (int): The number of quotes in the database.
+        concurrency (int): The number of concurrent clients.
+        duration (float): The number of seconds each scenario runs for.
+
+    Returns:
+        Dict[str, dict]: The results of each scenario.
+    """
+    results = {}
+    for name in names:
+        results[name] = await drive(
+            client, SCENARIOS[name], rows, concurrency, duration)
+        print(f"{name:>18}: {results[name]['requests_per_second']:9.1f} "
+              f"req/s  p50 {results[name]['p50_ms']:7.2f} ms  "
+              f"p99 {results[name]['p99_ms']:7.2f} ms", file=sys.stderr)
+    return results
+
+
+async def run_in_process(names: List[str], rows: int, concurrency: int,
+                         duration: float) -> Dict[str, dict]:
+    """
+    Run the scenarios against the application through its ASGI interface.
+
+    The application is imported here, as it reads its settings from the
+    environment when it is imported.
+
+    Args:
+        names (List[str]): The names of the scenarios to run.
+        rows (int): The number of quotes in the database.
+        concurrency (int): The number of concurrent clients.
+        duration (float): The number of seconds each scenario runs for.
+
+    Returns:
+        Dict[str, dict]: The results of each scenario.
+    """
+    from daily_quote.main import app
+    from daily_quote.settings import settings
+    if settings.database_path != os.environ["DAILY_QUOTE_DATABASE_PATH"]:
+        raise RuntimeError("The application was imported before its "
+                           "database was chosen")
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+                transport=transport, base_url="http://benchmark") as client:
+            return await run_scenarios(
+                client, names, rows, concurrency, duration)
+
+
+async def run_over_http(names: List[str], rows: int, concurrency: int,
+                        duration: float, workers: int) -> Dict[str, dict]:
+    """
+    Run the scenarios against a local uvicorn server.
+
+    Args:
+        names (List[str]): The names of the scenarios to run.
+        rows (int): The number of quotes in the database.
+        concurrency (int): The number of concurrent clients.
+        duration (float): The number of seconds each scenario runs for.
+        workers (int): The number of uvicorn worker processes.
+
+    Returns:
+        Dict[str, dict]: The results of each scenario.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "daily_quote.main:app",
+         "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"])
+    limits = httpx.Limits(max_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}",
+                                     limits=limits) as client:
+            for _ in range(300):
+                try:
+                    await client.get("/quotes/daily")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("The server did not start")
+            return await run_scenarios(
+                client, names, rows, concurrency, duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def copy_database(source: Path, path: Path) -> int:
+    """
+    Copy a database for a run.
+
+    Every run starts from the same data, as the writes of a run only change
+    the copy.
+
+    Args:
+        source (Path): The database to copy.
+        path (Path): The path of the copy.
+
+    Returns:
+        int: The number of quotes in the database.
+    """
+    with sqlite3.connect(source) as connection, \
+            sqlite3.connect(path) as copy:
+        connection.backup(copy)
+        rows = copy.execute("SELECT count(*) FROM quote").fetchone()[0]
+    connection.close()
+    copy.close()
+    return rows
+
+
+def git_commit() -> Optional[str]:
+    """
+    Return the commit the benchmark runs on.
+
+    Returns:
+        Optional[str]: The commit hash, or None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10_000,
+                        help="the size of the database to seed, e.g. "
+                        "10000, 1000000 or 10000000")
+    parser.add_argument("--database", type=Path,
+                        help="an existing database to run against a copy "
+                        "of, instead of a seeded one")
+    parser.add_argument("--mode", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="the number of uvicorn workers in http mode")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--scenario", action="append",
+                        choices=list(SCENARIOS), dest="scenarios",
+                        help="a scenario to run, all of them by default")
+    parser.add_argument("--output", type=Path,
+                        help="the file to write the JSON results to, "
+                        "instead of the standard output")
+    args = parser.parse_args()
+
+    # Keep the scenario order, which runs the writes last.
+    names = [name for name in SCENARIOS
+             if not args.scenarios or name in args.scenarios]
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The application reads its settings from the environment the first
+        # time they are imported, which seeding does, so they are set first.
+        path = Path(directory) / "benchmark.db"
+        os.environ["DAILY_QUOTE_DATABASE_PATH"] = str(path)
+        os.environ["DAILY_QUOTE_SNAPSHOT_PATH"] = str(
+            path.with_suffix(".snapshot"))
+        database = args.database
+        if database is None:
+            database = DATA_DIRECTORY / f"quotes-{args.rows}.db"
+            if not database.exists():
+                DATA_DIRECTORY.mkdir(exist_ok=True)
+                print(f"Seeding {database}...", file=sys.stderr)
+                seed_database(database, args.rows)
+        rows = copy_database(database, path)
+        if args.mode == "asgi":
+            results = asyncio.run(run_in_process(
+                names, rows, args.concurrency, args.duration))
+        else:
+            results = asyncio.run(run_over_http(
+                names, rows, args.concurrency, args.duration, args.workers))
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "mode": args.mode,
+        "workers": args.workers if args.mode == "http" else None,
+        "rows": rows,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
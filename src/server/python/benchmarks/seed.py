@@ -0,0 +1,139 @@
+# seed.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Fast generator of quote databases for the benchmarks of the 'daily_quote'
+project.
+
+Quotes are generated deterministically and inserted with raw executemany
+statements while the triggers are dropped, along with their content hashes,
+as the application would store them. The search index, the author table and
+the table statistics are then rebuilt in one pass each, which is far faster
+than maintaining them row by row.
+
+Run it from the 'src/server/python' directory:
+
+    python -m benchmarks.seed --rows 1000000 benchmarks/.data/1m.db
+"""
+
+import argparse
+import itertools
+import random
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterator, Tuple
+from sqlmodel import SQLModel
+from daily_quote.quote_model import content_hash
+from daily_quote.schema import AUTHOR_DDL, QUOTE_STATS_DDL, SEARCH_DDL
+
+WORDS = ("life love time world people dream light heart truth hope mind "
+         "courage change future moment journey wisdom peace fear freedom "
+         "happiness success nothing everything always never today").split()
+
+# The number of rows inserted per executemany call.
+BATCH_SIZE = 50_000
+
+# The number of distinct texts generated, then reused across quotes.
+TEXT_POOL_SIZE = 1 << 16
+
+
+def generate_quotes(rows: int, seed: int = 0) -> Iterator[Tuple[str, str]]:
+    """
+    Generate deterministic quotes.
+
+    Args:
+        rows (int): The number of quotes to generate.
+        seed (int): The seed of the random number generator.
+
+    Yields:
+        Tuple[str, str]: The author and the text of each quote.
+    """
+    rng = random.Random(seed)
+    texts = [" ".join(rng.choices(WORDS, k=rng.randint(6, 24))).capitalize()
+             + "." for _ in range(min(rows, TEXT_POOL_SIZE))]
+    authors = max(1, rows // 50)
+    # Multiplying by large primes spreads consecutive quotes across the
+    # pools, without drawing a random number per quote.
+    for i in range(rows):
+        yield (f"Author {i * 7919 % authors}",
+               texts[i * 104729 % len(texts)])
+
+
+def seed_database(path: Path, rows: int, seed: int = 0) -> float:
+    """
+    Create a database at the given path and fill it with generated quotes.
+
+    Args:
+        path (Path): The path of the database file, which must not exist.
+        rows (int): The number of quotes to insert.
+        seed (int): The seed of the random number generator.
+
+    Returns:
+        float: The number of seconds taken.
+    """
+    # Imported here, as importing the settings reads the environment, which
+    # the benchmarks only set once their arguments are parsed.
+    from daily_quote.database import create_sync_engine
+    from daily_quote.settings import Settings
+    start = time.perf_counter()
+    engine = create_sync_engine(Settings(database_path=str(path)))
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    connection = sqlite3.connect(path, isolation_level=None)
+    connection.execute("PRAGMA synchronous = OFF")
+    triggers = [name for name, in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+    connection.execute("BEGIN")
+    for name in triggers:
+        connection.execute(f"DROP TRIGGER {name}")
+    quotes = generate_quotes(rows, seed)
+    while True:
+        batch = list(itertools.islice(quotes, BATCH_SIZE))
+        if not batch:
+            break
+        connection.executemany(
+            "INSERT INTO quote (author, text, content_hash) VALUES (?, ?, ?)",
+            [(author, text, content_hash(author, text))
+             for author, text in batch])
+    connection.execute("INSERT INTO quote_fts (quote_fts) VALUES "
+                       "('rebuild')")
+    connection.execute("DELETE FROM author")
+    for statement in QUOTE_STATS_DDL + SEARCH_DDL + AUTHOR_DDL:
+        connection.execute(statement)
+    connection.execute("UPDATE quote_stats SET version = version + 1, "
+                       "quote_count = (SELECT count(*) FROM quote)")
+    connection.execute("COMMIT")
+    connection.execute("ANALYZE")
+    connection.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("database", type=Path)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.database.exists():
+        parser.error(f"{args.database} already exists")
+    args.database.parent.mkdir(parents=True, exist_ok=True)
+    seconds = seed_database(args.database, args.rows, args.seed)
+    print(f"Seeded {args.rows} quotes in {seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
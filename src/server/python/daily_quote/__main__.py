@@ -0,0 +1,113 @@
+# __main__.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module is the command line interface of the 'daily_quote' project.
+
+It imports and exports the quote database as CSV or JSON Lines files:
+
+    python -m daily_quote import quotes.csv [--database database.db]
+    python -m daily_quote export backup.jsonl [--database database.db]
+
+The format is taken from the extension of the file, or from '--format',
+which is required to read from the standard input or write to the standard
+output with '-'. Progress is reported on the standard error.
+"""
+
+import argparse
+import io
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from .settings import settings
+from .transfer import (
+    FORMATS, Progress, export_quotes, import_quotes, read_csv, read_jsonl)
+
+
+def _format(parser: argparse.ArgumentParser, args: argparse.Namespace) -> str:
+    if args.format is not None:
+        return args.format
+    extension = Path(args.file).suffix.lstrip(".").lower()
+    extension = {"ndjson": "jsonl"}.get(extension, extension)
+    if args.file == "-" or extension not in FORMATS:
+        parser.error(f"cannot tell the format of {args.file}, use --format")
+    return extension
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m daily_quote",
+        description="Import and export the quote database.")
+    parser.add_argument("--database", default=settings.database_path,
+                        help="the SQLite database file (default: "
+                        "%(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser(
+        "import", help="insert the quotes of a file, skipping duplicates")
+    import_parser.add_argument("file", help="the file to read, '-' for the "
+                               "standard input")
+    import_parser.add_argument(
+        "--keep-ids", action="store_true",
+        help="insert the quotes with the IDs of the file, to restore a "
+        "backup into an empty database")
+    export_parser = commands.add_parser(
+        "export", help="write every quote to a file")
+    export_parser.add_argument("file", help="the file to write, '-' for "
+                               "the standard output")
+    for command_parser in (import_parser, export_parser):
+        command_parser.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args()
+    format = _format(parser, args)
+    try:
+        if args.command == "import":
+            if format == "jsonl":
+                read = read_jsonl
+                file = sys.stdin.buffer if args.file == "-" else open(
+                    args.file, "rb")
+            elif args.file == "-":
+                read = read_csv
+                file = io.TextIOWrapper(
+                    sys.stdin.buffer, encoding="utf-8", newline="")
+            else:
+                read = read_csv
+                file = open(args.file, encoding="utf-8", newline="")
+            progress = Progress("Read")
+            with file:
+                imported, duplicates = import_quotes(
+                    args.database, read(file, args.keep_ids), progress)
+            progress.finish(f", {imported} new, {duplicates} duplicates "
+                            f"skipped")
+        else:
+            progress = Progress("Exported")
+            if args.file == "-":
+                export_quotes(args.database, sys.stdout.buffer, format,
+                              progress)
+            else:
+                with open(args.file, "wb") as file:
+                    export_quotes(args.database, file, format, progress)
+            progress.finish()
+    except BrokenPipeError:
+        # The standard output was closed early, as by 'head'. It is replaced
+        # so that flushing it on exit does not fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except (OSError, ValueError, sqlite3.Error) as error:
+        sys.exit(f"error: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# admission.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module implements the admission control of the 'daily_quote' project.
+
+Past a point, more concurrent requests only make every request slower: they
+queue for the database connections, and each one waits longer than a client
+is willing to. Requests are therefore admitted up to a concurrency limit,
+with separate budgets for reads and writes, so that a burst of writes, which
+SQLite runs one at a time, cannot starve the reads, and the other way round.
+Requests over the limit wait in a bounded queue, in arrival order, for at
+most a set time. Requests finding the queue full, or still queued at the end
+of their wait, are rejected at once with '503 Service Unavailable' and a
+'Retry-After' header, which costs far less than serving them late.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, FrozenSet
+from fastapi.responses import JSONResponse
+from .metrics import CallbackMetric, Counter, Histogram, registry
+from .settings import settings
+
+# The paths never limited: scraping the metrics must work under overload,
+# and streams hold their connection open without using the database.
+EXEMPT_PATHS = frozenset(("/metrics", "/quotes/stream"))
+
+# The methods of the requests limited by the read budget.
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+admission_rejections = registry.register(Counter(
+    "admission_rejections_total",
+    "Number of requests rejected by admission control.",
+    ("budget", "reason")))
+admission_wait = registry.register(Histogram(
+    "admission_wait_seconds",
+    "Time spent by admitted requests waiting for their budget.",
+    ("budget",)))
+
+
+class Overloaded(Exception):
+    """
+    Exception raised when a request cannot be admitted.
+
+    Attributes:
+        reason (str): Why the request was rejected, 'queue_full' or
+        'timeout'.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(f"Overloaded: {reason}")
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded, first in first out, wait queue.
+
+    Attributes:
+        name (str): The name of the budget, used as the 'budget' label.
+        limit (int): The maximum number of requests admitted at once.
+        queue_size (int): The maximum number of requests waiting.
+        timeout (float): The maximum number of seconds a request waits.
+        active (int): The number of requests admitted and not released.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int,
+                 timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        """
+        int: The number of requests waiting to be admitted.
+        """
+        return len(self._waiters)
+
+    async def acquire(self):
+        """
+        Wait until the request is admitted.
+
+        Raises:
+            Overloaded: If the queue is full, or if the request was not
+            admitted within the timeout.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            raise Overloaded("queue_full")
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except BaseException as error:
+            if future.done() and not future.cancelled():
+                # Admitted just as the wait ended: hand the slot on.
+                self.release()
+            else:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    pass
+            if isinstance(error, asyncio.TimeoutError):
+                raise Overloaded("timeout") from None
+            raise
+        admission_wait.observe(time.perf_counter() - start, (self.name,))
+
+    def release(self):
+        """
+        Release the slot of an admitted request, admitting the next one.
+        """
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                # The slot goes to the waiter, so the count is unchanged.
+                future.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware admitting each request within the budget of its kind.
+
+    Requests with a read method use the read budget, the others the write
+    budget. A request keeps its slot until its response is fully sent.
+    """
+
+    def __init__(self, app, read: AdmissionLimiter, write: AdmissionLimiter,
+                 exempt_paths: FrozenSet[str] = EXEMPT_PATHS,
+                 retry_after: float = 1.0):
+        self.app = app
+        self.read = read
+        self.write = write
+        self.exempt_paths = exempt_paths
+        self.retry_after = str(max(1, math.ceil(retry_after)))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        limiter = self.read if scope["method"] in READ_METHODS \
+            else self.write
+        try:
+            await limiter.acquire()
+        except Overloaded as error:
+            admission_rejections.inc((limiter.name, error.reason))
+            response = JSONResponse(
+                {"detail": "The server is overloaded, retry later"},
+                status_code=503, headers={"Retry-After": self.retry_after})
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+
+# The budgets of this process, each worker process having its own.
+read_limiter = AdmissionLimiter(
+    "read", settings.admission_read_limit, settings.admission_queue_size,
+    settings.admission_timeout)
+write_limiter = AdmissionLimiter(
+    "write", settings.admission_write_limit, settings.admission_queue_size,
+    settings.admission_timeout)
+
+for _name, _documentation in (
+        ("active", "Number of requests admitted and being handled."),
+        ("queued", "Number of requests waiting to be admitted.")):
+    registry.register(CallbackMetric(
+        f"admission_{_name}", _documentation, "gauge", ("budget",),
+        lambda _name=_name: {(limiter.name,): getattr(limiter, _name)
+                             for limiter in (read_limiter, write_limiter)}))
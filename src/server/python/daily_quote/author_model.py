@@ -0,0 +1,61 @@
+# author_model.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module defines the data models for authors used in the 'daily_quote'
+project.
+
+Authors are not created by clients: the author table is a summary of the
+quote table, maintained by database triggers whenever quotes are written.
+"""
+
+from sqlalchemy import Column, String
+from sqlmodel import SQLModel, Field
+
+
+class AuthorBase(SQLModel):
+    """
+    Base model representing the common structure of an author.
+
+    Attributes:
+        name (str): The name of the author, as first written in a quote.
+        quote_count (int): The number of quotes by the author.
+    """
+    name: str
+    quote_count: int
+
+
+class Author(AuthorBase, table=True):
+    """
+    Model representing an author stored in the database.
+
+    Names are compared case-insensitively, so 'John Doe' and 'john doe' are
+    counted as the same author. The most quoted authors are listed through
+    an index on the quote count, created in the 'schema' module.
+    """
+    name: str = Field(sa_column=Column(
+        String(collation="NOCASE"), primary_key=True))
+    quote_count: int = 0
+
+
+class AuthorResponse(AuthorBase):
+    """
+    Model representing the data returned when retrieving an author.
+
+    Inherits from AuthorBase without any additional fields. Used in API
+    responses.
+    """
+    pass
@@ -0,0 +1,237 @@
+# bulk.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module provides the helpers used to ingest quotes in bulk in the
+'daily_quote' project.
+
+It includes a function receiving a request body into a temporary file
+within a deadline, incremental parsers for JSON array and NDJSON request
+bodies, which decode one item at a time so that memory stays bounded
+whatever the size of the body, and a function inserting many quotes with a
+single executemany statement, skipping the quotes already stored.
+"""
+
+import asyncio
+import codecs
+import json
+import re
+import tempfile
+from typing import IO, Any, AsyncIterator, List, Sequence
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import Quote, QuoteRequest, content_hash
+
+# The largest amount of undecoded data kept in memory while waiting for the
+# end of an item. A single quote is far smaller than this, so reaching it
+# means the body is malformed or hostile.
+MAX_ITEM_SIZE = 1024 * 1024
+
+# The number of bytes of a received body kept in memory before it is moved
+# to a file on disk.
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# The number of bytes read at a time from a received body.
+READ_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+async def spool_body(chunks: AsyncIterator[bytes],
+                     timeout: float) -> IO[bytes]:
+    """
+    Receive a request body into a temporary file.
+
+    The body is kept in memory up to SPOOL_MAX_SIZE bytes, and on disk
+    beyond, so that it can be parsed without waiting for the client.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw body of the request.
+        timeout (float): The number of seconds allowed to receive it.
+
+    Returns:
+        IO[bytes]: The temporary file, positioned at its start, which the
+        caller is responsible for closing.
+
+    Raises:
+        asyncio.TimeoutError: If the body was not received in time.
+    """
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+
+    async def receive():
+        async for chunk in chunks:
+            file.write(chunk)
+
+    try:
+        await asyncio.wait_for(receive(), timeout)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
+async def iter_file(file: IO[bytes]) -> AsyncIterator[bytes]:
+    """
+    Read a file in chunks, as a stream of byte chunks for the parsers.
+
+    Args:
+        file (IO[bytes]): The file to read, from its current position.
+
+    Yields:
+        bytes: Each chunk of at most READ_SIZE bytes.
+    """
+    while True:
+        chunk = file.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Decode the items of a JSON array from a stream of byte chunks.
+
+    Items are yielded as soon as they are complete, and only the undecoded
+    tail of the stream is kept in memory.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw body of the request.
+
+    Yields:
+        Any: Each decoded item of the array.
+
+    Raises:
+        ValueError: If the body is not a well-formed JSON array, or if a
+        single item is larger than MAX_ITEM_SIZE.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    # One of 'start', 'first', 'next', 'after' or 'done'.
+    state = "start"
+    async for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        position = 0
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                state = "first"
+                position += 1
+            elif state == "first" and char == "]":
+                state = "done"
+                position += 1
+            elif state in ("first", "next"):
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The item is not complete yet, wait for more data.
+                    break
+                state = "after"
+                yield item
+            elif state == "after":
+                if char == ",":
+                    state = "next"
+                elif char == "]":
+                    state = "done"
+                else:
+                    raise ValueError("Expected ',' or ']' after an item")
+                position += 1
+            else:
+                raise ValueError("Unexpected data after the JSON array")
+        buffer = buffer[position:]
+        if len(buffer) > MAX_ITEM_SIZE:
+            raise ValueError("Item exceeds the maximum size")
+    buffer += text_decoder.decode(b"", final=True)
+    if state != "done" or buffer.strip():
+        raise ValueError("Malformed or truncated JSON array")
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """
+    Decode newline-delimited JSON documents from a stream of byte chunks.
+
+    Blank lines are ignored. Only the current, incomplete line is kept in
+    memory between chunks.
+
+    Args:
+        chunks (AsyncIterator[bytes]): The raw body of the request.
+
+    Yields:
+        Any: Each decoded line.
+
+    Raises:
+        ValueError: If a line is not valid JSON, or if a single line is
+        larger than MAX_ITEM_SIZE.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        if len(buffer) > MAX_ITEM_SIZE:
+            raise ValueError("Line exceeds the maximum size")
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+async def insert_quotes(session: AsyncSession,
+                        quotes: Sequence[QuoteRequest]) -> List[int]:
+    """
+    Insert many quotes with a single executemany statement.
+
+    Quotes whose content hash is already stored, or which repeat an earlier
+    quote of the same call, are not inserted again: they get the ID of the
+    stored quote. The insert skips the rows conflicting on the unique index,
+    so a copy stored by another connection meanwhile does not fail the
+    whole statement, and the IDs of the skipped rows are then looked up by
+    hash. The generated IDs are read back through 'RETURNING', so no
+    per-row refresh is needed. The caller is responsible for committing the
+    transaction.
+
+    Args:
+        session (AsyncSession): The database session used to insert the quotes.
+        quotes (Sequence[QuoteRequest]): The quotes to insert.
+
+    Returns:
+        List[int]: The IDs of the quotes, in the same order.
+    """
+    if not quotes:
+        return []
+    hashes = [content_hash(quote.author, quote.text) for quote in quotes]
+    new_quotes = {}
+    for hash, quote in zip(hashes, quotes):
+        new_quotes.setdefault(hash, quote)
+    statement = insert(Quote).on_conflict_do_nothing(
+        index_elements=[Quote.content_hash]).returning(
+            Quote.content_hash, Quote.id)
+    ids = dict((await session.exec(statement, params=[
+        {**quote.model_dump(), "content_hash": hash}
+        for hash, quote in new_quotes.items()])).all())
+    skipped = set(new_quotes).difference(ids)
+    if skipped:
+        ids.update((await session.exec(
+            select(Quote.content_hash, Quote.id).where(
+                Quote.content_hash.in_(skipped)))).all())
+    return [ids[hash] for hash in hashes]
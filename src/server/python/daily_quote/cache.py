@@ -0,0 +1,204 @@
+# cache.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module provides the in-memory caches used by the 'daily_quote' project.
+
+It includes a bounded LRU cache whose entries expire after a time to live,
+and a response cache that also drops its entries when another process
+writes to the SQLite database, as reported by 'PRAGMA data_version'.
+"""
+
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """
+    Bounded cache evicting the least recently used entries first.
+
+    Entries also expire once they are older than the time to live. The
+    cache keeps counters of its hits, misses and evictions for tuning.
+
+    Attributes:
+        maxsize (int): The maximum number of entries kept in the cache.
+        ttl (float): The number of seconds an entry stays valid.
+        hits (int): The number of lookups that found a valid entry.
+        misses (int): The number of lookups that found no valid entry.
+        evictions (int): The number of entries dropped to make room.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the value cached under a key.
+
+        Args:
+            key (Hashable): The key to look up.
+
+        Returns:
+            Optional[Any]: The cached value, or None if there is no valid
+            entry for the key.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Cache a value under a key, evicting the oldest entries if full.
+
+        Args:
+            key (Hashable): The key to cache the value under.
+            value (Any): The value to cache.
+        """
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Remove every entry, keeping the counters.
+        """
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the size and the counters of the cache.
+
+        Returns:
+            Dict[str, int]: The number of entries, hits, misses and evictions.
+        """
+        return {"size": len(self._entries), "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+
+class ResponseCache(LRUCache):
+    """
+    LRU cache of serialized responses, coherent across worker processes.
+
+    Writes made by this process invalidate the cache explicitly. Writes made
+    by other processes are detected with 'PRAGMA data_version', whose value
+    changes whenever another connection commits to the database. The pragma
+    is only comparable on the same connection, so the cache keeps a
+    dedicated one open for it. It is read on the event loop, so the
+    connection never waits for a lock: when the database is busy, the
+    entries are dropped as if it had changed.
+
+    A value read from the database while the cache was cleared may predate
+    the write that cleared it, so callers read the generation before their
+    reads and pass it along with the value, which is then only cached if
+    the cache was not cleared meanwhile.
+
+    Attributes:
+        version (Optional[Any]): A version stamp of the cached data, which
+        callers may store and which is reset along with the entries.
+        generation (int): The number of times the cache was cleared.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        super().__init__(maxsize, ttl)
+        self.version: Optional[Any] = None
+        self.generation = 0
+        self._database: Optional[str] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+
+    def validate(self, database: Optional[str]):
+        """
+        Drop every entry if the database changed since the last call, or if
+        it is too busy to tell.
+
+        Args:
+            database (Optional[str]): The path of the SQLite database file,
+            or None for an in-memory database, which no other process can
+            write to.
+        """
+        if not database or database == ":memory:":
+            return
+        if database != self._database:
+            self.close()
+            self._database = database
+            self._connection = sqlite3.connect(
+                database, timeout=0, check_same_thread=False)
+        try:
+            data_version = self._connection.execute(
+                "PRAGMA data_version").fetchone()[0]
+        except sqlite3.OperationalError:
+            data_version = None
+        if data_version is None or data_version != self._data_version:
+            self.clear()
+            self._data_version = data_version
+
+    def set(self, key: Hashable, value: Any,
+            generation: Optional[int] = None):
+        """
+        Cache a value under a key, unless the cache was cleared since the
+        given generation.
+
+        Args:
+            key (Hashable): The key to cache the value under.
+            value (Any): The value to cache.
+            generation (Optional[int]): The generation read before the value
+            was, or None to cache it whatever the generation.
+        """
+        if generation is None or generation == self.generation:
+            super().set(key, value)
+
+    def clear(self):
+        """
+        Remove every entry and the version stamp, keeping the counters.
+        """
+        super().clear()
+        self.version = None
+        self.generation += 1
+
+    def close(self):
+        """
+        Remove every entry and close the dedicated connection.
+        """
+        self.clear()
+        if self._connection is not None:
+            self._connection.close()
+        self._database = self._connection = self._data_version = None
+
+
+# The cache of the serialized pages of the quote listing.
+quote_pages = ResponseCache()
+
+# The responses of the quote creations sent with an 'Idempotency-Key' header,
+# replayed when a client retries with the same key within a day.
+idempotency_keys = LRUCache(maxsize=10000, ttl=24 * 60 * 60)
+
+# The encoded quotes looked up by ID. The routes never change a stored quote,
+# so entries are only dropped when they expire, which bounds how long a
+# change made outside of the API can go unnoticed.
+quotes_by_id = LRUCache(maxsize=10000, ttl=60.0)
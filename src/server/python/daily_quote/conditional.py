@@ -0,0 +1,146 @@
+# conditional.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module implements conditional requests for the 'daily_quote' project.
+
+Responses carry an 'ETag' and a 'Last-Modified' header derived from a cheap
+version stamp of the quote table. When a client sends them back in
+'If-None-Match' or 'If-Modified-Since' and nothing changed, the route
+answers '304 Not Modified' without reading or serializing any quote.
+"""
+
+from email.utils import formatdate, parsedate_to_datetime
+from typing import NamedTuple, Optional
+from fastapi import Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import QuoteStats, id_bounds
+
+
+class TableVersion(NamedTuple):
+    """
+    Version stamp of the quote table.
+
+    Attributes:
+        max_id (int): The largest quote ID, or 0 if there is no quote.
+        version (int): The number of writes made to the quote table.
+        modified_at (int): The Unix time of the last write.
+        quote_count (int): The number of quotes.
+    """
+    max_id: int
+    version: int
+    modified_at: int
+    quote_count: int = 0
+
+
+async def read_table_version(session: AsyncSession) -> TableVersion:
+    """
+    Read the version stamp of the quote table.
+
+    This costs a single row lookup and a single primary key seek.
+
+    Args:
+        session (AsyncSession): The database session used to read the stamp.
+
+    Returns:
+        TableVersion: The current version stamp.
+    """
+    max_id = id_bounds()[1]
+    row = (await session.exec(select(
+        max_id, QuoteStats.version, QuoteStats.modified_at,
+        QuoteStats.quote_count
+    ).where(QuoteStats.id == 1))).first()
+    if row is None:
+        return TableVersion(0, 0, 0)
+    return TableVersion(row[0] or 0, row[1], row[2], row[3])
+
+
+def make_etag(*parts) -> str:
+    """
+    Build a strong entity tag from the given parts.
+
+    Args:
+        *parts: The values identifying the representation.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def is_not_modified(request: Request, etag: str,
+                    modified_at: Optional[int] = None) -> bool:
+    """
+    Tell whether the client already holds the current representation.
+
+    As required by RFC 9110, 'If-Modified-Since' is only considered when
+    the request has no 'If-None-Match' header.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The entity tag of the current representation.
+        modified_at (Optional[int]): The Unix time of the last change.
+
+    Returns:
+        bool: True if a '304 Not Modified' response should be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and modified_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return modified_at <= since
+    return False
+
+
+def set_validators(response: Response, etag: str,
+                   modified_at: Optional[int] = None) -> Response:
+    """
+    Set the 'ETag' and 'Last-Modified' headers of a response.
+
+    Args:
+        response (Response): The outgoing response.
+        etag (str): The entity tag of the representation.
+        modified_at (Optional[int]): The Unix time of the last change.
+
+    Returns:
+        Response: The same response, for chaining.
+    """
+    response.headers["ETag"] = etag
+    if modified_at is not None:
+        response.headers["Last-Modified"] = formatdate(
+            modified_at, usegmt=True)
+    return response
+
+
+def not_modified(etag: str, modified_at: Optional[int] = None) -> Response:
+    """
+    Build a '304 Not Modified' response carrying the validators.
+
+    Args:
+        etag (str): The entity tag of the representation.
+        modified_at (Optional[int]): The Unix time of the last change.
+
+    Returns:
+        Response: The empty '304 Not Modified' response.
+    """
+    return set_validators(Response(status_code=304), etag, modified_at)
@@ -18,61 +18,121 @@
 This module defines pytest fixtures for setting up a test environment in the
 'daily_quote' project.
 
-It includes fixtures for creating a session to an in-memory SQLite database
-and for creating a test client for FastAPI routes.
+It includes fixtures for creating a session to a temporary SQLite database,
+an asynchronous engine pointing at the same database, and a test client for
+FastAPI routes.
 """
 
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import SQLModel, Session, create_engine
-from sqlmodel.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .cache import idempotency_keys, quote_pages, quotes_by_id
+from .daily import daily_quotes
 from .main import app
-from .database import get_session
+from .snapshot import quote_snapshots
+from .stream import quote_broadcaster
+from .database import get_async_read_session, get_async_session
+
+
+@pytest.fixture(name="database_path")
+def database_path_fixture(tmp_path):
+    """
+    Pytest fixture to provide the path of a temporary SQLite database file.
+
+    The synchronous test session and the asynchronous engine used by the
+    routes need to see the same data, which two separate in-memory databases
+    would not, so both connect to this file instead.
+
+    Args:
+        tmp_path (Path): The pytest temporary directory for the test.
+
+    Returns:
+        Path: The path of the database file.
+    """
+    return tmp_path / "test.db"
 
 
 @pytest.fixture(name="session")
-def session_fixture():
+def session_fixture(database_path):
     """
-    Pytest fixture to provide a session for tests using an in-memory SQLite database.
+    Pytest fixture to provide a session for tests using a temporary SQLite database.
+
+    This fixture sets up the database in a temporary file, which is removed
+    along with the pytest temporary directory, so tests never write to the
+    real database file. It also ensures that the database schema is created
+    before tests are run.
 
-    This fixture sets up the database with an in-memory SQLite engine, which is
-    useful for testing purposes because it avoids writing to a real database file.
-    It also ensures that the database schema is created before tests are run.
+    Args:
+        database_path (Path): The path of the temporary database file.
 
     Yields:
         Session: A SQLModel session for interacting with the test database.
     """
     engine = create_engine(
-        "sqlite://",  # In-memory SQLite database.
+        f"sqlite:///{database_path}",
         connect_args={"check_same_thread": False},
         # For compatibility with multi-threading in FastAPI.
-        poolclass=StaticPool  # Use StaticPool to keep the database in memory.
     )
     SQLModel.metadata.create_all(engine)
     with Session(engine) as session:
         yield session
+    engine.dispose()
+
+
+@pytest.fixture(name="async_engine")
+def async_engine_fixture(database_path, session: Session):
+    """
+    Pytest fixture to provide an asynchronous engine for the test database.
+
+    The TestClient runs each request in its own event loop, so the engine
+    uses NullPool to avoid reusing a connection across event loops. It
+    depends on the 'session' fixture so the schema exists before use.
+
+    Args:
+        database_path (Path): The path of the temporary database file.
+        session (Session): The synchronous test session.
+
+    Returns:
+        AsyncEngine: An asynchronous engine connected to the test database.
+    """
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
 
 
 @pytest.fixture(name="client")
-def client_fixture(session: Session):
+def client_fixture(async_engine):
     """
     Pytest fixture to provide a test client for FastAPI routes.
 
-    This fixture overrides the default database session with a test session,
-    allowing tests to run against the in-memory database set up by the
-    'session_fixture'. It also ensures that the dependency override is cleared
-    after the tests.
+    This fixture overrides the default asynchronous database sessions, both
+    read-write and read-only, with one bound to the test engine, allowing
+    tests to run against the temporary database set up by the
+    'session_fixture'. It also ensures that the dependency override is
+    cleared after the tests.
 
     Args:
-        session (Session): The in-memory database session.
+        async_engine (AsyncEngine): The asynchronous test database engine.
 
     Yields:
         TestClient: A FastAPI test client for making requests to the API.
     """
-    def get_session_override():
-        return session
+    async def get_async_session_override():
+        async with AsyncSession(
+                async_engine, expire_on_commit=False) as session:
+            yield session
 
-    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    app.dependency_overrides[get_async_read_session] = \
+        get_async_session_override
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
+    daily_quotes.clear()
+    quote_pages.close()
+    idempotency_keys.clear()
+    quotes_by_id.clear()
+    quote_snapshots.close()
+    quote_broadcaster.close()
@@ -0,0 +1,222 @@
+# daily.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module selects the quote of the day for the 'daily_quote' project.
+
+The date is hashed to a point in the range of quote IDs, and the first quote
+at or after that point is chosen. Finding it only takes two primary key
+lookups, never a 'COUNT(*)' or an 'ORDER BY RANDOM()'. The range grows as
+quotes are added, so the first pick made for a date is stored in the
+database, and every worker process serves that one, whenever it started.
+New picks are only made for the current day, in any timezone, or for the
+days since the first stored pick, which bounds the number of stored ones.
+Picks are also kept in memory, and the pick for the current day is computed
+ahead of time at each day boundary.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import DailyPick, Quote, QuoteResponse, id_bounds
+
+logger = logging.getLogger(__name__)
+
+
+def daily_target(first_id: int, last_id: int, day: date) -> int:
+    """
+    Hash a date to a point in the range of quote IDs.
+
+    The quote of the day is the first quote whose ID is at or after it.
+
+    Args:
+        first_id (int): The smallest quote ID.
+        last_id (int): The largest quote ID.
+        day (date): The date to pick a quote for.
+
+    Returns:
+        int: The point, between both IDs included.
+    """
+    digest = hashlib.sha256(day.isoformat().encode()).digest()
+    return first_id + int.from_bytes(digest[:8], "big") % (
+        last_id - first_id + 1)
+
+
+async def pick_daily_quote(session: AsyncSession,
+                           day: date) -> Optional[QuoteResponse]:
+    """
+    Pick the quote of the day for the given date.
+
+    The pick stored for the date is returned if there is one. Otherwise a
+    quote is picked and stored, unless another process stored its own pick
+    first, in which case that one is returned. A stored pick whose quote
+    was deleted is replaced.
+
+    Dates more than a day after the current UTC date are in the future in
+    every timezone, and dates before the first stored pick were never
+    served, so no pick is made for them.
+
+    Args:
+        session (AsyncSession): The read-write database session used to find
+        and store the quote.
+        day (date): The date to pick a quote for.
+
+    Returns:
+        Optional[QuoteResponse]: The quote of the day, or None if there is no
+        quote in the database.
+
+    Raises:
+        ValueError: If the date is out of the range of the new picks.
+    """
+    picked = select(Quote).join(
+        DailyPick, DailyPick.quote_id == Quote.id).where(DailyPick.day == day)
+    quote = (await session.exec(picked)).first()
+    if quote is None:
+        today = datetime.now(timezone.utc).date()
+        if day > today + timedelta(days=1):
+            raise ValueError("The date is in the future")
+        if day < today - timedelta(days=1):
+            first_day = (await session.exec(
+                select(func.min(DailyPick.day)))).one()
+            if first_day is None or day < first_day:
+                raise ValueError("No quote was picked for this date")
+        first_id, last_id = (await session.exec(select(*id_bounds()))).one()
+        if first_id is None:
+            return None
+        target = daily_target(first_id, last_id, day)
+        quote_id = (await session.exec(
+            select(Quote.id).where(Quote.id >= target).order_by(
+                Quote.id).limit(1))).one()
+        statement = insert(DailyPick).values(day=day, quote_id=quote_id)
+        await session.exec(statement.on_conflict_do_update(
+            index_elements=[DailyPick.day], set_={"quote_id": quote_id},
+            where=~select(Quote.id).where(
+                Quote.id == DailyPick.quote_id).exists()))
+        await session.commit()
+        quote = (await session.exec(picked)).one()
+    return QuoteResponse.model_validate(quote)
+
+
+class DailyQuoteCache:
+    """
+    In-memory cache of the quotes of the day, keyed by date.
+
+    Only the most recent dates are kept, which is enough to serve every
+    timezone around the current day.
+
+    Attributes:
+        maxsize (int): The maximum number of dates kept in the cache.
+        retry_interval (float): The number of seconds to wait before
+        retrying a failed precomputation.
+    """
+
+    def __init__(self, maxsize: int = 8, retry_interval: float = 60.0):
+        self.maxsize = maxsize
+        self.retry_interval = retry_interval
+        self._quotes: "OrderedDict[date, QuoteResponse]" = OrderedDict()
+
+    async def get(self, session: AsyncSession,
+                  day: date) -> Optional[QuoteResponse]:
+        """
+        Return the quote of the day, picking it on the first call for a date.
+
+        Args:
+            session (AsyncSession): The read-write database session used on
+            a cache miss.
+            day (date): The date to get the quote for.
+
+        Returns:
+            Optional[QuoteResponse]: The quote of the day, or None if there is
+            no quote in the database.
+
+        Raises:
+            ValueError: If the date is out of the range of the new picks.
+        """
+        quote = self._quotes.get(day)
+        if quote is None:
+            quote = await pick_daily_quote(session, day)
+            if quote is not None:
+                self._store(day, quote)
+        return quote
+
+    async def precompute(self, engine: AsyncEngine, day: date):
+        """
+        Pick and cache the quote of the day ahead of the first request.
+
+        Args:
+            engine (AsyncEngine): The read-write engine used to find and
+            store the quote.
+            day (date): The date to pick a quote for.
+        """
+        async with AsyncSession(engine) as session:
+            quote = await pick_daily_quote(session, day)
+        if quote is not None:
+            self._store(day, quote)
+
+    async def run(self, engine: AsyncEngine):
+        """
+        Precompute the quote of the current UTC day, then of every next day
+        as soon as it begins.
+
+        A failed precomputation is retried after the retry interval, or when
+        the next day begins if that comes first.
+
+        This coroutine never returns, it is meant to run as a background task
+        for the lifetime of the application and to be cancelled on shutdown.
+
+        Args:
+            engine (AsyncEngine): The read-write engine used to find and
+            store the quotes.
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+            tomorrow = datetime.combine(
+                now.date() + timedelta(days=1), datetime.min.time(),
+                tzinfo=timezone.utc)
+            delay = (tomorrow - now).total_seconds()
+            try:
+                await self.precompute(engine, now.date())
+            except SQLAlchemyError:
+                # Ending the task would leave every next day to be picked
+                # by the requests, so the precomputation is retried soon.
+                logger.exception("Could not precompute the quote of the day")
+                delay = min(delay, self.retry_interval)
+            await asyncio.sleep(delay)
+
+    def clear(self):
+        """
+        Remove every cached quote.
+        """
+        self._quotes.clear()
+
+    def _store(self, day: date, quote: QuoteResponse):
+        self._quotes[day] = quote
+        self._quotes.move_to_end(day)
+        while len(self._quotes) > self.maxsize:
+            self._quotes.popitem(last=False)
+
+
+# The cache shared by the routes and the background precomputation task.
+daily_quotes = DailyQuoteCache()
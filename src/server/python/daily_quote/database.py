@@ -19,22 +19,232 @@ This module handles the creation and connection to the SQLite database
 for the 'daily_quote' project.
 
 It includes the necessary functions to create the database tables
-and manage database sessions.
+and manage database sessions. Request handlers use the asynchronous engines
+so that database calls never block the event loop, while the synchronous
+engine is kept for table creation, scripts and tests.
+
+Reads and writes go through separate engines: the read-only engine holds a
+larger pool of connections that SQLite lets read concurrently in WAL mode,
+while the read-write engine keeps a small pool, as SQLite only runs one
+write at a time. Every connection is tuned with the pragmas of the settings
+as soon as it is opened.
+
+Every engine is instrumented through SQLAlchemy events: the number and
+duration of its SQL statements, and the time requests wait for a connection
+from its pool, are recorded in the metrics of the 'metrics' module.
 """
 
+import time
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from . import metrics
+# Importing the schema also registers the triggers on the tables.
+from .schema import SCHEMA_VERSION, read_schema_version
+from .settings import Settings, settings
+
+# The statements counted under their own label, others are counted as
+# 'OTHER' to keep the number of label values bounded.
+_STATEMENTS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA",
+                         "CREATE", "DROP", "WITH"))
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Asynchronous queue pool recording how long each checkout waits.
+
+    The wait includes opening a new connection when the pool is not full.
+    The 'engine' label of the recorded durations is the logging name of the
+    pool.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_wait.observe(
+                time.perf_counter() - start, (self.logging_name,))
+
+
+def instrument_engine(engine, name: str):
+    """
+    Record the SQL statements run by an engine in the metrics.
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): The engine to instrument.
+        name (str): The name of the engine, used as the 'engine' label.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    def before_cursor_execute(connection, cursor, statement, parameters,
+                              context, executemany):
+        connection.info.setdefault("statement_start", []).append(
+            time.perf_counter())
+
+    def after_cursor_execute(connection, cursor, statement, parameters,
+                             context, executemany):
+        elapsed = time.perf_counter() - connection.info[
+            "statement_start"].pop()
+        kind = statement.split(None, 1)[0].upper() if statement else ""
+        labels = (name, kind if kind in _STATEMENTS else "OTHER")
+        metrics.statements_total.inc(labels)
+        metrics.statement_duration.observe(elapsed, labels)
+
+    def handle_error(context):
+        # A failed statement never reaches 'after_cursor_execute'.
+        starts = context.connection.info.get("statement_start") \
+            if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+    metrics.watch_pool(name, sync_engine.pool)
+
+
+def set_pragmas(dbapi_connection, settings: Settings, read_only: bool):
+    """
+    Apply the pragmas of the settings to a new SQLite connection.
+
+    The journal mode is stored in the database file, so it is only set by
+    read-write connections.
+
+    Args:
+        dbapi_connection: The raw DB-API connection that was just opened.
+        settings (Settings): The settings holding the pragma values.
+        read_only (bool): Whether the connection is read-only.
+    """
+    for name in ("journal_mode", "synchronous", "temp_store"):
+        if not getattr(settings, name).isalpha():
+            raise ValueError(f"Invalid value for the '{name}' pragma")
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.busy_timeout)}",
+        f"PRAGMA synchronous = {settings.synchronous}",
+        f"PRAGMA mmap_size = {int(settings.mmap_size)}",
+        f"PRAGMA cache_size = {int(settings.cache_size)}",
+        f"PRAGMA temp_store = {settings.temp_store}",
+    ]
+    if not read_only:
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.journal_mode}")
+    cursor = dbapi_connection.cursor()
+    for pragma in pragmas:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def create_sync_engine(settings: Settings):
+    """
+    Create the synchronous, read-write engine for the configured database.
+
+    Args:
+        settings (Settings): The settings of the database.
+
+    Returns:
+        Engine: The synchronous engine.
+    """
+    # Disable 'check_same_thread' to prevent issues with thread handling in
+    # FastAPI. Each request in FastAPI can be handled by multiple
+    # interacting threads.
+    engine = create_engine(
+        f"sqlite:///{settings.database_path}", echo=settings.echo,
+        connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", lambda connection, record: set_pragmas(
+        connection, settings, read_only=False))
+    instrument_engine(engine, "sync")
+    return engine
+
+
+def create_async_engines(settings: Settings):
+    """
+    Create the asynchronous read-write and read-only engines.
 
-# Database file and connection URL for SQLite.
-sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+    The read-only engine opens the database with SQLite's 'mode=ro' URI
+    parameter, so a bug in a read route can never write to it.
+
+    Args:
+        settings (Settings): The settings of the database and pools.
+
+    Returns:
+        Tuple[AsyncEngine, AsyncEngine]: The read-write and the read-only
+        engines.
+    """
+    path = settings.database_path
+    engines = []
+    for name, url, pool_size, max_overflow, read_only in (
+            ("write", f"sqlite+aiosqlite:///{path}",
+             settings.write_pool_size, 0, False),
+            ("read", f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true",
+             settings.read_pool_size, settings.max_overflow, True)):
+        engine = create_async_engine(
+            url, echo=settings.echo, poolclass=TimedQueuePool,
+            pool_logging_name=name, pool_size=pool_size,
+            max_overflow=max_overflow, pool_timeout=settings.pool_timeout)
+        event.listen(engine.sync_engine, "connect",
+                     lambda connection, record, read_only=read_only:
+                     set_pragmas(connection, settings, read_only))
+        instrument_engine(engine, name)
+        engines.append(engine)
+    return tuple(engines)
+
+
+def database_file(engine) -> Optional[str]:
+    """
+    Return the path of the SQLite database file an engine connects to.
+
+    Args:
+        engine (Union[Engine, AsyncEngine]): The engine to inspect.
+
+    Returns:
+        Optional[str]: The path of the database file, or None for an
+        in-memory database.
+    """
+    database = engine.url.database
+    if database and database.startswith("file:"):
+        database = database[len("file:"):]
+    if not database or database == ":memory:":
+        return None
+    return database
 
-# Disable 'check_same_thread' to prevent issues with thread handling in FastAPI.
-# Each request in FastAPI can be handled by multiple interacting threads.
-connect_args = {"check_same_thread": False}
 
 # Create the database engine, which manages connections to the SQLite database.
-# The 'echo=True' parameter logs SQL statements, useful for debugging.
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+engine = create_sync_engine(settings)
+
+# Create the asynchronous engines used by the API routes.
+async_engine, async_read_engine = create_async_engines(settings)
+
+
+def create_schema(engine) -> bool:
+    """
+    Create the tables of a database, or bring them up to date.
+
+    The version stamped in the database is read first, and nothing else is
+    done when it is current, which is the common case of a worker starting
+    against an existing database. Otherwise the tables are created, and the
+    missing columns and statements added, within an immediate transaction:
+    workers starting together against a new database take turns instead of
+    racing to create the same tables, and the ones waiting find the schema
+    current once they get their turn.
+
+    Args:
+        engine (Engine): The synchronous, read-write engine of the database.
+
+    Returns:
+        bool: Whether the schema was created or brought up to date.
+    """
+    with engine.connect() as connection:
+        if read_schema_version(connection) >= SCHEMA_VERSION:
+            return False
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        if read_schema_version(connection) >= SCHEMA_VERSION:
+            return False
+        SQLModel.metadata.create_all(connection)
+        connection.commit()
+    return True
 
 
 def create_db_and_tables():
@@ -42,9 +252,10 @@ def create_db_and_tables():
     Create the database and tables.
 
     This function initializes the database schema by creating all
-    tables defined in the SQLModel models.
+    tables defined in the SQLModel models, unless the database is already
+    up to date.
     """
-    SQLModel.metadata.create_all(engine)
+    create_schema(engine)
 
 
 def get_session():
@@ -59,3 +270,35 @@ def get_session():
     """
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    """
+    Provide an asynchronous database session.
+
+    This function yields a new asynchronous database session for use in the
+    API routes that write to the database. Awaiting its operations hands
+    control back to the event loop while SQLite works, so one slow query
+    does not stall other requests.
+
+    Yields:
+        AsyncSession: An active SQLModel asynchronous session connected to
+        the SQLite database.
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
+async def get_async_read_session():
+    """
+    Provide an asynchronous, read-only database session.
+
+    This function yields a new asynchronous database session for use in the
+    API routes that only read from the database.
+
+    Yields:
+        AsyncSession: An active SQLModel asynchronous session connected to
+        the SQLite database in read-only mode.
+    """
+    async with AsyncSession(async_read_engine) as session:
+        yield session
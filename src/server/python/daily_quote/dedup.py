@@ -0,0 +1,150 @@
+# dedup.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module implements the deduplication of quotes for the 'daily_quote'
+project.
+
+Every quote stores the hash of its normalized author and text, which a
+unique index keeps from being stored twice, so finding the copy of a quote
+costs one index lookup instead of comparing it with every stored quote.
+
+Quotes stored before the hash existed have none. They can be hashed with:
+
+    python -m daily_quote.dedup backfill [database.db] [--delete-duplicates]
+
+The database defaults to the one configured for the application.
+
+The duplicates found are listed, and deleted if asked to, keeping the
+oldest copy of each quote.
+"""
+
+import argparse
+import sqlite3
+from typing import List, Optional, Tuple
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import Quote, QuoteBase, content_hash
+from .schema import DEDUP_DDL, SEARCH_DDL, add_missing_columns
+from .settings import settings
+
+# The number of quotes hashed per transaction by the backfill.
+BACKFILL_BATCH_SIZE = 10000
+
+
+async def find_duplicate(session: AsyncSession,
+                         quote: QuoteBase) -> Optional[Quote]:
+    """
+    Find the stored copy of a quote.
+
+    Args:
+        session (AsyncSession): The database session used to search.
+        quote (QuoteBase): The quote to find a copy of.
+
+    Returns:
+        Optional[Quote]: The stored quote with the same content hash, or
+        None if there is none.
+    """
+    return (await session.exec(select(Quote).where(
+        Quote.content_hash == content_hash(quote.author, quote.text)
+    ))).first()
+
+
+def backfill_content_hashes(database: str, delete_duplicates: bool = False,
+                            batch_size: int = BACKFILL_BATCH_SIZE
+                            ) -> Tuple[int, List[int]]:
+    """
+    Hash the quotes stored without a content hash.
+
+    Quotes are hashed in ID order, one transaction per batch, so the
+    application can keep writing meanwhile. A quote whose hash is already
+    stored is a duplicate: it keeps no hash unless it is deleted.
+
+    Args:
+        database (str): The path of the SQLite database file.
+        delete_duplicates (bool): Whether to delete the duplicates found.
+        batch_size (int): The number of quotes hashed per transaction.
+
+    Returns:
+        Tuple[int, List[int]]: The number of quotes hashed and the IDs of
+        the duplicates found.
+    """
+    connection = sqlite3.connect(database)
+    with connection:
+        add_missing_columns(connection)
+        for statement in DEDUP_DDL:
+            connection.execute(statement)
+        # Databases created before the hash existed re-index every updated
+        # quote for search, which setting the hash does not require.
+        if connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                "AND name = 'quote_fts_after_update'").fetchone():
+            connection.execute("DROP TRIGGER quote_fts_after_update")
+            for statement in SEARCH_DDL:
+                if "quote_fts_after_update" in statement:
+                    connection.execute(statement)
+    hashed = 0
+    last_id = 0
+    while True:
+        with connection:
+            rows = connection.execute(
+                "SELECT id, author, text FROM quote "
+                "WHERE content_hash IS NULL AND id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            cursor = connection.executemany(
+                "UPDATE OR IGNORE quote SET content_hash = ? WHERE id = ?",
+                [(content_hash(author, text), id)
+                 for id, author, text in rows])
+            hashed += cursor.rowcount
+            last_id = rows[-1][0]
+    # Every quote up to the last one seen was hashed, unless its hash was
+    # already taken by an older copy.
+    with connection:
+        duplicates = [id for id, in connection.execute(
+            "SELECT id FROM quote WHERE content_hash IS NULL AND id <= ? "
+            "ORDER BY id", (last_id,))]
+        if delete_duplicates:
+            connection.executemany(
+                "DELETE FROM quote WHERE id = ?",
+                [(id,) for id in duplicates])
+    connection.close()
+    return hashed, duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Manage the content hashes of the quotes.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("database", nargs="?",
+                        default=settings.database_path,
+                        help="the SQLite database file (default: "
+                        "%(default)s)")
+    parser.add_argument("--delete-duplicates", action="store_true",
+                        help="delete the copies of already stored quotes")
+    args = parser.parse_args()
+    hashed, duplicates = backfill_content_hashes(
+        args.database, args.delete_duplicates)
+    print(f"Hashed {hashed} quotes, found {len(duplicates)} duplicates"
+          + (" and deleted them." if args.delete_duplicates else ":"))
+    if not args.delete_duplicates:
+        for id in duplicates:
+            print(id)
+
+
+if __name__ == "__main__":
+    main()
@@ -21,10 +21,20 @@ The application handles creating the database, managing the application lifespan
 and routing requests for managing quotes.
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .database import create_db_and_tables
-from .routers import quotes
+from .admission import AdmissionMiddleware, read_limiter, write_limiter
+from .cache import idempotency_keys, quote_pages, quotes_by_id
+from .daily import daily_quotes
+from .database import (
+    async_engine, async_read_engine, create_db_and_tables, database_file)
+from .metrics import MetricsMiddleware, watch_cache
+from .routers import authors, metrics, quotes
+from .settings import settings
+from .snapshot import quote_snapshots
+from .stream import quote_broadcaster
+from .write_queue import quote_writer
 
 
 @asynccontextmanager
@@ -33,7 +43,11 @@ async def lifespan(app: FastAPI):
     Manage the application's lifespan.
 
     This function is used to handle actions required when the application starts
-    and stops, such as creating the database tables.
+    and stops, such as creating the database tables, running the background
+    task that picks the quote of the day at each day boundary, the task
+    streaming new quotes to subscribed clients, when group commit is
+    enabled, the task committing new quotes in batches and, when snapshots
+    are enabled, the task keeping the quote snapshot up to date.
 
     Args:
         app (FastAPI): The FastAPI application instance.
@@ -42,11 +56,55 @@ async def lifespan(app: FastAPI):
         None
     """
     create_db_and_tables()
+    daily_task = asyncio.create_task(daily_quotes.run(async_engine))
+    stream_task = asyncio.create_task(
+        quote_broadcaster.run(async_read_engine))
+    writer_task = None
+    if settings.group_commit:
+        writer_task = asyncio.create_task(quote_writer.run(async_engine))
+    snapshot_task = None
+    database = database_file(async_read_engine)
+    if settings.snapshot and database is not None:
+        snapshot_task = asyncio.create_task(quote_snapshots.run(
+            database, settings.snapshot_interval))
     yield
+    if writer_task is not None:
+        # Let the writer commit the quotes already queued before exiting.
+        await quote_writer.stop()
+        await writer_task
+    daily_task.cancel()
+    stream_task.cancel()
+    quote_broadcaster.close()
+    if snapshot_task is not None:
+        snapshot_task.cancel()
+        try:
+            await snapshot_task
+        except asyncio.CancelledError:
+            pass
+        quote_snapshots.close()
 
 
 # FastAPI instance to define and serve the REST API.
 app = FastAPI(lifespan=lifespan)
 
+# Reject the requests over the concurrency limits. Added first, so that it
+# runs inside the metrics middleware, which then counts the rejections.
+if settings.admission_control:
+    app.add_middleware(
+        AdmissionMiddleware, read=read_limiter, write=write_limiter,
+        retry_after=settings.admission_timeout)
+
+# Time every request and count it per route, for the '/metrics' endpoint.
+app.add_middleware(MetricsMiddleware)
+watch_cache("quote_pages", quote_pages)
+watch_cache("idempotency_keys", idempotency_keys)
+watch_cache("quotes_by_id", quotes_by_id)
+
 # Include the quotes router to handle the '/quotes' endpoints.
 app.include_router(quotes.router)
+
+# Include the authors router to handle the '/authors' endpoints.
+app.include_router(authors.router)
+
+# Include the metrics router to handle the '/metrics' endpoint.
+app.include_router(metrics.router)
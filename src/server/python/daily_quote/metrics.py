@@ -0,0 +1,422 @@
+# metrics.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module collects the runtime metrics of the 'daily_quote' project.
+
+It provides counters, gauges and histograms rendered in the Prometheus text
+exposition format, the metrics of the application built from them, and an
+ASGI middleware timing every request per route. Recording a value is a
+dictionary lookup and an addition, cheap enough to stay enabled in
+production; the more expensive views, such as cache hit ratios, are only
+computed when the metrics are scraped.
+"""
+
+import math
+import time
+from bisect import bisect_left
+from typing import (
+    Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple)
+
+# The label values of a sample, in the order of the metric's label names.
+Labels = Tuple[str, ...]
+
+# A sample: the suffix of the metric name, its labels and its value.
+Sample = Tuple[str, Mapping[str, str], float]
+
+# The upper bounds, in seconds, of the request latency histograms.
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+
+# The upper bounds, in seconds, of the database histograms, whose values are
+# mostly well below a millisecond.
+DATABASE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                    0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", r"\\").replace(
+            "\n", r"\n").replace('"', r'\"')
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metric:
+    """
+    Base class of the metrics, rendering their samples.
+
+    Attributes:
+        name (str): The name of the metric.
+        documentation (str): The help text of the metric.
+        labelnames (Sequence[str]): The names of the labels of the metric.
+        type (str): The Prometheus type of the metric.
+    """
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterable[Sample]:
+        """
+        Return the current samples of the metric.
+
+        Returns:
+            Iterable[Sample]: The samples, one per set of label values.
+        """
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """
+        Render the metric in the Prometheus text format.
+
+        Returns:
+            List[str]: The lines describing the metric and its samples.
+        """
+        lines = [f"# HELP {self.name} {self.documentation}",
+                 f"# TYPE {self.name} {self.type}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} "
+                         f"{_format_value(value)}")
+        return lines
+
+    def _labels(self, values: Labels) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+
+class Counter(Metric):
+    """
+    Metric whose value only goes up, such as a number of requests.
+    """
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1.0):
+        """
+        Increase the value of the counter.
+
+        Args:
+            labels (Labels): The label values of the sample to increase.
+            amount (float): The amount to add.
+        """
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        """
+        Return the value of the counter.
+
+        Args:
+            labels (Labels): The label values of the sample.
+
+        Returns:
+            float: The value, 0 if it was never increased.
+        """
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in list(self._values.items()):
+            yield "", self._labels(labels), value
+
+
+class Gauge(Counter):
+    """
+    Metric whose value goes up and down, such as a number of requests in
+    flight.
+    """
+    type = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1.0):
+        """
+        Decrease the value of the gauge.
+
+        Args:
+            labels (Labels): The label values of the sample to decrease.
+            amount (float): The amount to subtract.
+        """
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def set(self, value: float, labels: Labels = ()):
+        """
+        Set the value of the gauge.
+
+        Args:
+            value (float): The new value.
+            labels (Labels): The label values of the sample to set.
+        """
+        self._values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    Metric counting observations, such as durations, in buckets.
+
+    Attributes:
+        buckets (Tuple[float, ...]): The increasing upper bounds of the
+        buckets, without the implicit '+Inf' one.
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str,
+                 labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = REQUEST_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        # Per set of label values: the count of each bucket, not cumulated,
+        # followed by the sum of the observations.
+        self._values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        """
+        Record an observation.
+
+        Args:
+            value (float): The observed value.
+            labels (Labels): The label values of the observation.
+        """
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        """
+        Return the number of observations.
+
+        Args:
+            labels (Labels): The label values of the observations.
+
+        Returns:
+            int: The number of observations.
+        """
+        counts = self._values.get(labels)
+        return sum(counts[:-1]) if counts is not None else 0
+
+    def samples(self) -> Iterable[Sample]:
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, counts in list(self._values.items()):
+            total = 0
+            for bound, count in zip(bounds, counts):
+                total += count
+                yield "_bucket", {**self._labels(labels), "le": bound}, total
+            yield "_sum", self._labels(labels), counts[-1]
+            yield "_count", self._labels(labels), total
+
+
+class CallbackMetric(Metric):
+    """
+    Metric whose samples are read from a function when scraped.
+
+    This suits values already counted elsewhere, such as the statistics of
+    a cache, which would otherwise need to be copied on every change.
+    """
+
+    def __init__(self, name: str, documentation: str, type: str,
+                 labelnames: Sequence[str],
+                 callback: Callable[[], Mapping[Labels, float]]):
+        super().__init__(name, documentation, labelnames)
+        self.type = type
+        self._callback = callback
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, value in self._callback().items():
+            yield "", self._labels(labels), value
+
+
+class Registry:
+    """
+    Collection of the metrics exposed by the application.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """
+        Add a metric to the registry.
+
+        Args:
+            metric (Metric): The metric to expose.
+
+        Returns:
+            Metric: The same metric, for chaining.
+        """
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text format.
+
+        Returns:
+            str: The exposition, ending with a newline.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# The metrics exposed by the '/metrics' route.
+registry = Registry()
+
+requests_total = registry.register(Counter(
+    "http_requests_total", "Number of HTTP requests handled.",
+    ("route", "method", "status")))
+request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests, up to the end of the response body.",
+    ("route", "method")))
+requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Number of HTTP requests being handled.",
+    ("method",)))
+statements_total = registry.register(Counter(
+    "db_statements_total", "Number of SQL statements executed.",
+    ("engine", "statement")))
+statement_duration = registry.register(Histogram(
+    "db_statement_duration_seconds", "Time spent executing SQL statements.",
+    ("engine", "statement"), DATABASE_BUCKETS))
+pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    ("engine",), DATABASE_BUCKETS))
+
+# The request methods used as labels, any other method being labelled
+# 'other', as clients can send any token as a method.
+HTTP_METHODS = frozenset((
+    "GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "CONNECT",
+    "TRACE"))
+
+# The caches and connection pools reported when the metrics are scraped.
+_caches: Dict[str, Any] = {}
+_pools: Dict[str, Any] = {}
+
+
+def watch_cache(name: str, cache: Any):
+    """
+    Expose the statistics of a cache.
+
+    Args:
+        name (str): The name of the cache, used as the 'cache' label.
+        cache (LRUCache): The cache, whose 'stats' method is called when the
+        metrics are scraped.
+    """
+    _caches[name] = cache
+
+
+def watch_pool(name: str, pool: Any):
+    """
+    Expose the number of connections of a pool.
+
+    Args:
+        name (str): The name of the engine, used as the 'engine' label.
+        pool (Pool): The connection pool of the engine.
+    """
+    _pools[name] = pool
+
+
+def _cache_stat(stat: str) -> Callable[[], Dict[Labels, float]]:
+    return lambda: {(name,): cache.stats()[stat]
+                    for name, cache in list(_caches.items())}
+
+
+def _cache_hit_ratio() -> Dict[Labels, float]:
+    ratios = {}
+    for name, cache in list(_caches.items()):
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratios[(name,)] = stats["hits"] / lookups if lookups else 0.0
+    return ratios
+
+
+def _pool_checked_out() -> Dict[Labels, float]:
+    return {(name,): pool.checkedout() for name, pool in list(_pools.items())
+            if hasattr(pool, "checkedout")}
+
+
+for _stat, _type in (("hits", "counter"), ("misses", "counter"),
+                     ("evictions", "counter"), ("size", "gauge")):
+    registry.register(CallbackMetric(
+        f"cache_{_stat}" + ("_total" if _type == "counter" else ""),
+        f"Cache {_stat}, per cache.", _type, ("cache",), _cache_stat(_stat)))
+registry.register(CallbackMetric(
+    "cache_hit_ratio", "Share of cache lookups that found a valid entry.",
+    "gauge", ("cache",), _cache_hit_ratio))
+registry.register(CallbackMetric(
+    "db_pool_connections_checked_out",
+    "Number of pool connections currently in use.", "gauge", ("engine",),
+    _pool_checked_out))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each request and counting it per route.
+
+    The route is the name of the endpoint that handled the request, such as
+    'read_quotes', which keeps the number of label values bounded whatever
+    the paths requested. Requests matching no route are labelled
+    'unmatched'. Likewise, the methods outside of the standard ones are
+    labelled 'other'.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        if method not in HTTP_METHODS:
+            method = "other"
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc((method,))
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            requests_in_flight.dec((method,))
+            # The router stores the matched route in the scope it was given.
+            route = scope.get("route")
+            name = getattr(route, "name", None) or "unmatched"
+            request_duration.observe(elapsed, (name, method))
+            requests_total.inc((name, method, str(status)))
@@ -18,11 +18,62 @@
 This module defines the data models for quotes used in the 'daily_quote' project.
 
 It includes base models for quote creation and response, as well as the main
-database model for storing quotes with an ID.
+database model for storing quotes with an ID, and the tables of statistics
+and of the quotes of the day kept alongside it.
 """
 
-from sqlmodel import SQLModel, Field
-from typing import Optional
+import hashlib
+import unicodedata
+from datetime import date
+from sqlalchemy import func
+from sqlmodel import SQLModel, Field, select
+from typing import List, Optional
+
+# The largest integer SQLite stores, and so the largest quote ID. Larger
+# values overflow when bound to a statement.
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def normalize_text(value: str) -> str:
+    """
+    Normalize text so that variants of the same quote compare equal.
+
+    The text is put in Unicode NFKC form, case folded, and its runs of
+    whitespace are collapsed into single spaces.
+
+    Args:
+        value (str): The text to normalize.
+
+    Returns:
+        str: The normalized text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", value).casefold().split())
+
+
+def content_hash(author: str, text: str) -> bytes:
+    """
+    Compute the hash identifying the content of a quote.
+
+    Two quotes get the same hash when their author and text are the same
+    once normalized. The hash is truncated to 16 bytes, which keeps the
+    unique index small while making accidental collisions negligible.
+
+    Args:
+        author (str): The author of the quote.
+        text (str): The content of the quote.
+
+    Returns:
+        bytes: The 16 byte hash.
+    """
+    content = normalize_text(author) + "\0" + normalize_text(text)
+    return hashlib.sha256(content.encode()).digest()[:16]
+
+
+def _default_content_hash(context) -> bytes:
+    # Column default computing the hash from the values being inserted, so
+    # every insert fills it, whether made through the ORM or not.
+    parameters = context.get_current_parameters()
+    return content_hash(parameters["author"], parameters["text"])
 
 
 class QuoteBase(SQLModel):
@@ -41,13 +92,77 @@ class Quote(QuoteBase, table=True):
     """
     Model representing a quote stored in the database.
 
-    Inherits from QuoteBase and adds an 'id' field as the primary key.
+    Inherits from QuoteBase and adds an 'id' field as the primary key, and
+    the hash of the content of the quote, which a unique index keeps from
+    being stored twice.
 
     Attributes:
         id (Optional[int]): The unique identifier of the quote. Automatically
         generated by the database.
+        content_hash (Optional[bytes]): The hash of the normalized author
+        and text, as computed by 'content_hash'. Automatically computed on
+        insert, and only missing for quotes inserted before it existed.
     """
     id: Optional[int] = Field(default=None, primary_key=True)
+    content_hash: Optional[bytes] = Field(
+        default=None, sa_column_kwargs={"default": _default_content_hash})
+
+
+class QuoteStats(SQLModel, table=True):
+    """
+    Model representing statistics about the quote table.
+
+    The table holds a single row, which database triggers update on every
+    write to the quote table, so that it can be read in constant time to
+    tell whether the quotes changed.
+
+    Attributes:
+        id (int): The identifier of the single row, always 1.
+        version (int): The number of writes made to the quote table.
+        quote_count (int): The number of quotes, which 'count()' would only
+        tell by scanning the whole table.
+        modified_at (int): The Unix time of the last write to the quote table.
+    """
+    __tablename__ = "quote_stats"
+
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
+    quote_count: int = 0
+    modified_at: int = 0
+
+
+class DailyPick(SQLModel, table=True):
+    """
+    Model representing the quote picked as the quote of the day for a date.
+
+    The first pick stored for a date is the one every worker process
+    serves, whenever it started and however many quotes were added since.
+
+    Attributes:
+        day (date): The date the quote was picked for.
+        quote_id (int): The ID of the quote of the day.
+    """
+    __tablename__ = "daily_pick"
+
+    day: date = Field(primary_key=True)
+    quote_id: int
+
+
+def id_bounds():
+    """
+    Build the expressions selecting the smallest and largest quote IDs.
+
+    SQLite only answers 'min()' and 'max()' with a single primary key seek
+    when each is alone in its query, so they are returned as two scalar
+    subqueries rather than as two aggregates of the same 'SELECT', which
+    would scan the whole table.
+
+    Returns:
+        tuple: The subqueries for the smallest and the largest ID, to be
+        selected together with 'select(*id_bounds())'.
+    """
+    return (select(func.min(Quote.id)).scalar_subquery(),
+            select(func.max(Quote.id)).scalar_subquery())
 
 
 class QuoteRequest(QuoteBase):
@@ -70,3 +185,33 @@ class QuoteResponse(QuoteBase):
         id (int): The unique identifier of the quote.
     """
     id: int
+
+
+class QuoteBulkResponse(SQLModel):
+    """
+    Model representing the result of a bulk quote creation.
+
+    Used in API responses of the bulk endpoint, which does not echo the
+    created quotes back to keep large responses small.
+
+    Attributes:
+        ids (List[int]): The identifiers assigned to the created quotes, in
+        the order they were submitted.
+    """
+    ids: List[int]
+
+
+class QuoteSearchResponse(QuoteResponse):
+    """
+    Model representing a quote found by a full-text search.
+
+    Inherits from QuoteResponse and adds the excerpt matching the search and
+    the relevance of the quote. Used in API responses of the search endpoint.
+
+    Attributes:
+        snippet (str): An excerpt of the quote, escaped as HTML, with the
+        matching terms wrapped in '<mark>' tags.
+        rank (float): The BM25 rank of the quote, lower is more relevant.
+    """
+    snippet: str
+    rank: float
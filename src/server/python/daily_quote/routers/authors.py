@@ -0,0 +1,64 @@
+# authors.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module defines the API routes for reading authors in the 'daily_quote'
+project.
+
+Authors are read from the author summary table, whose quote counts are
+maintained by the database on every write, so listing them never requires
+grouping the quote table.
+"""
+
+from typing import List, Literal
+from fastapi import APIRouter, Depends, Query
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..author_model import Author, AuthorResponse
+from ..database import get_async_read_session
+from ..quote_model import MAX_INTEGER
+
+# Define the router for handling author-related operations.
+router = APIRouter(prefix="/authors", tags=["authors"])
+
+
+@router.get("/", response_model=List[AuthorResponse])
+async def read_authors(
+    *, session: AsyncSession = Depends(get_async_read_session),
+    offset: int = Query(default=0, ge=0, le=MAX_INTEGER),
+    limit: int = Query(default=10, ge=0, le=100),
+    sort: Literal["count", "name"] = "count"
+):
+    """
+    Retrieve a list of authors with their number of quotes.
+
+    Args:
+        session (AsyncSession): The database session for interacting with the database.
+        offset (int): The number of items to skip in the result set.
+        limit (int): The maximum number of items to return (default is 10, maximum is 100).
+        sort (str): 'count' to list the most quoted authors first (default),
+        or 'name' to list authors alphabetically.
+
+    Returns:
+        List[AuthorResponse]: A list of authors, each with their number of quotes.
+    """
+    if sort == "count":
+        order = (Author.quote_count.desc(), Author.name)
+    else:
+        order = (Author.name,)
+    authors = (await session.exec(
+        select(Author).order_by(*order).offset(offset).limit(limit))).all()
+    return authors
@@ -0,0 +1,40 @@
+# metrics.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module defines the route exposing the runtime metrics of the
+'daily_quote' project in the Prometheus text format.
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..metrics import registry
+
+# Define the router serving the metrics to the Prometheus scraper.
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """
+    Retrieve the runtime metrics of the application.
+
+    Returns:
+        PlainTextResponse: The metrics in the Prometheus text exposition
+        format.
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4")
@@ -17,72 +17,716 @@
 """
 This module defines the API routes for handling quotes in the 'daily_quote' project.
 
-It includes a route to create a new quote using FastAPI and SQLModel, and stores the
-quote in the SQLite database.
+It includes routes to create new quotes, one at a time or in bulk, and to read
+them back using FastAPI and SQLModel, storing the quotes in the SQLite database.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, Query
-from sqlmodel import Session, select
-from ..quote_model import Quote, QuoteRequest, QuoteResponse
-from ..database import get_session
+import asyncio
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import IO, Dict, List, Literal, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import (
+    APIRouter, Depends, Header, HTTPException, Query, Request, Response)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..cache import idempotency_keys, quote_pages, quotes_by_id
+from ..conditional import (
+    TableVersion, is_not_modified, make_etag, not_modified,
+    read_table_version, set_validators)
+from ..bulk import (
+    insert_quotes, iter_file, iter_json_array, iter_ndjson, spool_body)
+from ..daily import daily_quotes
+from ..dedup import find_duplicate
+from ..sampling import sample_quotes
+from ..serialization import (
+    dump_quote, dump_quote_fields, dump_quote_rows, loads)
+from ..settings import settings
+from ..snapshot import quote_snapshots
+from ..stream import event_stream, quote_broadcaster
+from ..write_queue import quote_writer
+from ..search import build_match_query, encode_cursor, search_quotes
+from ..author_model import Author
+from ..quote_model import (
+    MAX_INTEGER, Quote, QuoteBulkResponse, QuoteRequest, QuoteResponse,
+    QuoteSearchResponse, content_hash)
+from ..database import (
+    database_file, get_async_read_session, get_async_session)
 
 # Define the router for handling quote-related operations.
 router = APIRouter(prefix="/quotes", tags=["quotes"])
 
 
+# The fields of a quote, in the order of 'QuoteResponse'.
+QUOTE_FIELDS = ("author", "text", "id")
+
+# The number of rows fetched from the database cursor, and written to the
+# response, at a time when exporting the table.
+EXPORT_BATCH_SIZE = 1000
+
+
+async def read_current_version(session: AsyncSession) -> TableVersion:
+    """
+    Read the version stamp of the quote table, from memory when possible.
+
+    The stamp only changes on writes, which clear the listing cache, so it
+    is cached along with the pages and only read from the database after a
+    write. A stamp read while another write clears the cache is not kept,
+    as it may predate that write.
+
+    Args:
+        session (AsyncSession): The database session used on a cache miss.
+
+    Returns:
+        TableVersion: The current version stamp.
+    """
+    quote_pages.validate(database_file(session.bind))
+    version = quote_pages.version
+    if version is None:
+        generation = quote_pages.generation
+        version = await read_table_version(session)
+        if quote_pages.generation == generation:
+            quote_pages.version = version
+    return version
+
+
+async def read_quote_total(session: AsyncSession, version: TableVersion,
+                           author: Optional[str]) -> int:
+    """
+    Read the number of quotes, optionally by a single author, in constant
+    time.
+
+    Both are kept up to date by database triggers: the total in the stamp
+    of the quote table, and the count of each author in the author table,
+    whose lookups are cached along with the pages.
+
+    Args:
+        session (AsyncSession): The database session used on a cache miss.
+        version (TableVersion): The current version stamp.
+        author (Optional[str]): The author to count the quotes of.
+
+    Returns:
+        int: The number of quotes.
+    """
+    if author is None:
+        return version.quote_count
+    key = ("total", author)
+    total = quote_pages.get(key)
+    if total is None:
+        generation = quote_pages.generation
+        total = (await session.exec(select(Author.quote_count).where(
+            Author.name == author))).first() or 0
+        quote_pages.set(key, total, generation)
+    return total
+
+
+async def export_rows(engine: AsyncEngine, format: str):
+    """
+    Stream every quote in the database as NDJSON or CSV.
+
+    Rows are fetched from a server-side cursor in batches and each batch is
+    encoded and yielded as a single chunk, so memory stays flat whatever the
+    size of the table. The generator uses its own session because it runs
+    after the request's dependencies have been closed.
+
+    Args:
+        engine (AsyncEngine): The engine to read the quotes from.
+        format (str): Either 'ndjson' or 'csv'.
+
+    Yields:
+        str: The encoded rows, one batch at a time.
+    """
+    if format == "csv":
+        yield "id,author,text\r\n"
+    statement = select(Quote.id, Quote.author, Quote.text).order_by(
+        Quote.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    async with AsyncSession(engine) as session:
+        result = await session.stream(statement)
+        async for rows in result.partitions():
+            if format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps({"id": id, "author": author, "text": text})
+                    + "\n" for id, author, text in rows)
+
+
+async def read_quotes_by_id(session: AsyncSession,
+                            ids: List[int]) -> Dict[int, bytes]:
+    """
+    Look up quotes by ID, from memory when possible.
+
+    Quotes are taken from the ID cache, then from the snapshot if it is up
+    to date, and the rest are read from the database with a single query
+    and added to the cache. IDs out of the range of SQLite integers match
+    no quote, and are not looked up.
+
+    Args:
+        session (AsyncSession): The database session used on cache misses.
+        ids (List[int]): The IDs of the quotes.
+
+    Returns:
+        Dict[int, bytes]: The encoded quotes found, keyed by ID.
+    """
+    found = {}
+    missing = []
+    for id in ids:
+        if not -MAX_INTEGER - 1 <= id <= MAX_INTEGER:
+            continue
+        record = quotes_by_id.get(id)
+        if record is None:
+            missing.append(id)
+        else:
+            found[id] = record
+    if not missing:
+        return found
+    version = await read_current_version(session)
+    snapshot = quote_snapshots.get(version.version)
+    if snapshot is not None:
+        for id in missing:
+            index = snapshot.find(id)
+            if index is not None:
+                found[id] = snapshot.record(index)
+        return found
+    rows = (await session.exec(select(Quote.id, Quote.author, Quote.text)
+                               .where(Quote.id.in_(missing)))).all()
+    for id, author, text in rows:
+        found[id] = dump_quote(id, author, text)
+        quotes_by_id.set(id, found[id])
+    return found
+
+
+@router.get("/export")
+async def export_quotes(
+    *, session: AsyncSession = Depends(get_async_read_session),
+    format: Literal["ndjson", "csv"] = "ndjson"
+):
+    """
+    Export every quote in the database as a single streamed response.
+
+    This endpoint is meant for jobs pulling the whole corpus: unlike the
+    paginated listing, it is not limited to 100 quotes and never builds the
+    full result in memory.
+
+    Args:
+        session (AsyncSession): The database session, whose engine is used for the export.
+        format (str): The output format, either 'ndjson' (default) or 'csv'.
+
+    Returns:
+        StreamingResponse: The quotes, streamed in ID order.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_rows(session.bind, format), media_type=media_type)
+
+
+@router.get("/daily", response_model=QuoteResponse)
+async def read_daily_quote(
+    *, session: AsyncSession = Depends(get_async_session),
+    request: Request,
+    day: Optional[date] = Query(default=None, alias="date"), tz: str = "UTC"
+):
+    """
+    Retrieve the quote of the day.
+
+    Every client gets the same quote for a given date. The quote is picked
+    once per date and stored in the database, so that every worker serves
+    the same one, then served from memory. The pick for the current UTC
+    day is made ahead of time when the day begins. The snapshot is not
+    used, even when enabled: a pick made from a snapshot built later could
+    differ from the one already served. A client sending back
+    the 'ETag' of the response gets a '304 Not Modified' response until the
+    quote changes.
+
+    Args:
+        session (AsyncSession): The read-write database session, used the first time a date is requested, to store the pick.
+        request (Request): The incoming request, checked for conditional headers.
+        day (Optional[date]): The date to get the quote for (default is today).
+        tz (str): The IANA timezone used to determine today's date (default is UTC).
+
+    Returns:
+        QuoteResponse: The quote of the day.
+
+    Raises:
+        HTTPException: 422 error if the timezone is unknown or if the date is
+        in the future or before the first quote of the day, 404 error if
+        there is no quote in the database.
+    """
+    if day is None:
+        try:
+            day = datetime.now(ZoneInfo(tz)).date()
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(
+                status_code=422, detail=f"Unknown timezone '{tz}'")
+    try:
+        quote = await daily_quotes.get(session, day)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    if quote is None:
+        raise HTTPException(status_code=404, detail="No quote available")
+    etag = make_etag("daily", day, quote.id)
+    if is_not_modified(request, etag):
+        return not_modified(etag)
+    return set_validators(
+        Response(content=quote.model_dump_json(),
+                 media_type="application/json"), etag)
+
+
+@router.get("/random", response_model=List[QuoteResponse])
+async def read_random_quotes(
+    *, session: AsyncSession = Depends(get_async_read_session),
+    n: int = Query(default=1, ge=1, le=100)
+):
+    """
+    Retrieve distinct quotes drawn uniformly at random.
+
+    Quotes are drawn by looking up random IDs through the primary key rather
+    than by sorting the table, so the cost does not grow with its size. When
+    snapshots are enabled, they are drawn from the snapshot instead.
+
+    Args:
+        session (AsyncSession): The database session for interacting with the database.
+        n (int): The number of quotes to draw (default is 1, maximum is 100).
+
+    Returns:
+        List[QuoteResponse]: The drawn quotes, fewer than n only if the database holds fewer quotes.
+    """
+    version = await read_current_version(session)
+    snapshot = quote_snapshots.get(version.version)
+    if snapshot is not None:
+        return snapshot.sample(n)
+    return await sample_quotes(session, n)
+
+
+@router.get("/stream", response_class=StreamingResponse, responses={
+    200: {"content": {"text/event-stream": {}},
+          "description": "An endless stream of 'quote' events."}})
+async def stream_quotes(
+    *, session: AsyncSession = Depends(get_async_read_session),
+    last_event_id: Optional[int] = Header(default=None)
+):
+    """
+    Stream the quotes as they are created, as server-sent events.
+
+    Each event has the 'quote' type, the ID of the quote as ID, and the
+    quote encoded as JSON as data. Clients reconnecting with the
+    'Last-Event-ID' header, as browsers do, first get the quotes created
+    since that ID. A client too slow to read the events is disconnected,
+    and is expected to reconnect the same way.
+
+    Args:
+        session (AsyncSession): The database session, whose engine is used to read the missed quotes.
+        last_event_id (Optional[int]): The ID of the last quote received before reconnecting.
+
+    Returns:
+        StreamingResponse: The endless stream of events.
+    """
+    return StreamingResponse(
+        event_stream(quote_broadcaster, session.bind, last_event_id,
+                     settings.stream_keepalive),
+        media_type="text/event-stream",
+        # Ask proxies not to buffer the events.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/search", response_model=List[QuoteSearchResponse])
+async def search(
+    *, session: AsyncSession = Depends(get_async_read_session),
+    request: Request, response: Response, q: str = Query(min_length=1),
+    prefix: bool = False, limit: int = Query(default=10, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    Search quotes by their text and author, best matches first.
+
+    Every term of the query must match. A term ending with '*', or every
+    term if 'prefix' is set, also matches words starting with it. When a
+    page is full, the response carries a 'Link' header pointing at the next
+    page, which continues after the last result through an opaque cursor.
+    Snippets are HTML: the text of the quote is escaped, and the matching
+    terms are wrapped in '<mark>' tags, so they can be inserted into a page
+    as they are.
+
+    Args:
+        session (AsyncSession): The database session for interacting with the database.
+        request (Request): The incoming request, used to build the next link.
+        response (Response): The outgoing response, used to set the 'Link' header.
+        q (str): The terms to search for.
+        prefix (bool): Whether to match every term as a prefix.
+        limit (int): The maximum number of items to return (default is 10, maximum is 100).
+        cursor (Optional[str]): The cursor taken from the previous page's next link.
+
+    Returns:
+        List[QuoteSearchResponse]: The matching quotes, with a snippet and their rank.
+
+    Raises:
+        HTTPException: 422 error if the query has no searchable term or the
+        cursor is malformed.
+    """
+    try:
+        results = await search_quotes(
+            session, build_match_query(q, prefix), limit, cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=422, detail=str(error))
+    if results and len(results) == limit:
+        next_url = request.url.include_query_params(cursor=encode_cursor(
+            results[-1].rank, results[-1].id))
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return results
+
+
 # We want to allow clients to set different offset and limit values than
 # the default ones (0 for offset and 10 for limit). But we don't want them
 # to be able to set a limit of something like 9999, that's over 9000! So,
 # to prevent it, we add additional validation to the limit query
 # parameter, declaring that it has to be less than or equal to 100 with
-# le=100.
+# le=100. Negative values are refused too: SQLite reads a negative limit as
+# no limit at all, and the snapshot would count a negative offset from the
+# end of the table.
 @router.get("/", response_model=List[QuoteResponse])
-async def read_quotes(*, session: Session = Depends(get_session),
-                      offset: int = 0, limit: int = Query(default=10, le=100)):
+async def read_quotes(
+    *, session: AsyncSession = Depends(get_async_read_session),
+    request: Request, offset: int = Query(default=0, ge=0, le=MAX_INTEGER),
+    limit: int = Query(default=10, ge=0, le=100),
+    after_id: Optional[int] = Query(default=None, le=MAX_INTEGER),
+    author: Optional[str] = None,
+    ids: Optional[str] = Query(default=None, pattern=r"^\d+(,\d+)*$"),
+    fields: Optional[str] = Query(
+        default=None, pattern=r"^(id|author|text)(,(id|author|text))*$")
+):
     """
     Retrieve a list of quotes from the database with pagination.
 
-    This endpoint fetches quotes, allowing clients to specify an offset
-    and limit for pagination. It limits the maximum number of results
-    to 100 to prevent excessive data retrieval.
+    This endpoint fetches quotes ordered by ID, allowing clients to specify
+    an offset and limit for pagination. It limits the maximum number of
+    results to 100 to prevent excessive data retrieval.
+
+    Clients walking the whole table should prefer the 'after_id' cursor over
+    'offset': it seeks directly into the primary key, so every page costs
+    the same however deep it is, whereas SQLite has to scan and discard
+    'offset' rows. When a page is full, the response carries a 'Link' header
+    pointing at the next page.
+
+    Serialized pages are kept in a read-through cache, which every write
+    invalidates, and the 'X-Cache' header tells whether it was used. When
+    snapshots are enabled and the snapshot is up to date, pages without an
+    author filter are sliced from it instead of being read from SQLite,
+    which the 'X-Cache' header reports as 'SNAPSHOT'.
+    Responses carry an 'ETag' and a 'Last-Modified' header derived from the
+    version stamp of the quote table. A client sending them back gets a
+    '304 Not Modified' response, without any quote being read, as long as
+    the table did not change.
+
+    Clients holding quote IDs can fetch up to 100 quotes at once with
+    'ids', a comma-separated list of IDs, which takes precedence over the
+    other parameters. The quotes are returned in the order of the list, and
+    the IDs matching no quote are listed in the 'X-Missing-Ids' header.
+
+    Listings carry the number of quotes matching the author filter, if any,
+    in the 'X-Total-Count' header, which is read from counters maintained by
+    the database rather than counted. Clients only needing some fields of
+    the quotes can list them in 'fields', for example 'id,author', so that
+    the others are neither read nor sent.
 
     Args:
-        session (Session): The database session for interacting with the database.
+        session (AsyncSession): The database session for interacting with the database.
+        request (Request): The incoming request, used to build the next link.
         offset (int): The number of items to skip in the result set.
         limit (int): The maximum number of items to return (default is 10, maximum is 100).
+        after_id (Optional[int]): Only return quotes with an ID greater than this one.
+        author (Optional[str]): Only return quotes by this author, ignoring case.
+        ids (Optional[str]): The comma-separated IDs of the quotes to return.
+        fields (Optional[str]): The comma-separated fields of the quotes to return (default is all).
 
     Returns:
-        List[QuoteResponse]: A list of quotes, each containing an author, text, and ID.
+        List[QuoteResponse]: A list of quotes, each containing an author, text, and ID, or the requested fields only.
+
+    Raises:
+        HTTPException: 422 error if more than 100 IDs are requested.
     """
-    quotes = session.exec(
-        select(Quote).offset(offset).limit(limit)).all()
-    return quotes
+    version = await read_current_version(session)
+    etag = make_etag("quotes", version.max_id, version.version)
+    if is_not_modified(request, etag, version.modified_at):
+        return not_modified(etag, version.modified_at)
+    columns = None
+    if fields is not None:
+        requested = fields.split(",")
+        columns = tuple(field for field in QUOTE_FIELDS if field in requested)
+        if len(columns) == len(QUOTE_FIELDS):
+            columns = None
+    if ids is not None:
+        wanted = list(dict.fromkeys(int(id) for id in ids.split(",")))
+        if len(wanted) > 100:
+            raise HTTPException(
+                status_code=422, detail="At most 100 IDs can be requested")
+        found = await read_quotes_by_id(session, wanted)
+        records = [found[id] for id in wanted if id in found]
+        if columns is None:
+            content = b"[" + b",".join(records) + b"]"
+        else:
+            content = dump_quote_fields(columns, [
+                [quote[field] for field in columns]
+                for quote in map(loads, records)])
+        response = Response(content=content, media_type="application/json")
+        missing = [str(id) for id in wanted if id not in found]
+        if missing:
+            response.headers["X-Missing-Ids"] = ",".join(missing)
+        return set_validators(response, etag, version.modified_at)
+    key = (offset, limit, after_id, author, columns)
+    page = quote_pages.get(key)
+    cache_status = "HIT"
+    snapshot = quote_snapshots.get(version.version)
+    if page is None and snapshot is not None and author is None \
+            and columns is None:
+        cache_status = "SNAPSHOT"
+        page = snapshot.page(offset, limit, after_id)
+    elif page is None:
+        cache_status = "MISS"
+        # Bare rows are encoded directly, without building ORM objects nor
+        # validating them against the response model. The ID is always
+        # read, as the next link needs it.
+        statement = select(Quote.id, *[
+            getattr(Quote, field) for field in columns or QUOTE_FIELDS[:2]
+        ]).order_by(Quote.id)
+        if after_id is not None:
+            statement = statement.where(Quote.id > after_id)
+        if author is not None:
+            # Comparing with the NOCASE collation lets SQLite use the
+            # case-insensitive author index.
+            statement = statement.where(
+                Quote.author.collate("NOCASE") == author)
+        generation = quote_pages.generation
+        rows = (await session.exec(
+            statement.offset(offset).limit(limit))).all()
+        if columns is None:
+            body = dump_quote_rows(rows)
+        else:
+            body = dump_quote_fields(columns, [row[1:] for row in rows])
+        # Only the ID of the last quote of a full page is kept, as the next
+        # link itself depends on the URL the client used.
+        last_id = rows[-1][0] if rows and len(rows) == limit else None
+        page = (body, last_id)
+        quote_pages.set(key, page, generation)
+    body, last_id = page
+    response = Response(content=body, media_type="application/json")
+    response.headers["X-Cache"] = cache_status
+    response.headers["X-Total-Count"] = str(
+        await read_quote_total(session, version, author))
+    set_validators(response, etag, version.modified_at)
+    if last_id is not None:
+        next_url = request.url.remove_query_params(
+            "offset").include_query_params(after_id=last_id, limit=limit)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+@router.get("/cache")
+async def read_cache_stats():
+    """
+    Retrieve the counters of the quote listing cache.
+
+    This endpoint is meant for tuning the size and time to live of the
+    cache from its hit, miss and eviction counts.
+
+    Returns:
+        dict: The number of entries, hits, misses and evictions.
+    """
+    return quote_pages.stats()
 
 
 @router.post("/", response_model=QuoteResponse)
 async def create_quote(
-    *, session: Session = Depends(get_session), quote: QuoteRequest
+    *, session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_async_read_session),
+    response: Response, quote: QuoteRequest,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255)
 ):
     """
     Create a new quote in the database.
 
     This endpoint receives a quote via a POST request, stores it in the
     database, and returns the newly created quote along with its generated ID.
+    When group commit is enabled, the quote is handed to the writer task,
+    which commits it along with the other quotes received meanwhile, and
+    the response is only sent once that transaction is committed.
+
+    A quote is only stored once: submitting a quote whose normalized author
+    and text are already stored returns the stored quote, found with one
+    index lookup on a read-only connection, so retries never create
+    duplicates. A client may also send an 'Idempotency-Key' header: retrying
+    with the same key within a day replays the first response, flagged with
+    an 'Idempotent-Replayed' header. Keys are remembered by each worker
+    process, the content check covering retries reaching another one. The
+    quote is added to the ID cache, as it is likely to be read back soon,
+    and a new quote is pushed to the clients streaming them.
 
     Args:
-        session (Session): The database session used to interact with the database.
+        session (AsyncSession): The database session used to interact with the database.
+        read_session (AsyncSession): The read-only database session used to look for a stored copy.
+        response (Response): The outgoing response, used to flag replays.
         quote (QuoteRequest): A request body containing the author and text of the quote.
+        idempotency_key (Optional[str]): A key chosen by the client to identify the request.
 
     Returns:
-        QuoteResponse: The newly created quote, including the author, text, and ID.
-    """
-    # Convert the incoming request model to the database model
-    quote_in_db = Quote.model_validate(quote)
-    # Add the quote to the session and commit the transaction
-    session.add(quote_in_db)
-    session.commit()
-    # Refresh the instance to get the generated ID from the database
-    session.refresh(quote_in_db)
-    # Return the created quote as a response
-    return quote_in_db
+        QuoteResponse: The created or stored quote, including the author, text, and ID.
+
+    Raises:
+        HTTPException: 422 error if the idempotency key was used for another quote.
+    """
+    fingerprint = content_hash(quote.author, quote.text)
+    if idempotency_key is not None:
+        replay = idempotency_keys.get(idempotency_key)
+        if replay is not None:
+            if replay[0] != fingerprint:
+                raise HTTPException(status_code=422, detail=(
+                    "The idempotency key was used for another quote"))
+            response.headers["Idempotent-Replayed"] = "true"
+            return replay[1]
+    existing = await find_duplicate(read_session, quote)
+    if existing is not None:
+        created = QuoteResponse.model_validate(existing)
+    else:
+        if quote_writer.running:
+            id = await quote_writer.submit(quote)
+        else:
+            # A copy stored meanwhile by another request is detected here
+            # too, and its ID is returned.
+            id = (await insert_quotes(session, [quote]))[0]
+            await session.commit()
+        quote_pages.clear()
+        quote_broadcaster.notify()
+        created = QuoteResponse(id=id, **quote.model_dump())
+    quotes_by_id.set(
+        created.id, dump_quote(created.id, created.author, created.text))
+    if idempotency_key is not None:
+        idempotency_keys.set(idempotency_key, (fingerprint, created))
+    return created
+
+
+# The bulk endpoint accepts an NDJSON body when the request declares one of
+# these content types, and a JSON array otherwise.
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl")
+
+
+async def insert_quote_file(session: AsyncSession, request: Request,
+                            body: IO[bytes],
+                            chunk_size: int) -> QuoteBulkResponse:
+    """
+    Insert and commit the quotes of a received bulk creation body.
+
+    Args:
+        session (AsyncSession): The database session inserting the quotes.
+        request (Request): The incoming request, whose content type is checked.
+        body (IO[bytes]): The received body.
+        chunk_size (int): The number of quotes inserted per statement.
+
+    Returns:
+        QuoteBulkResponse: The IDs of the quotes, in submission order.
+
+    Raises:
+        HTTPException: 422 error if the body is malformed or a quote is invalid.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+        items = iter_ndjson(iter_file(body))
+    else:
+        items = iter_json_array(iter_file(body))
+    ids = []
+    chunk = []
+    try:
+        async for item in items:
+            try:
+                chunk.append(QuoteRequest.model_validate(item))
+            except ValidationError as error:
+                raise HTTPException(status_code=422, detail={
+                    "index": len(ids) + len(chunk),
+                    "errors": error.errors(include_url=False)})
+            if len(chunk) == chunk_size:
+                ids.extend(await insert_quotes(session, chunk))
+                chunk = []
+    except ValueError as error:
+        await session.rollback()
+        raise HTTPException(status_code=422, detail=str(error))
+    except HTTPException:
+        await session.rollback()
+        raise
+    ids.extend(await insert_quotes(session, chunk))
+    await session.commit()
+    quote_pages.clear()
+    quote_broadcaster.notify()
+    return QuoteBulkResponse(ids=ids)
+
+
+@router.post("/bulk", response_model=QuoteBulkResponse)
+async def create_quotes_bulk(
+    *, session: AsyncSession = Depends(get_async_session),
+    request: Request, chunk_size: int = Query(default=1000, ge=1, le=10000)
+):
+    """
+    Create many quotes in the database in a single transaction.
+
+    This endpoint reads a JSON array or an NDJSON stream of quotes from the
+    request body. The body is first received into a temporary file, within
+    a deadline, so that the write transaction is never held open while
+    waiting for a slow client. Quotes are then decoded and validated from
+    the file and inserted with one executemany statement per chunk, so
+    memory use is bounded by the chunk size rather than by the size of the
+    body. Nothing is committed unless every quote is valid. Quotes already
+    stored, or repeated in the body, are not stored again and get the ID of
+    the stored copy.
+
+    Args:
+        session (AsyncSession): The database session used to interact with the database.
+        request (Request): The incoming request, whose body is streamed.
+        chunk_size (int): The number of quotes inserted per statement (default is 1000).
+
+    Returns:
+        QuoteBulkResponse: The IDs of the quotes, in submission order.
+
+    Raises:
+        HTTPException: 408 error if the body is not received in time, 422
+        error if the body is malformed or a quote is invalid.
+    """
+    try:
+        body = await spool_body(request.stream(), settings.bulk_body_timeout)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=408,
+                            detail="The request body was not received in time")
+    with body:
+        return await insert_quote_file(session, request, body, chunk_size)
+
+
+# This route is declared last, so that its path parameter does not capture
+# the paths of the other routes, such as '/quotes/daily'.
+@router.get("/{id}", response_model=QuoteResponse)
+async def read_quote(
+    *, session: AsyncSession = Depends(get_async_read_session), id: int
+):
+    """
+    Retrieve a quote by its ID.
+
+    Quotes are served from a bounded cache keyed by ID, which quote
+    creations fill, so a frequently requested quote is only read from the
+    database once.
+
+    Args:
+        session (AsyncSession): The database session, only used on cache misses.
+        id (int): The ID of the quote.
+
+    Returns:
+        QuoteResponse: The quote.
+
+    Raises:
+        HTTPException: 404 error if there is no quote with this ID.
+    """
+    found = await read_quotes_by_id(session, [id])
+    if id not in found:
+        raise HTTPException(status_code=404, detail="Quote not found")
+    return Response(content=found[id], media_type="application/json")
@@ -0,0 +1,105 @@
+# test_authors.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the 'authors' API endpoints in the 'daily_quote' project.
+
+This test suite uses pytest and FastAPI's TestClient to verify that the
+author summary follows the writes made to the quote table.
+"""
+
+from fastapi.testclient import TestClient
+from sqlmodel import SQLModel, Session, text
+from ..quote_model import Quote
+
+
+class TestAuthors:
+    """
+    A test class for the author-related API endpoints.
+    """
+
+    def test_get(self, client: TestClient, session: Session):
+        """
+        Test that authors are listed with their number of quotes.
+
+        This test creates quotes through the API, one at a time and in bulk,
+        with names differing only by case, and verifies the counts and both
+        sort orders.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        client.post("/quotes", json={"author": "Lewis Hamilton",
+                                     "text": "Still we rise!"})
+        client.post("/quotes/bulk", json=[
+            {"author": "John Doe", "text": "Hello World!"},
+            {"author": "john doe", "text": "Hello again!"}])
+
+        by_count = client.get("/authors")
+        by_name = client.get("/authors", params={"sort": "name"})
+
+        assert by_count.status_code == 200
+        assert by_count.json() == [
+            {"name": "John Doe", "quote_count": 2},
+            {"name": "Lewis Hamilton", "quote_count": 1}]
+        assert [author["name"] for author in by_name.json()] == \
+            ["John Doe", "Lewis Hamilton"]
+
+    def test_get_after_delete(self, client: TestClient, session: Session):
+        """
+        Test that deleting and updating quotes updates the counts.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        first = Quote(author="John Doe", text="Hello World!")
+        second = Quote(author="Lewis Hamilton", text="Still we rise!")
+        session.add_all([first, second])
+        session.commit()
+        session.delete(first)
+        second.author = "Sir Lewis Hamilton"
+        session.add(second)
+        session.commit()
+
+        response = client.get("/authors")
+
+        assert response.json() == [
+            {"name": "Sir Lewis Hamilton", "quote_count": 1}]
+
+    def test_backfill(self, client: TestClient, session: Session):
+        """
+        Test that the author table is filled from existing quotes.
+
+        This test drops the author table, as if the database predated it,
+        and verifies that creating the tables again fills it.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add_all([Quote(author="John Doe", text="Hello World!"),
+                         Quote(author="JOHN DOE", text="Hello again!")])
+        session.commit()
+        session.exec(text("DROP TABLE author"))
+        session.commit()
+
+        SQLModel.metadata.create_all(session.get_bind())
+        response = client.get("/authors")
+
+        assert len(response.json()) == 1
+        assert response.json()[0]["quote_count"] == 2
@@ -0,0 +1,76 @@
+# test_metrics.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the 'metrics' API endpoint in the 'daily_quote' project.
+
+This test suite uses pytest and FastAPI's TestClient to verify that requests
+are timed per route and exposed in the Prometheus text format.
+"""
+
+from fastapi.testclient import TestClient
+from ..metrics import request_duration, requests_in_flight
+
+
+class TestMetrics:
+    """
+    A test class for the metrics API endpoint.
+    """
+
+    def test_get(self, client: TestClient):
+        """
+        Test that requests are counted and timed under their route name.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+        """
+        count = request_duration.count(("read_quotes", "GET"))
+        client.get("/quotes")
+        client.get("/quotes")
+        client.get("/missing")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert request_duration.count(("read_quotes", "GET")) == count + 2
+        assert requests_in_flight.value(("GET",)) == 0
+        lines = response.text.splitlines()
+        # The request for the metrics was itself in flight.
+        assert 'http_requests_in_flight{method="GET"} 1' in lines
+        assert "# TYPE http_request_duration_seconds histogram" in lines
+        assert any(line.startswith(
+            'http_requests_total{route="unmatched",method="GET",'
+            'status="404"}') for line in lines)
+        assert any(line.startswith('cache_hit_ratio{cache="quote_pages"}')
+                   for line in lines)
+
+    def test_get_unknown_method(self, client: TestClient):
+        """
+        Test that requests with a non-standard method share a single label.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+        """
+        count = request_duration.count(("unmatched", "other"))
+        client.request("FROBNICATE", "/missing")
+        client.request("X-RANDOM-1234", "/quotes")
+
+        response = client.get("/metrics")
+
+        assert request_duration.count(("unmatched", "other")) == count + 2
+        assert "FROBNICATE" not in response.text
+        assert "X-RANDOM-1234" not in response.text
@@ -22,9 +22,24 @@ and verify the correctness of the quote creation and retrieval functionality
 in the API.
 """
 
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta, timezone
 from fastapi.testclient import TestClient
 from sqlmodel import Session, select
-from ..quote_model import Quote
+from ..cache import quote_pages, quotes_by_id
+from ..daily import daily_quotes
+from ..quote_model import DailyPick, Quote
+from ..snapshot import QuoteSnapshot, build_snapshot, quote_snapshots
+from . import quotes
+
+
+def utc_today() -> date:
+    """
+    Return the current UTC date, for which a quote of the day can be picked.
+    """
+    return datetime.now(timezone.utc).date()
 
 
 class TestQuotes:
@@ -95,9 +110,9 @@ class TestQuotes:
         Args:
             client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
         """
-        payload = {"author": "John Doe", "text": "The first quote"}
         n = 10
         for i in range(1, n + 1):
+            payload = {"author": "John Doe", "text": f"Quote number {i}"}
             response = client.post("/quotes", json=payload)
         assert response.json()["id"] == n
 
@@ -139,7 +154,7 @@ class TestQuotes:
         author = "John Doe"
         text = "Hello World!"
         for i in range(0, n):
-            quote = Quote(author=author, text=text)
+            quote = Quote(author=author, text=f"{text} {i}")
             session.add(quote)
         session.commit()
 
@@ -148,7 +163,7 @@ class TestQuotes:
         assert response.status_code == 200
         assert response.json()[n - 1]["id"] == n
         assert response.json()[n - 1]["author"] == author
-        assert response.json()[n - 1]["text"] == text
+        assert response.json()[n - 1]["text"] == f"{text} {n - 1}"
 
     def test_get_offset(self, client: TestClient, session: Session):
         """
@@ -198,3 +213,855 @@ class TestQuotes:
         response = client.get("/quotes", params=params)
 
         assert len(response.json()) == limit
+
+    def test_get_after_id(self, client: TestClient, session: Session):
+        """
+        Test that the /quotes GET endpoint respects the 'after_id' cursor.
+
+        This test adds multiple quotes to the database and verifies that
+        only quotes with a greater ID are returned, in ID order.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        n = 5
+        for i in range(0, n):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+
+        params = {"after_id": 2}
+
+        response = client.get("/quotes", params=params)
+
+        assert response.status_code == 200
+        assert [quote["id"] for quote in response.json()] == [3, 4, 5]
+
+    def test_get_next_link(self, client: TestClient, session: Session):
+        """
+        Test that a full page links to the next one through the 'Link' header.
+
+        This test follows the 'Link' headers from the first page until the
+        last one and verifies that every quote is seen exactly once, and that
+        the last, partial page has no next link.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        n = 5
+        for i in range(0, n):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+
+        ids = []
+        response = client.get("/quotes", params={"limit": 2})
+        while True:
+            ids.extend(quote["id"] for quote in response.json())
+            if "next" not in response.links:
+                break
+            response = client.get(response.links["next"]["url"])
+
+        assert ids == [1, 2, 3, 4, 5]
+
+    def test_post_bulk(self, client: TestClient, session: Session):
+        """
+        Test creating quotes from a JSON array via the /quotes/bulk endpoint.
+
+        This test verifies that every quote is stored and that the returned
+        IDs follow the order of the submitted quotes.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        n = 25
+        payload = [{"author": "John Doe", "text": f"Quote {i}"}
+                   for i in range(0, n)]
+
+        response = client.post(
+            "/quotes/bulk", json=payload, params={"chunk_size": 10})
+
+        assert response.status_code == 200
+        assert response.json()["ids"] == list(range(1, n + 1))
+        quotes = session.exec(select(Quote).order_by(Quote.id)).all()
+        assert [quote.text for quote in quotes] == \
+            [item["text"] for item in payload]
+
+    def test_post_duplicate(self, client: TestClient, session: Session):
+        """
+        Test that posting a stored quote again returns the stored quote.
+
+        The copies differ in case and whitespace only, which the content hash
+        ignores, whether posted one at a time or in bulk.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        first = client.post("/quotes", json={"author": "John Doe",
+                                             "text": "Hello World!"})
+        second = client.post("/quotes", json={"author": "john doe",
+                                              "text": " Hello  world! "})
+        bulk = client.post("/quotes/bulk", json=[
+            {"author": "Lewis Hamilton", "text": "Still we rise!"},
+            {"author": "JOHN DOE", "text": "hello world!"},
+            {"author": "Lewis Hamilton", "text": "Still we rise!"}],
+            params={"chunk_size": 2})
+
+        assert second.json() == first.json()
+        assert bulk.json()["ids"] == [2, 1, 2]
+        assert len(session.exec(select(Quote)).all()) == 2
+
+    def test_post_idempotency_key(self, client: TestClient, session: Session):
+        """
+        Test that retrying with the same 'Idempotency-Key' replays the first
+        response, and that reusing it for another quote is rejected.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        payload = {"author": "John Doe", "text": "Hello World!"}
+        headers = {"Idempotency-Key": "3f6c1a"}
+
+        first = client.post("/quotes", json=payload, headers=headers)
+        retry = client.post("/quotes", json=payload, headers=headers)
+        reused = client.post("/quotes", headers=headers, json={
+            "author": "John Doe", "text": "Another quote"})
+
+        assert "idempotent-replayed" not in first.headers
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert retry.json() == first.json()
+        assert reused.status_code == 422
+        assert len(session.exec(select(Quote)).all()) == 1
+
+    def test_post_bulk_ndjson(self, client: TestClient, session: Session):
+        """
+        Test creating quotes from an NDJSON body via the /quotes/bulk endpoint.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        content = (b'{"author": "John Doe", "text": "Hello World!"}\n'
+                   b'\n'
+                   b'{"author": "Lewis Hamilton", "text": "Still we rise!"}')
+
+        response = client.post(
+            "/quotes/bulk", content=content,
+            headers={"content-type": "application/x-ndjson"})
+
+        assert response.status_code == 200
+        assert response.json()["ids"] == [1, 2]
+        assert len(session.exec(select(Quote)).all()) == 2
+
+    def test_post_bulk_invalid(self, client: TestClient, session: Session):
+        """
+        Test that an invalid quote makes the whole bulk creation fail.
+
+        This test verifies that the API responds with status code 422,
+        reports the index of the invalid quote, and stores nothing.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        payload = [{"author": "John Doe", "text": "Hello World!"},
+                   {"author": "John Doe"}]
+
+        response = client.post(
+            "/quotes/bulk", json=payload, params={"chunk_size": 1})
+
+        assert response.status_code == 422
+        assert response.json()["detail"]["index"] == 1
+        assert session.exec(select(Quote)).all() == []
+
+    def test_export(self, client: TestClient, session: Session):
+        """
+        Test exporting every quote as NDJSON via the /quotes/export endpoint.
+
+        This test inserts more quotes than the maximum page size and verifies
+        that all of them are exported, in ID order.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        n = 150
+        for i in range(0, n):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+
+        response = client.get("/quotes/export")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == n
+        assert lines[-1] == {"id": n, "author": "John Doe",
+                             "text": f"Quote {n - 1}"}
+
+    def test_export_csv(self, client: TestClient, session: Session):
+        """
+        Test exporting quotes as CSV via the /quotes/export endpoint.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello, \"World\"!"))
+        session.commit()
+
+        response = client.get("/quotes/export", params={"format": "csv"})
+
+        assert response.status_code == 200
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows == [["id", "author", "text"],
+                        ["1", "John Doe", "Hello, \"World\"!"]]
+
+    def test_get_quotes_cleared(self, client: TestClient, session: Session,
+                                monkeypatch):
+        """
+        Test that a version stamp read while a write clears the cache is not
+        kept.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+            monkeypatch (MonkeyPatch): The pytest fixture to patch the reads.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+        read_table_version = quotes.read_table_version
+
+        async def read_then_clear(session):
+            version = await read_table_version(session)
+            quote_pages.clear()
+            return version
+
+        monkeypatch.setattr(quotes, "read_table_version", read_then_clear)
+        response = client.get("/quotes")
+
+        assert response.status_code == 200
+        assert quote_pages.version is None
+
+    def test_get_daily(self, client: TestClient, session: Session):
+        """
+        Test that the /quotes/daily endpoint returns the same quote all day.
+
+        This test verifies that repeated requests for a date return the same
+        quote, even after new quotes are added, and that the quote exists.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        for i in range(0, 10):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        params = {"date": utc_today().isoformat()}
+
+        first = client.get("/quotes/daily", params=params)
+        session.add(Quote(author="John Doe", text="A late quote"))
+        session.commit()
+        second = client.get("/quotes/daily", params=params)
+
+        assert first.status_code == 200
+        assert first.json() == second.json()
+        assert session.get(Quote, first.json()["id"]).text == \
+            first.json()["text"]
+
+    def test_get_daily_shared(self, client: TestClient, session: Session):
+        """
+        Test that a worker started after quotes were added serves the quote
+        of the day already picked by another one.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        for i in range(0, 10):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        params = {"date": utc_today().isoformat()}
+
+        first = client.get("/quotes/daily", params=params)
+        for i in range(10, 500):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        daily_quotes.clear()
+        second = client.get("/quotes/daily", params=params)
+        session.delete(session.get(Quote, first.json()["id"]))
+        session.commit()
+        daily_quotes.clear()
+        replaced = client.get("/quotes/daily", params=params)
+        daily_quotes.clear()
+        third = client.get("/quotes/daily", params=params)
+
+        assert second.json() == first.json()
+        assert replaced.json()["id"] != first.json()["id"]
+        assert third.json() == replaced.json()
+
+    def test_get_daily_timezone(self, client: TestClient, session: Session):
+        """
+        Test that the /quotes/daily endpoint accepts timezones.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+
+        response = client.get("/quotes/daily", params={"tz": "Europe/Paris"})
+        invalid = client.get("/quotes/daily", params={"tz": "Nowhere/Land"})
+
+        assert response.status_code == 200
+        assert response.json()["id"] == 1
+        assert invalid.status_code == 422
+
+    def test_get_daily_window(self, client: TestClient, session: Session):
+        """
+        Test that the /quotes/daily endpoint only picks quotes for the
+        current day and the days since the first pick.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+        today = utc_today()
+
+        future = client.get("/quotes/daily", params={
+            "date": (today + timedelta(days=2)).isoformat()})
+        past = client.get("/quotes/daily", params={
+            "date": (today - timedelta(days=30)).isoformat()})
+        tomorrow = client.get("/quotes/daily", params={
+            "date": (today + timedelta(days=1)).isoformat()})
+        session.add(DailyPick(day=today - timedelta(days=10), quote_id=1))
+        session.commit()
+        since = client.get("/quotes/daily", params={
+            "date": (today - timedelta(days=5)).isoformat()})
+        before = client.get("/quotes/daily", params={
+            "date": (today - timedelta(days=11)).isoformat()})
+
+        assert future.status_code == 422
+        assert past.status_code == 422
+        assert tomorrow.status_code == 200
+        assert since.status_code == 200
+        assert before.status_code == 422
+        assert len(session.exec(select(DailyPick)).all()) == 3
+
+    def test_get_daily_empty(self, client: TestClient):
+        """
+        Test that the /quotes/daily endpoint responds with 404 without quotes.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+        """
+        response = client.get("/quotes/daily")
+
+        assert response.status_code == 404
+
+    def test_get_random(self, client: TestClient, session: Session):
+        """
+        Test that the /quotes/random endpoint returns distinct quotes.
+
+        This test verifies that asking for more quotes than the database holds
+        returns each of them exactly once.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        n = 5
+        for i in range(0, n):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+
+        one = client.get("/quotes/random")
+        many = client.get("/quotes/random", params={"n": n + 1})
+
+        assert one.status_code == 200
+        assert len(one.json()) == 1
+        assert sorted(quote["id"] for quote in many.json()) == \
+            list(range(1, n + 1))
+
+    def test_get_cache(self, client: TestClient, session: Session):
+        """
+        Test that repeated /quotes GET requests are served from the cache.
+
+        This test verifies that the second identical request is a cache hit,
+        that creating a quote invalidates the cache, and that a write made
+        through another connection is detected as well.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        client.post("/quotes", json={"author": "John Doe", "text": "One"})
+
+        first = client.get("/quotes")
+        second = client.get("/quotes")
+        client.post("/quotes", json={"author": "John Doe", "text": "Two"})
+        third = client.get("/quotes")
+        session.add(Quote(author="John Doe", text="Three"))
+        session.commit()
+        fourth = client.get("/quotes")
+
+        assert first.headers["X-Cache"] == "MISS"
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json() == first.json()
+        assert third.headers["X-Cache"] == "MISS"
+        assert len(third.json()) == 2
+        assert fourth.headers["X-Cache"] == "MISS"
+        assert len(fourth.json()) == 3
+        stats = client.get("/quotes/cache").json()
+        assert stats["hits"] >= 1
+        assert stats["misses"] >= 3
+
+    def test_get_not_modified(self, client: TestClient, session: Session):
+        """
+        Test that /quotes GET requests honour 'If-None-Match'.
+
+        This test verifies that sending back the 'ETag' of a response gets a
+        304 response until a quote is created, and that 'If-Modified-Since'
+        is honoured as well.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        client.post("/quotes", json={"author": "John Doe", "text": "One"})
+
+        first = client.get("/quotes")
+        etag = first.headers["ETag"]
+        second = client.get("/quotes", headers={"If-None-Match": etag})
+        since = client.get("/quotes", headers={
+            "If-Modified-Since": first.headers["Last-Modified"]})
+        client.post("/quotes", json={"author": "John Doe", "text": "Two"})
+        third = client.get("/quotes", headers={"If-None-Match": etag})
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+        assert second.headers["ETag"] == etag
+        assert second.content == b""
+        assert since.status_code == 304
+        assert third.status_code == 200
+        assert third.headers["ETag"] != etag
+        assert len(third.json()) == 2
+
+    def test_get_daily_not_modified(self, client: TestClient,
+                                    session: Session):
+        """
+        Test that /quotes/daily GET requests honour 'If-None-Match'.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+        params = {"date": utc_today().isoformat()}
+
+        first = client.get("/quotes/daily", params=params)
+        second = client.get("/quotes/daily", params=params,
+                            headers={"If-None-Match": first.headers["ETag"]})
+
+        assert first.status_code == 200
+        assert second.status_code == 304
+
+    def test_search(self, client: TestClient, session: Session):
+        """
+        Test searching quotes via the /quotes/search endpoint.
+
+        This test verifies that every term must match, in the text or the
+        author, that prefixes are supported, that matches are highlighted in
+        the snippet, and that updated quotes are reindexed.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        data = {"John Doe": "Hello World!",
+                "Lewis Hamilton": "Still we rise!",
+                "Maya Angelou": "Still I'll rise, like dust."}
+        for author, text in data.items():
+            session.add(Quote(author=author, text=text))
+        session.commit()
+
+        both = client.get("/quotes/search", params={"q": "still rise"})
+        author = client.get("/quotes/search", params={"q": "hamilton rise"})
+        prefix = client.get("/quotes/search", params={"q": "wor*"})
+        syntax = client.get("/quotes/search", params={"q": "\"AND (NEAR"})
+        empty = client.get("/quotes/search", params={"q": "?!"})
+
+        assert both.status_code == 200
+        assert sorted(quote["id"] for quote in both.json()) == [2, 3]
+        assert [quote["id"] for quote in author.json()] == [2]
+        assert prefix.json()[0]["id"] == 1
+        assert "<mark>World</mark>" in prefix.json()[0]["snippet"]
+        assert syntax.status_code == 200
+        assert empty.status_code == 422
+
+        quote = session.get(Quote, 1)
+        quote.text = "Goodbye!"
+        session.add(quote)
+        session.commit()
+        updated = client.get("/quotes/search", params={"q": "world"})
+
+        assert updated.json() == []
+
+    def test_search_escaped(self, client: TestClient, session: Session):
+        """
+        Test that snippets escape the text of the quotes, and only add the
+        '<mark>' tags themselves, and that negative limits are refused.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="Mallory",
+                          text='<img src=x onerror="alert(1)"> & hello'))
+        session.commit()
+
+        response = client.get("/quotes/search", params={"q": "hello"})
+
+        assert response.json()[0]["snippet"] == (
+            "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; &amp; "
+            "<mark>hello</mark>")
+        assert response.json()[0]["text"] == \
+            '<img src=x onerror="alert(1)"> & hello'
+        assert client.get("/quotes/search", params={
+            "q": "hello", "limit": -1}).status_code == 422
+
+    def test_search_pagination(self, client: TestClient, session: Session):
+        """
+        Test that search results are paginated through the 'Link' header.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        n = 7
+        for i in range(0, n):
+            session.add(Quote(author="John Doe",
+                              text="Hello " * (i + 1) + "World!"))
+        session.commit()
+
+        ids = []
+        ranks = []
+        response = client.get(
+            "/quotes/search", params={"q": "hello", "limit": 3})
+        while True:
+            ids.extend(quote["id"] for quote in response.json())
+            ranks.extend(quote["rank"] for quote in response.json())
+            if "next" not in response.links:
+                break
+            response = client.get(response.links["next"]["url"])
+
+        assert sorted(ids) == list(range(1, n + 1))
+        assert ranks == sorted(ranks)
+
+    def test_get_author(self, client: TestClient, session: Session):
+        """
+        Test that the /quotes GET endpoint filters by author, ignoring case.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        data = [("John Doe", "Hello World!"),
+                ("Lewis Hamilton", "Still we rise!"),
+                ("JOHN DOE", "Hello again!")]
+        for author, text in data:
+            session.add(Quote(author=author, text=text))
+        session.commit()
+
+        response = client.get("/quotes", params={"author": "john doe"})
+
+        assert [quote["id"] for quote in response.json()] == [1, 3]
+
+    def test_get_schema(self, client: TestClient):
+        """
+        Test that the /quotes GET endpoint documents its response model,
+        although it encodes its responses itself.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+        """
+        response = client.get("/openapi.json")
+
+        schema = response.json()["paths"]["/quotes/"]["get"]["responses"][
+            "200"]["content"]["application/json"]["schema"]
+        assert schema["items"] == {
+            "$ref": "#/components/schemas/QuoteResponse"}
+
+    def test_get_snapshot(self, client: TestClient, session: Session,
+                          database_path, tmp_path):
+        """
+        Test that reads are served from an up to date snapshot, and from the
+        database once the table changed.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+            database_path (Path): The path of the test database file.
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        for i in range(0, 20):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        path = str(tmp_path / "quotes.snapshot")
+        build_snapshot(str(database_path), path)
+        quote_snapshots.current = QuoteSnapshot(path)
+
+        snapshot = client.get("/quotes", params={"offset": 5})
+        daily = client.get("/quotes/daily", params={
+            "date": utc_today().isoformat()})
+        drawn = client.get("/quotes/random", params={"n": 20})
+        client.post("/quotes", json={"author": "John Doe", "text": "New"})
+        database = client.get("/quotes", params={"offset": 5})
+
+        assert snapshot.headers["x-cache"] == "SNAPSHOT"
+        assert [quote["id"] for quote in snapshot.json()] == \
+            list(range(6, 16))
+        assert "after_id=15" in snapshot.links["next"]["url"]
+        assert daily.status_code == 200
+        assert sorted(quote["id"] for quote in drawn.json()) == \
+            list(range(1, 21))
+        assert database.headers["x-cache"] == "MISS"
+        assert database.json() == snapshot.json()
+
+    def test_get_negative_offset(self, client: TestClient, session: Session,
+                                 database_path, tmp_path):
+        """
+        Test that negative offsets and limits are refused, with or without
+        a snapshot.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+            database_path (Path): The path of the test database file.
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        for i in range(0, 20):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        database = [client.get("/quotes", params=params) for params in (
+            {"offset": -5, "limit": 3}, {"limit": -1})]
+        path = str(tmp_path / "quotes.snapshot")
+        build_snapshot(str(database_path), path)
+        quote_snapshots.current = QuoteSnapshot(path)
+
+        snapshot = client.get("/quotes", params={"offset": -5, "limit": 3})
+
+        assert [response.status_code for response in database] == [422, 422]
+        assert snapshot.status_code == 422
+        assert client.get("/authors", params={
+            "offset": -1}).status_code == 422
+
+    def test_get_overflow(self, client: TestClient, session: Session):
+        """
+        Test that offsets and cursors too large for SQLite are refused
+        instead of failing.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+
+        largest = client.get("/quotes", params={"after_id": 2 ** 63 - 1})
+        responses = [client.get(path, params=params) for path, params in (
+            ("/quotes", {"after_id": 2 ** 63}),
+            ("/quotes", {"offset": 2 ** 63}),
+            ("/authors", {"offset": 2 ** 63}))]
+
+        assert largest.status_code == 200
+        assert largest.json() == []
+        assert [response.status_code for response in responses] == \
+            [422, 422, 422]
+
+    def test_get_by_id_overflow(self, client: TestClient, session: Session):
+        """
+        Test that IDs too large for SQLite match no quote instead of failing.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+
+        single = client.get(f"/quotes/{2 ** 63}")
+        negative = client.get(f"/quotes/{-2 ** 63 - 1}")
+        listed = client.get("/quotes", params={"ids": f"1,{2 ** 64}"})
+
+        assert single.status_code == 404
+        assert negative.status_code == 404
+        assert [quote["id"] for quote in listed.json()] == [1]
+        assert listed.headers["X-Missing-Ids"] == str(2 ** 64)
+
+    def test_get_daily_snapshot(self, client: TestClient, session: Session,
+                                database_path, tmp_path):
+        """
+        Test that the quote of the day does not change when quotes are added
+        and the snapshot is rebuilt.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+            database_path (Path): The path of the test database file.
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        for i in range(0, 20):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        path = str(tmp_path / "quotes.snapshot")
+        build_snapshot(str(database_path), path)
+        quote_snapshots.current = QuoteSnapshot(path)
+        params = {"date": utc_today().isoformat()}
+
+        first = client.get("/quotes/daily", params=params)
+        for i in range(20, 400):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        quote_snapshots.current.close()
+        build_snapshot(str(database_path), path)
+        quote_snapshots.current = QuoteSnapshot(path)
+        second = client.get("/quotes/daily", params=params)
+
+        assert quote_snapshots.get(
+            quote_snapshots.current.version) is not None
+        assert first.json() == second.json()
+        assert first.headers["etag"] == second.headers["etag"]
+
+    def test_get_by_id(self, client: TestClient, session: Session):
+        """
+        Test retrieving a quote by ID via the /quotes/{id} GET endpoint.
+
+        A created quote is cached, so reading it back is a cache hit, while
+        quotes stored by other means are read once from the database.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+        created = client.post("/quotes", json={"author": "Lewis Hamilton",
+                                               "text": "Still we rise!"})
+        hits = quotes_by_id.hits
+
+        first = client.get("/quotes/1")
+        second = client.get("/quotes/1")
+        posted = client.get("/quotes/2")
+        missing = client.get("/quotes/3")
+
+        assert first.json() == {"author": "John Doe", "text": "Hello World!",
+                                "id": 1}
+        assert second.json() == first.json()
+        assert posted.json() == created.json()
+        assert quotes_by_id.hits == hits + 2
+        assert missing.status_code == 404
+        assert client.get("/quotes/daily").status_code == 200
+
+    def test_get_ids(self, client: TestClient, session: Session):
+        """
+        Test retrieving quotes by ID via the 'ids' parameter of the /quotes
+        GET endpoint.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        for i in range(1, 11):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+        client.get("/quotes/9")
+
+        response = client.get("/quotes", params={"ids": "9,1,42,5,1,7"})
+
+        assert [quote["id"] for quote in response.json()] == [9, 1, 5, 7]
+        assert response.json()[0]["text"] == "Quote 9"
+        assert response.headers["x-missing-ids"] == "42"
+        assert client.get("/quotes", params={
+            "ids": "1,a"}).status_code == 422
+        assert client.get("/quotes", params={
+            "ids": ",".join(map(str, range(1, 102)))}).status_code == 422
+
+    def test_get_stream(self, client: TestClient):
+        """
+        Test that the /quotes/stream GET endpoint is not mistaken for a quote
+        ID and validates the 'Last-Event-ID' header before streaming.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+        """
+        response = client.get("/quotes/stream",
+                              headers={"Last-Event-ID": "not-an-id"})
+
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"] == [
+            "header", "last-event-id"]
+        assert "/quotes/stream" in client.get("/openapi.json").json()["paths"]
+
+    def test_get_total_count(self, client: TestClient, session: Session):
+        """
+        Test that listings carry the number of quotes matching the author
+        filter in the 'X-Total-Count' header, kept up to date by writes.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        for i in range(1, 6):
+            session.add(Quote(author="John Doe" if i % 2 else "Jane Doe",
+                              text=f"Quote {i}"))
+        session.commit()
+
+        assert client.get("/quotes", params={
+            "limit": 2}).headers["x-total-count"] == "5"
+        assert client.get("/quotes", params={
+            "author": "john DOE"}).headers["x-total-count"] == "3"
+        client.post("/quotes", json={"author": "John Doe", "text": "New"})
+        session.delete(session.get(Quote, 2))
+        session.commit()
+        assert client.get("/quotes", params={
+            "after_id": 3}).headers["x-total-count"] == "5"
+        assert client.get("/quotes", params={
+            "author": "John Doe"}).headers["x-total-count"] == "4"
+        assert client.get("/quotes", params={
+            "author": "Nobody"}).headers["x-total-count"] == "0"
+
+    def test_get_fields(self, client: TestClient, session: Session):
+        """
+        Test that the 'fields' parameter narrows the returned quotes, in
+        listings and ID lookups.
+
+        Args:
+            client (TestClient): A FastAPI TestClient instance for sending HTTP requests.
+            session (Session): A SQLModel session instance for database interaction.
+        """
+        for i in range(1, 4):
+            session.add(Quote(author="John Doe", text=f"Quote {i}"))
+        session.commit()
+
+        narrow = client.get("/quotes", params={
+            "fields": "id,author", "limit": 2})
+        texts = client.get("/quotes", params={"fields": "text"})
+        full = client.get("/quotes", params={"fields": "text,id,author"})
+        by_id = client.get("/quotes", params={"ids": "3,1", "fields": "id"})
+
+        assert narrow.json() == [{"author": "John Doe", "id": 1},
+                                 {"author": "John Doe", "id": 2}]
+        assert "after_id=2" in narrow.headers["link"]
+        assert texts.json() == [{"text": f"Quote {i}"} for i in range(1, 4)]
+        assert full.json() == client.get("/quotes").json()
+        assert by_id.json() == [{"id": 3}, {"id": 1}]
+        assert client.get("/quotes", params={
+            "fields": "id,secret"}).status_code == 422
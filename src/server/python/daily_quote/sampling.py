@@ -0,0 +1,109 @@
+# sampling.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module draws uniformly random quotes for the 'daily_quote' project.
+
+Instead of sorting the whole table with 'ORDER BY RANDOM()', candidate IDs
+are drawn uniformly from the range of quote IDs and looked up through the
+primary key. Candidates falling in gaps left by deleted quotes are rejected
+and drawn again, which keeps every existing quote equally likely to be
+picked while each lookup only costs a few index seeks.
+"""
+
+import math
+import random
+from typing import Dict, List, Optional
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import Quote, QuoteResponse, id_bounds
+
+# Below this many possible IDs, reading every ID is cheaper than sampling.
+SMALL_RANGE = 4096
+
+# The largest number of candidate IDs looked up in a single query.
+MAX_CANDIDATES = 512
+
+# The number of sampling rounds before giving up on rejection sampling,
+# which only happens when almost every ID in the range has been deleted.
+MAX_ROUNDS = 16
+
+# The generator used when the caller does not provide one.
+_rng = random.Random()
+
+
+async def sample_quotes(session: AsyncSession, n: int,
+                        rng: Optional[random.Random] = None
+                        ) -> List[QuoteResponse]:
+    """
+    Draw up to n distinct quotes uniformly at random.
+
+    Args:
+        session (AsyncSession): The database session used to find the quotes.
+        n (int): The number of quotes to draw.
+        rng (Optional[random.Random]): The random number generator to draw
+        IDs with (default is a generator shared by every call).
+
+    Returns:
+        List[QuoteResponse]: The drawn quotes in random order, fewer than n
+        only if the database holds fewer than n quotes.
+    """
+    rng = rng or _rng
+    first_id, last_id = (await session.exec(select(*id_bounds()))).one()
+    if first_id is None:
+        return []
+    if last_id - first_id + 1 <= SMALL_RANGE:
+        ids = (await session.exec(select(Quote.id))).all()
+        chosen = rng.sample(ids, min(n, len(ids)))
+        quotes = await _load(session, chosen)
+        return [QuoteResponse.model_validate(quotes[id]) for id in chosen]
+
+    chosen: List[int] = []
+    quotes: Dict[int, Quote] = {}
+    drawn = found = 0
+    for _ in range(0, MAX_ROUNDS):
+        missing = n - len(chosen)
+        if missing == 0:
+            break
+        # Oversample by the share of IDs found so far, so that sparse ranges
+        # need about as many rounds as dense ones.
+        density = (found + 1) / (drawn + 1)
+        size = min(MAX_CANDIDATES, math.ceil(missing / density * 2) + 1)
+        # Deduplicate the candidates but keep them in the order they were
+        # drawn, so that extra hits are discarded at random and not by ID.
+        candidates = list(dict.fromkeys(
+            rng.randint(first_id, last_id) for _ in range(size)))
+        candidates = [id for id in candidates if id not in chosen]
+        hits = {quote.id: quote for quote in (await session.exec(
+            select(Quote).where(Quote.id.in_(candidates)))).all()}
+        drawn += len(candidates)
+        found += len(hits)
+        chosen.extend([id for id in candidates if id in hits][:missing])
+        quotes.update(hits)
+    else:
+        if len(chosen) < n:
+            # The range is nearly empty: fall back to reading every ID.
+            ids = (await session.exec(select(Quote.id))).all()
+            taken = set(chosen)
+            rest = [id for id in ids if id not in taken]
+            chosen.extend(rng.sample(rest, min(n - len(chosen), len(rest))))
+            quotes.update(await _load(session, chosen))
+    return [QuoteResponse.model_validate(quotes[id]) for id in chosen]
+
+
+async def _load(session: AsyncSession, ids: List[int]) -> Dict[int, Quote]:
+    quotes = (await session.exec(select(Quote).where(Quote.id.in_(ids)))).all()
+    return {quote.id: quote for quote in quotes}
@@ -0,0 +1,225 @@
+# schema.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module defines the parts of the database schema of the 'daily_quote'
+project that cannot be declared on the SQLModel models, such as triggers,
+expression indexes and the full-text search index.
+
+The statements are run whenever the tables are created, and are written so
+that running them against an existing database is harmless. The version of
+the schema they create is then stamped in the database file, so that
+starting against a database that is already up to date takes one pragma
+instead of checking every table and index.
+"""
+
+from sqlalchemy import event
+from sqlmodel import SQLModel
+# The models are imported so that their tables exist in the metadata, which
+# the statements below depend on.
+from . import author_model, quote_model  # noqa: F401
+
+# The version of the schema created by the models and the statements below,
+# stored in SQLite's 'user_version' header field. Bump it whenever they
+# change, so that existing databases are brought up to date on startup.
+SCHEMA_VERSION = 2
+
+# Statements keeping the single row of the 'quote_stats' table up to date.
+# The row is created with the number of quotes already stored, which only
+# costs a full scan for databases created before it existed.
+QUOTE_STATS_DDL = [
+    """
+    INSERT INTO quote_stats (id, version, quote_count, modified_at)
+    SELECT 1, 0, (SELECT count(*) FROM quote),
+        CAST(strftime('%s', 'now') AS INTEGER)
+    WHERE NOT EXISTS (SELECT 1 FROM quote_stats)
+    """,
+] + [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS quote_stats_after_{operation}
+    AFTER {operation} ON quote
+    BEGIN
+        UPDATE quote_stats
+        SET version = version + 1,
+            quote_count = quote_count + {delta},
+            modified_at = CAST(strftime('%s', 'now') AS INTEGER)
+        WHERE id = 1;
+    END
+    """
+    for operation, delta in (("insert", 1), ("update", 0), ("delete", -1))
+]
+
+
+# Statements creating the FTS5 index of the quotes and the triggers keeping
+# it in sync with the quote table. The index is an external content table,
+# so it only stores the index itself and reads the text from 'quote'.
+SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS quote_fts USING fts5(
+        author, text, content='quote', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quote_fts_after_insert
+    AFTER INSERT ON quote
+    BEGIN
+        INSERT INTO quote_fts (rowid, author, text)
+        VALUES (new.id, new.author, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quote_fts_after_delete
+    AFTER DELETE ON quote
+    BEGIN
+        INSERT INTO quote_fts (quote_fts, rowid, author, text)
+        VALUES ('delete', old.id, old.author, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS quote_fts_after_update
+    AFTER UPDATE OF author, text ON quote
+    BEGIN
+        INSERT INTO quote_fts (quote_fts, rowid, author, text)
+        VALUES ('delete', old.id, old.author, old.text);
+        INSERT INTO quote_fts (rowid, author, text)
+        VALUES (new.id, new.author, new.text);
+    END
+    """,
+]
+
+
+# Statements indexing quotes by author, case-insensitively, and keeping the
+# author table up to date. The author table is filled from the existing
+# quotes when it is empty, which only costs a full scan for databases
+# created before it existed.
+AUTHOR_DDL = [
+    """
+    CREATE INDEX IF NOT EXISTS ix_quote_author_nocase
+    ON quote (author COLLATE NOCASE)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_author_quote_count
+    ON author (quote_count DESC, name)
+    """,
+    """
+    INSERT INTO author (name, quote_count)
+    SELECT author, count(*) FROM quote
+    WHERE NOT EXISTS (SELECT 1 FROM author)
+    GROUP BY author COLLATE NOCASE
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS author_after_insert
+    AFTER INSERT ON quote
+    BEGIN
+        INSERT INTO author (name, quote_count) VALUES (new.author, 1)
+        ON CONFLICT (name) DO UPDATE SET quote_count = quote_count + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS author_after_delete
+    AFTER DELETE ON quote
+    BEGIN
+        UPDATE author SET quote_count = quote_count - 1
+        WHERE name = old.author;
+        DELETE FROM author WHERE name = old.author AND quote_count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS author_after_update
+    AFTER UPDATE OF author ON quote
+    WHEN old.author IS NOT new.author
+    BEGIN
+        UPDATE author SET quote_count = quote_count - 1
+        WHERE name = old.author;
+        DELETE FROM author WHERE name = old.author AND quote_count <= 0;
+        INSERT INTO author (name, quote_count) VALUES (new.author, 1)
+        ON CONFLICT (name) DO UPDATE SET quote_count = quote_count + 1;
+    END
+    """,
+]
+
+
+# Statements creating the unique index on the content hash of the quotes.
+# Quotes inserted before the hash existed have none, and SQLite lets any
+# number of rows share a NULL in a unique index, until they are backfilled
+# with 'python -m daily_quote.dedup backfill'.
+DEDUP_DDL = [
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS ix_quote_content_hash
+    ON quote (content_hash)
+    """,
+]
+
+
+def add_missing_columns(connection):
+    """
+    Add the columns of the quote tables missing from an existing database.
+
+    Creating the tables leaves existing ones as they are, so databases
+    created before a column was added to the model need it added here. The
+    quote count is filled in, and the triggers maintaining it replace the
+    ones written before it existed.
+
+    Args:
+        connection: The SQLAlchemy or DB-API connection to the database.
+    """
+    execute = getattr(connection, "exec_driver_sql", None) \
+        or connection.execute
+    columns = {row[1] for row in execute("PRAGMA table_info(quote)")}
+    if "content_hash" not in columns:
+        execute("ALTER TABLE quote ADD COLUMN content_hash BLOB")
+    columns = {row[1] for row in execute("PRAGMA table_info(quote_stats)")}
+    if columns and "quote_count" not in columns:
+        execute("ALTER TABLE quote_stats "
+                "ADD COLUMN quote_count INTEGER NOT NULL DEFAULT 0")
+        execute("UPDATE quote_stats "
+                "SET quote_count = (SELECT count(*) FROM quote)")
+        for operation in ("insert", "update", "delete"):
+            execute(f"DROP TRIGGER IF EXISTS quote_stats_after_{operation}")
+        for statement in QUOTE_STATS_DDL[1:]:
+            execute(statement)
+
+
+@event.listens_for(SQLModel.metadata, "after_create")
+def create_schema_extras(target, connection, **kwargs):
+    """
+    Create the triggers and the extra indexes once the tables exist, then
+    stamp the version of the schema.
+
+    Args:
+        target (MetaData): The metadata whose tables were created.
+        connection (Connection): The connection used to create the tables.
+        **kwargs: Additional arguments passed by SQLAlchemy.
+    """
+    add_missing_columns(connection)
+    for statement in QUOTE_STATS_DDL + SEARCH_DDL + AUTHOR_DDL + DEDUP_DDL:
+        connection.exec_driver_sql(statement)
+    connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def read_schema_version(connection) -> int:
+    """
+    Read the version of the schema stamped in a database.
+
+    Args:
+        connection (Connection): The connection to the database.
+
+    Returns:
+        int: The version of the schema, 0 for databases created before it
+        was stamped, or not created at all.
+    """
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
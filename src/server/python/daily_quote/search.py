@@ -0,0 +1,202 @@
+# search.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module implements the full-text search of the 'daily_quote' project.
+
+Quotes are indexed by the SQLite FTS5 table 'quote_fts', which triggers keep
+in sync with the quote table. Results are ranked with BM25 and paginated
+with an opaque cursor holding the rank and ID of the last result, so deep
+pages cost the same as the first one.
+
+The index of an existing database can be created or rebuilt with:
+
+    python -m daily_quote.search rebuild [database.db]
+"""
+
+import argparse
+import base64
+import html
+import json
+import re
+import sqlite3
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import QuoteSearchResponse
+from .schema import SEARCH_DDL
+
+# A search term, optionally followed by '*' to match it as a prefix.
+_TERM = re.compile(r"(\w+)(\*?)")
+
+# The characters SQLite wraps the matching terms of the snippets in. They
+# are replaced with '<mark>' tags only once the snippet is escaped, as the
+# text of the quotes is not HTML.
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+_SEARCH_SQL = """
+    SELECT quote.id, quote.author, quote.text,
+           snippet(quote_fts, -1, :mark_start, :mark_end, '…', 12)
+               AS snippet,
+           quote_fts.rank AS rank
+    FROM quote_fts JOIN quote ON quote.id = quote_fts.rowid
+    WHERE quote_fts MATCH :query {after}
+    ORDER BY quote_fts.rank, quote_fts.rowid
+    LIMIT :limit
+"""
+
+_AFTER_SQL = """
+    AND (quote_fts.rank > :rank
+         OR (quote_fts.rank = :rank AND quote_fts.rowid > :id))
+"""
+
+
+def highlight(snippet: str) -> str:
+    """
+    Escape a snippet for HTML, then wrap its matching terms in '<mark>' tags.
+
+    Args:
+        snippet (str): The snippet, its matching terms wrapped in the
+        marker characters.
+
+    Returns:
+        str: The snippet, safe to insert as HTML.
+    """
+    return html.escape(snippet).replace(_MARK_START, "<mark>").replace(
+        _MARK_END, "</mark>")
+
+
+def build_match_query(q: str, prefix: bool = False) -> str:
+    """
+    Turn free text into an FTS5 query matching every term.
+
+    Each term is quoted, so characters with a meaning in the FTS5 query
+    syntax are searched for literally instead of causing syntax errors.
+
+    Args:
+        q (str): The text typed by the user. A term ending with '*' is
+        matched as a prefix.
+        prefix (bool): Whether to match every term as a prefix.
+
+    Returns:
+        str: The FTS5 query.
+
+    Raises:
+        ValueError: If the text contains no searchable term.
+    """
+    terms = [f'"{term}"' + ("*" if prefix or star else "")
+             for term, star in _TERM.findall(q)]
+    if not terms:
+        raise ValueError("The query contains no searchable term")
+    return " ".join(terms)
+
+
+def encode_cursor(rank: float, id: int) -> str:
+    """
+    Encode the position of a search result as an opaque cursor.
+
+    Args:
+        rank (float): The rank of the result.
+        id (int): The ID of the quote.
+
+    Returns:
+        str: The URL-safe cursor.
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps([rank, id]).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Decode a cursor made by 'encode_cursor'.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+
+    Returns:
+        Tuple[float, int]: The rank and the ID of the last seen result.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        rank, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(id)
+    except (TypeError, ValueError) as error:
+        raise ValueError("Malformed cursor") from error
+
+
+async def search_quotes(session: AsyncSession, query: str, limit: int,
+                        cursor: Optional[str] = None
+                        ) -> List[QuoteSearchResponse]:
+    """
+    Find the quotes matching an FTS5 query, best matches first.
+
+    Args:
+        session (AsyncSession): The database session used to search.
+        query (str): The FTS5 query, as built by 'build_match_query'.
+        limit (int): The maximum number of results.
+        cursor (Optional[str]): The cursor of the last result of the
+        previous page.
+
+    Returns:
+        List[QuoteSearchResponse]: The matching quotes with their snippet
+        and rank.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    params = {"query": query, "limit": limit, "mark_start": _MARK_START,
+              "mark_end": _MARK_END}
+    after = ""
+    if cursor is not None:
+        params["rank"], params["id"] = decode_cursor(cursor)
+        after = _AFTER_SQL
+    rows = (await session.exec(
+        text(_SEARCH_SQL.format(after=after)), params=params)).all()
+    return [QuoteSearchResponse.model_validate(
+        {**row._mapping, "snippet": highlight(row.snippet)}) for row in rows]
+
+
+def rebuild_index(database: str):
+    """
+    Create the search index if needed and rebuild it from the quote table.
+
+    This is needed for databases created before the search was introduced,
+    whose quotes were never indexed, and can repair a corrupted index.
+
+    Args:
+        database (str): The path of the SQLite database file.
+    """
+    with sqlite3.connect(database) as connection:
+        for statement in SEARCH_DDL:
+            connection.execute(statement)
+        connection.execute("INSERT INTO quote_fts (quote_fts) VALUES "
+                           "('rebuild')")
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Manage the full-text search index of the quotes.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("database", nargs="?", default="database.db")
+    args = parser.parse_args()
+    rebuild_index(args.database)
+
+
+if __name__ == "__main__":
+    main()
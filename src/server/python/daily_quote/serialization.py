@@ -0,0 +1,115 @@
+# serialization.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module serializes quotes to JSON on the hot read paths of the
+'daily_quote' project.
+
+Listings select bare '(id, author, text)' rows and encode them directly,
+skipping the ORM objects and the response model validation FastAPI would
+otherwise build for every quote. The output is the same as the one of
+'QuoteResponse', key order included. The 'orjson' library is used when it
+is installed, and the standard library otherwise, which also applies to
+decoding the quotes of bulk imports.
+"""
+
+import json
+from typing import Any, Iterable, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover -- depends on the environment.
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Encode a value as compact JSON, with non-ASCII characters kept as is.
+
+    Args:
+        value (Any): The value to encode, made of JSON types only.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(
+        value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data: Any) -> Any:
+    """
+    Decode a JSON document.
+
+    Args:
+        data (Any): The document, as str or bytes.
+
+    Returns:
+        Any: The decoded value.
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON.
+    """
+    if orjson is not None:
+        # Its error class derives from the standard library one.
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_quote(id: int, author: str, text: str) -> bytes:
+    """
+    Encode a quote as a JSON 'QuoteResponse' object.
+
+    Args:
+        id (int): The ID of the quote.
+        author (str): The author of the quote.
+        text (str): The content of the quote.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON object.
+    """
+    return dumps({"author": author, "text": text, "id": id})
+
+
+def dump_quote_rows(rows: Iterable[Tuple[int, str, str]]) -> bytes:
+    """
+    Encode quote rows as a JSON array of 'QuoteResponse' objects.
+
+    Args:
+        rows (Iterable[Tuple[int, str, str]]): The ID, author and text of
+        each quote.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON array.
+    """
+    return dumps([{"author": author, "text": text, "id": id}
+                  for id, author, text in rows])
+
+
+def dump_quote_fields(fields: Sequence[str], rows: Iterable[tuple]) -> bytes:
+    """
+    Encode quote rows as a JSON array of objects holding only some fields.
+
+    Args:
+        fields (Sequence[str]): The names of the fields, in the order of
+        the values of each row.
+        rows (Iterable[tuple]): The values of the fields of each quote.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON array.
+    """
+    return dumps([dict(zip(fields, row)) for row in rows])
@@ -0,0 +1,151 @@
+# settings.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module defines the settings of the 'daily_quote' project.
+
+Every setting can be overridden with an environment variable named after it,
+in upper case and prefixed with 'DAILY_QUOTE_', for example
+'DAILY_QUOTE_DATABASE_PATH=/var/lib/daily-quote/database.db'.
+"""
+
+import dataclasses
+import os
+from dataclasses import dataclass
+from typing import Mapping
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Settings of the application, with production defaults.
+
+    Attributes:
+        database_path (str): The path of the SQLite database file.
+        echo (bool): Whether to log every SQL statement, for debugging.
+        read_pool_size (int): The number of connections kept open by the
+        read-only engine.
+        write_pool_size (int): The number of connections of the read-write
+        engine. SQLite only runs one write at a time, so extra connections
+        would only wait on its lock, sleeping in its busy handler, whereas
+        waiting for the pool lets requests queue in order.
+        max_overflow (int): The number of extra connections the read-only
+        engine may open under load.
+        pool_timeout (float): The number of seconds to wait for a connection.
+        journal_mode (str): The SQLite journal mode. In 'WAL' mode readers
+        no longer wait for writers.
+        synchronous (str): The SQLite synchronous mode. 'NORMAL' is durable
+        across application crashes in 'WAL' mode and avoids an fsync per
+        commit.
+        mmap_size (int): The number of bytes of the database file SQLite
+        reads through memory mapping.
+        cache_size (int): The SQLite page cache size, in pages if positive
+        or in KiB if negative.
+        busy_timeout (int): The number of milliseconds SQLite waits for a
+        lock before failing.
+        temp_store (str): Where SQLite keeps temporary tables and indexes.
+        group_commit (bool): Whether new quotes are queued and committed in
+        batches by a single writer task, instead of one commit per request.
+        group_commit_max_batch (int): The maximum number of quotes committed
+        in one batch.
+        group_commit_max_delay_ms (float): The maximum number of milliseconds
+        a quote waits for more quotes before its batch is committed.
+        snapshot (bool): Whether quote listings, the quote of the day and
+        random quotes are served from a memory-mapped snapshot of the quote
+        table, shared by every worker process, instead of SQLite.
+        snapshot_path (str): The path of the snapshot file.
+        snapshot_interval (float): The number of seconds between checks of
+        whether the snapshot is out of date.
+        stream_buffer_size (int): The number of new quote events buffered
+        per streaming client before it is disconnected for being too slow.
+        stream_interval (float): The maximum number of seconds between two
+        checks for quotes created by other processes, to stream them.
+        stream_keepalive (float): The number of seconds without new quotes
+        after which streaming clients get a keep-alive comment.
+        admission_control (bool): Whether requests over the concurrency
+        limits below are queued, then rejected with a 503 error.
+        admission_read_limit (int): The number of read requests handled at
+        once per process.
+        admission_write_limit (int): The number of write requests handled at
+        once per process.
+        admission_queue_size (int): The number of requests of each kind
+        waiting for a slot before new ones are rejected.
+        admission_timeout (float): The number of seconds a request waits for
+        a slot before it is rejected.
+        bulk_body_timeout (float): The number of seconds allowed to receive
+        the body of a bulk creation.
+    """
+    database_path: str = "database.db"
+    echo: bool = False
+    read_pool_size: int = 8
+    write_pool_size: int = 1
+    max_overflow: int = 8
+    pool_timeout: float = 30.0
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size: int = -64 * 1024
+    busy_timeout: int = 5000
+    temp_store: str = "MEMORY"
+    group_commit: bool = False
+    group_commit_max_batch: int = 128
+    group_commit_max_delay_ms: float = 5.0
+    snapshot: bool = False
+    snapshot_path: str = "quotes.snapshot"
+    snapshot_interval: float = 1.0
+    stream_buffer_size: int = 256
+    stream_interval: float = 1.0
+    stream_keepalive: float = 15.0
+    admission_control: bool = True
+    admission_read_limit: int = 64
+    admission_write_limit: int = 16
+    admission_queue_size: int = 256
+    admission_timeout: float = 1.0
+    bulk_body_timeout: float = 60.0
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "Settings":
+        """
+        Build the settings, overriding the defaults with the environment.
+
+        Args:
+            environ (Mapping[str, str]): The environment variables to read.
+
+        Returns:
+            Settings: The resulting settings.
+
+        Raises:
+            ValueError: If a variable cannot be converted to the type of its
+            setting.
+        """
+        values = {}
+        for field in dataclasses.fields(cls):
+            value = environ.get(f"DAILY_QUOTE_{field.name.upper()}")
+            if value is None:
+                continue
+            if field.type in (bool, "bool"):
+                values[field.name] = value.lower() in ("1", "true", "yes")
+            elif field.type in (int, "int"):
+                values[field.name] = int(value)
+            elif field.type in (float, "float"):
+                values[field.name] = float(value)
+            else:
+                values[field.name] = value
+        return cls(**values)
+
+
+# The settings of the running application.
+settings = Settings.from_env()
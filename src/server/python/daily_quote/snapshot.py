@@ -0,0 +1,409 @@
+# snapshot.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module serves quotes from a memory-mapped snapshot of the quote table
+for the 'daily_quote' project.
+
+The snapshot is a single binary file compiled from the quote table: a
+header, the quotes already encoded as the JSON objects of 'QuoteResponse',
+each followed by a comma, then the sorted array of their IDs and the array
+of their offsets. Every worker process maps the same file, so the operating
+system keeps one copy of it in memory however many workers there are, and
+reads cost no SQLite query nor any Python object per quote: a page of the
+listing is one slice of the file, and finding a quote by ID is a binary
+search over the ID array.
+
+Each worker checks in the background whether the table changed since the
+snapshot was built. One of them rebuilds it, under a file lock, into a
+temporary file which then atomically replaces the snapshot, and every worker
+maps the new file. Until then the routes fall back to SQLite, as they only
+use a snapshot whose version matches the current version of the table.
+
+Integers are stored in the native byte order, as the snapshot is only
+meant to be read on the machine which built it.
+"""
+
+import asyncio
+import logging
+import mmap
+import os
+import random
+import sqlite3
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+from .quote_model import QuoteResponse
+from .serialization import dump_quote
+from .settings import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover -- not available on Windows.
+    fcntl = None
+
+# The identifier of the snapshot format, changed with every layout change.
+MAGIC = b"DQSNAP01"
+
+# The header: the format identifier, the version of the quote table the
+# snapshot was built from, the number of quotes, and the offsets of the ID
+# array and of the record offset array in the file.
+HEADER = struct.Struct("=8sQQQQ")
+
+# The number of rows read from SQLite at a time while building.
+BUILD_BATCH_SIZE = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def read_database_version(database: str) -> int:
+    """
+    Read the version of the quote table of a database.
+
+    Args:
+        database (str): The path of the SQLite database file.
+
+    Returns:
+        int: The number of writes made to the quote table.
+    """
+    connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+    try:
+        row = connection.execute(
+            "SELECT version FROM quote_stats WHERE id = 1").fetchone()
+    finally:
+        connection.close()
+    return row[0] if row is not None else 0
+
+
+def read_snapshot_version(path: str) -> Optional[int]:
+    """
+    Read the version of the quote table a snapshot file was built from.
+
+    Args:
+        path (str): The path of the snapshot file.
+
+    Returns:
+        Optional[int]: The version, or None if there is no valid snapshot.
+    """
+    try:
+        with open(path, "rb") as file:
+            header = file.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        return None
+    return HEADER.unpack(header)[1]
+
+
+def build_snapshot(database: str, path: str) -> int:
+    """
+    Compile the quote table of a database into a snapshot file.
+
+    The quotes are read in a single read transaction, so the snapshot is
+    consistent with the version it records, and are streamed to a temporary
+    file, which replaces the snapshot once complete. Processes which mapped
+    the previous snapshot keep reading it until they map the new one.
+
+    Args:
+        database (str): The path of the SQLite database file.
+        path (str): The path of the snapshot file.
+
+    Returns:
+        int: The version of the quote table the snapshot was built from.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    connection = sqlite3.connect(
+        f"file:{database}?mode=ro", uri=True, isolation_level=None)
+    try:
+        connection.execute("BEGIN")
+        row = connection.execute(
+            "SELECT version FROM quote_stats WHERE id = 1").fetchone()
+        version = row[0] if row is not None else 0
+        ids = array("q")
+        offsets = array("Q", [0])
+        with open(temporary, "wb") as file:
+            file.write(bytes(HEADER.size))
+            position = 0
+            cursor = connection.execute(
+                "SELECT id, author, text FROM quote ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(BUILD_BATCH_SIZE)
+                if not rows:
+                    break
+                for id, author, text in rows:
+                    record = dump_quote(id, author, text) + b","
+                    file.write(record)
+                    position += len(record)
+                    ids.append(id)
+                    offsets.append(position)
+            # Align the arrays on 8 bytes, the size of their items.
+            padding = -(HEADER.size + position) % 8
+            file.write(bytes(padding))
+            ids_start = HEADER.size + position + padding
+            offsets_start = ids_start + len(ids) * ids.itemsize
+            file.write(ids.tobytes())
+            file.write(offsets.tobytes())
+            file.seek(0)
+            file.write(HEADER.pack(
+                MAGIC, version, len(ids), ids_start, offsets_start))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    finally:
+        connection.close()
+    return version
+
+
+class QuoteSnapshot:
+    """
+    Read-only view of a snapshot file, mapped in memory.
+
+    Attributes:
+        version (int): The version of the quote table the snapshot was
+        built from.
+        count (int): The number of quotes in the snapshot.
+        inode (int): The inode of the mapped file, which changes when the
+        snapshot is rebuilt.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self.inode = os.fstat(file.fileno()).st_ino
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.count, ids_start, offsets_start = \
+            HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"'{path}' is not a quote snapshot")
+        self._view = memoryview(self._mmap)
+        self._ids = self._view[
+            ids_start:ids_start + self.count * 8].cast("q")
+        self._offsets = self._view[
+            offsets_start:offsets_start + (self.count + 1) * 8].cast("Q")
+
+    def record(self, index: int) -> bytes:
+        """
+        Return the JSON object of the quote at a position.
+
+        Args:
+            index (int): The position of the quote, in ID order.
+
+        Returns:
+            bytes: The quote, encoded as a 'QuoteResponse'.
+        """
+        start = HEADER.size + self._offsets[index]
+        # The stored record ends with a comma.
+        end = HEADER.size + self._offsets[index + 1] - 1
+        return self._mmap[start:end]
+
+    def quote(self, index: int) -> QuoteResponse:
+        """
+        Return the quote at a position.
+
+        Args:
+            index (int): The position of the quote, in ID order.
+
+        Returns:
+            QuoteResponse: The quote.
+        """
+        return QuoteResponse.model_validate_json(self.record(index))
+
+    def find(self, id: int) -> Optional[int]:
+        """
+        Find the position of a quote from its ID.
+
+        Args:
+            id (int): The ID of the quote.
+
+        Returns:
+            Optional[int]: The position of the quote, or None if there is
+            no quote with this ID.
+        """
+        index = bisect_left(self._ids, id)
+        if index < self.count and self._ids[index] == id:
+            return index
+        return None
+
+    def page(self, offset: int, limit: int,
+             after_id: Optional[int] = None) -> Tuple[bytes, Optional[int]]:
+        """
+        Return a page of the quote listing, in ID order.
+
+        The records of consecutive quotes are contiguous in the file, so the
+        page is built from a single slice of it whatever its size and depth.
+
+        Args:
+            offset (int): The number of quotes to skip.
+            limit (int): The maximum number of quotes to return.
+            after_id (Optional[int]): Only return quotes with an ID greater
+            than this one.
+
+        Returns:
+            Tuple[bytes, Optional[int]]: The JSON array of the quotes, and
+            the ID of the last quote if the page is full.
+        """
+        start = offset
+        if after_id is not None:
+            start += bisect_right(self._ids, after_id)
+        end = min(start + limit, self.count)
+        if start >= end:
+            return b"[]", None
+        body = b"[" + self._mmap[
+            HEADER.size + self._offsets[start]:
+            HEADER.size + self._offsets[end] - 1] + b"]"
+        return body, self._ids[end - 1] if end - start == limit else None
+
+    def sample(self, n: int,
+               rng: Optional[random.Random] = None) -> List[QuoteResponse]:
+        """
+        Draw up to n distinct quotes uniformly at random.
+
+        Args:
+            n (int): The number of quotes to draw.
+            rng (Optional[random.Random]): The random number generator to
+            draw positions with (default is the shared one).
+
+        Returns:
+            List[QuoteResponse]: The drawn quotes, in random order.
+        """
+        rng = rng or random
+        return [self.quote(index) for index in rng.sample(
+            range(self.count), min(n, self.count))]
+
+    def close(self):
+        """
+        Unmap the file. The snapshot cannot be read anymore afterwards.
+        """
+        self._ids.release()
+        self._offsets.release()
+        self._view.release()
+        self._mmap.close()
+
+
+class SnapshotManager:
+    """
+    Keeper of the snapshot mapped by the current process.
+
+    Attributes:
+        path (str): The path of the snapshot file.
+        current (Optional[QuoteSnapshot]): The mapped snapshot, if any.
+        builds (int): The number of snapshots built by this process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.current: Optional[QuoteSnapshot] = None
+        self.builds = 0
+
+    def get(self, version: int) -> Optional[QuoteSnapshot]:
+        """
+        Return the mapped snapshot if it is up to date.
+
+        The snapshot must be used right away, without awaiting anything, as
+        a newer one may replace and unmap it at any await.
+
+        Args:
+            version (int): The current version of the quote table.
+
+        Returns:
+            Optional[QuoteSnapshot]: The snapshot, or None if there is none
+            built from this version.
+        """
+        snapshot = self.current
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return None
+
+    def refresh(self, database: str) -> bool:
+        """
+        Rebuild the snapshot file if the quote table changed since.
+
+        When several processes notice the change at once, the first one to
+        take the lock rebuilds the file and the others skip it.
+
+        Args:
+            database (str): The path of the SQLite database file.
+
+        Returns:
+            bool: True if this call rebuilt the snapshot.
+        """
+        version = read_database_version(database)
+        if read_snapshot_version(self.path) == version:
+            return False
+        with open(f"{self.path}.lock", "wb") as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            # Another process may have rebuilt it before we took the lock.
+            if read_snapshot_version(self.path) == read_database_version(
+                    database):
+                return False
+            build_snapshot(database, self.path)
+        self.builds += 1
+        return True
+
+    def reload(self):
+        """
+        Map the snapshot file if it was replaced, unmapping the previous one.
+        """
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        if self.current is not None and self.current.inode == inode:
+            return
+        previous, self.current = self.current, QuoteSnapshot(self.path)
+        if previous is not None:
+            previous.close()
+
+    async def run(self, database: str, interval: float):
+        """
+        Keep the snapshot up to date with the quote table.
+
+        This coroutine never returns, it is meant to run as a background task
+        for the lifetime of the application and to be cancelled on shutdown.
+
+        Args:
+            database (str): The path of the SQLite database file.
+            interval (float): The number of seconds between checks.
+        """
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh, database)
+                self.reload()
+            except (OSError, sqlite3.Error, ValueError):
+                # The routes fall back to SQLite meanwhile.
+                logger.exception("Could not refresh the quote snapshot")
+            await asyncio.sleep(interval)
+
+    def close(self):
+        """
+        Unmap the snapshot.
+        """
+        if self.current is not None:
+            self.current.close()
+            self.current = None
+
+
+# The snapshot served by the routes when snapshots are enabled.
+quote_snapshots = SnapshotManager(settings.snapshot_path)
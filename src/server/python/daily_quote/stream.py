@@ -0,0 +1,323 @@
+# stream.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module pushes new quotes to clients as server-sent events for the
+'daily_quote' project.
+
+A single background task per process follows the quote table, reading the
+quotes added since its last read, and fans each of them out to every
+subscribed client. Reading the table, rather than only the quotes created
+by this process, also streams the quotes created by the other worker
+processes. The task reads as soon as a quote is created by this process,
+and every few seconds otherwise, so each write costs one query per process
+whatever the number of clients.
+
+Each client has a bounded buffer. A client too slow to keep up fills it,
+and is then disconnected once it has read what its buffer holds. Events
+carry the ID of their quote, so it reconnects with the 'Last-Event-ID'
+header and gets the quotes it missed from the database. IDs only identify
+a position in the stream as long as the quote with the largest ID is not
+deleted, as SQLite would then give its ID to the next quote.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .metrics import CallbackMetric, registry
+from .quote_model import Quote
+from .serialization import dump_quote
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+# The largest number of quotes read from the database in a single query.
+READ_BATCH_SIZE = 1000
+
+# An event: the ID of the quote and the quote, encoded as JSON.
+Event = Tuple[int, bytes]
+
+
+class Subscription:
+    """
+    Buffer of the events waiting to be sent to one client.
+
+    Attributes:
+        closed (bool): Whether the subscription ends once its buffer is
+        drained, because the client was too slow or the server stops.
+    """
+
+    def __init__(self, buffer_size: int):
+        self.closed = False
+        self._queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(
+            buffer_size)
+
+    def put(self, event: Event) -> bool:
+        """
+        Buffer an event without waiting.
+
+        Args:
+            event (Event): The event to buffer.
+
+        Returns:
+            bool: False if the buffer is full.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self):
+        """
+        End the subscription once the buffered events are read.
+        """
+        self.closed = True
+        # Wake up the reader if it waits, a full buffer already will.
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self, timeout: float) -> Optional[Event]:
+        """
+        Wait for the next event.
+
+        Args:
+            timeout (float): The number of seconds to wait.
+
+        Returns:
+            Optional[Event]: The event, or None if the subscription ended.
+
+        Raises:
+            asyncio.TimeoutError: If no event came within the timeout.
+        """
+        if self.closed and self._queue.empty():
+            return None
+        return await asyncio.wait_for(self._queue.get(), timeout)
+
+
+class QuoteBroadcaster:
+    """
+    Fan-out of the new quotes to the subscribed clients.
+
+    Attributes:
+        buffer_size (int): The number of events buffered per client.
+        interval (float): The maximum number of seconds between two reads
+        of the quote table.
+        evictions (int): The number of clients disconnected for being too
+        slow.
+    """
+
+    def __init__(self, buffer_size: int = 256, interval: float = 1.0):
+        self.buffer_size = buffer_size
+        self.interval = interval
+        self.evictions = 0
+        self._subscriptions: Set[Subscription] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def subscribers(self) -> int:
+        """
+        int: The number of subscribed clients.
+        """
+        return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        """
+        Subscribe a client to the new quotes.
+
+        Returns:
+            Subscription: The buffer of the events sent to the client.
+        """
+        subscription = Subscription(self.buffer_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Stop sending events to a client.
+
+        Args:
+            subscription (Subscription): The subscription of the client.
+        """
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: Event):
+        """
+        Send an event to every subscribed client, evicting the slow ones.
+
+        Args:
+            event (Event): The event to send.
+        """
+        for subscription in list(self._subscriptions):
+            if not subscription.put(event):
+                self.evictions += 1
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    def notify(self):
+        """
+        Read the quote table right away, as quotes were just created.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self, engine: AsyncEngine):
+        """
+        Publish the quotes added to the quote table, in ID order.
+
+        Failed reads are logged and retried at the next wakeup.
+
+        This coroutine never returns, it is meant to run as a background task
+        for the lifetime of the application and to be cancelled on shutdown.
+
+        Args:
+            engine (AsyncEngine): The engine used to read the quotes.
+        """
+        self._wakeup = wakeup = asyncio.Event()
+        last_id = None
+        while True:
+            rows = []
+            try:
+                async with AsyncSession(engine) as session:
+                    if last_id is None:
+                        last_id = (await session.exec(
+                            select(func.max(Quote.id)))).one() or 0
+                    else:
+                        rows = await read_quotes_after(session, last_id)
+            except SQLAlchemyError:
+                # Ending the task would leave every stream with keep-alive
+                # comments only, so the read is retried at the next wakeup.
+                logger.exception("Could not read the new quotes")
+            for id, author, text in rows:
+                self.publish((id, dump_quote(id, author, text)))
+                last_id = id
+            if len(rows) == READ_BATCH_SIZE:
+                continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            wakeup.clear()
+
+    def close(self):
+        """
+        End every subscription, so that the streams end on shutdown.
+        """
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        self._subscriptions.clear()
+        self._wakeup = None
+
+
+async def read_quotes_after(session: AsyncSession, last_id: int) -> list:
+    """
+    Read the quotes following an ID, in ID order.
+
+    Args:
+        session (AsyncSession): The database session used to read.
+        last_id (int): The ID after which to read.
+
+    Returns:
+        list: Up to 'READ_BATCH_SIZE' rows of ID, author and text.
+    """
+    return (await session.exec(
+        select(Quote.id, Quote.author, Quote.text).where(Quote.id > last_id)
+        .order_by(Quote.id).limit(READ_BATCH_SIZE))).all()
+
+
+def format_event(event: Event) -> bytes:
+    """
+    Format a quote as a server-sent event.
+
+    Args:
+        event (Event): The ID of the quote and its JSON encoding, which
+        holds no line break.
+
+    Returns:
+        bytes: The event, with its ID and the 'quote' event type.
+    """
+    id, data = event
+    return b"id: %d\nevent: quote\ndata: %s\n\n" % (id, data)
+
+
+async def event_stream(broadcaster: QuoteBroadcaster, engine: AsyncEngine,
+                       last_event_id: Optional[int] = None,
+                       keepalive: float = 15.0) -> AsyncIterator[bytes]:
+    """
+    Stream the new quotes to a client as server-sent events.
+
+    The client is subscribed before the quotes it missed are read, so none
+    is lost in between, and the quotes read both ways are sent once.
+
+    Args:
+        broadcaster (QuoteBroadcaster): The broadcaster to subscribe to.
+        engine (AsyncEngine): The engine used to read the missed quotes.
+        last_event_id (Optional[int]): The ID of the last quote the client
+        received, to resume from.
+        keepalive (float): The number of seconds without events after which
+        a comment is sent, so that proxies keep the connection open.
+
+    Yields:
+        bytes: The events.
+    """
+    subscription = broadcaster.subscribe()
+    try:
+        # Let the client reconnect quickly after a slow consumer eviction.
+        yield b"retry: 1000\n\n"
+        last_id = last_event_id
+        if last_id is not None:
+            async with AsyncSession(engine) as session:
+                while True:
+                    rows = await read_quotes_after(session, last_id)
+                    for id, author, text in rows:
+                        yield format_event((id, dump_quote(id, author, text)))
+                        last_id = id
+                    if len(rows) < READ_BATCH_SIZE:
+                        break
+        while True:
+            try:
+                event = await subscription.get(keepalive)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if event is None:
+                break
+            if last_id is not None and event[0] <= last_id:
+                continue
+            last_id = event[0]
+            yield format_event(event)
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+# The broadcaster shared by the routes and its background task.
+quote_broadcaster = QuoteBroadcaster(
+    settings.stream_buffer_size, settings.stream_interval)
+
+registry.register(CallbackMetric(
+    "stream_subscribers", "Number of clients streaming new quotes.",
+    "gauge", (), lambda: {(): quote_broadcaster.subscribers}))
+registry.register(CallbackMetric(
+    "stream_evictions_total",
+    "Number of streaming clients disconnected for being too slow.",
+    "counter", (), lambda: {(): quote_broadcaster.evictions}))
@@ -0,0 +1,120 @@
+# test_admission.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the admission control of the 'daily_quote' project.
+
+This test suite verifies that requests over the limit wait in order, that
+they are rejected once the queue is full or their wait times out, and that
+reads and writes have separate budgets.
+"""
+
+import asyncio
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+from .admission import (
+    AdmissionLimiter, AdmissionMiddleware, Overloaded, admission_rejections)
+
+
+class TestAdmission:
+    """
+    A test class for the admission limiter and middleware.
+    """
+
+    def test_limiter(self):
+        """
+        Test that waiting requests are admitted in arrival order, and that
+        the queue is bounded.
+        """
+        limiter = AdmissionLimiter("test", limit=1, queue_size=2, timeout=1)
+        admitted = []
+
+        async def request(index: int):
+            await limiter.acquire()
+            admitted.append(index)
+            await asyncio.sleep(0.01)
+            limiter.release()
+
+        async def run():
+            tasks = [asyncio.create_task(request(i)) for i in range(3)]
+            await asyncio.sleep(0)
+            assert (limiter.active, limiter.queued) == (1, 2)
+            with pytest.raises(Overloaded, match="queue_full"):
+                await limiter.acquire()
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+
+        assert admitted == [0, 1, 2]
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    def test_limiter_timeout(self):
+        """
+        Test that a request still waiting at the end of its timeout is
+        rejected and leaves the queue.
+        """
+        limiter = AdmissionLimiter("test", limit=1, queue_size=1,
+                                   timeout=0.01)
+
+        async def run():
+            await limiter.acquire()
+            with pytest.raises(Overloaded, match="timeout"):
+                await limiter.acquire()
+            assert limiter.queued == 0
+            limiter.release()
+
+        asyncio.run(run())
+
+        assert limiter.active == 0
+
+    def test_middleware(self):
+        """
+        Test that requests over their budget get a 503 error with a
+        'Retry-After' header, without taking from the other budget.
+        """
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            if scope["path"] == "/slow":
+                await release.wait()
+            await PlainTextResponse("OK")(scope, receive, send)
+
+        read = AdmissionLimiter("read", limit=1, queue_size=0, timeout=1)
+        write = AdmissionLimiter("write", limit=1, queue_size=0, timeout=1)
+        middleware = AdmissionMiddleware(app, read, write, retry_after=2.5)
+        before = admission_rejections.value(("read", "queue_full"))
+
+        async def run():
+            async with httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=middleware),
+                    base_url="http://test") as client:
+                slow = asyncio.create_task(client.get("/slow"))
+                await asyncio.sleep(0.01)
+                rejected = await client.get("/")
+                written = await client.post("/")
+                release.set()
+                return rejected, written, await slow
+
+        rejected, written, slow = asyncio.run(run())
+
+        assert rejected.status_code == 503
+        assert rejected.headers["retry-after"] == "3"
+        assert written.status_code == 200
+        assert slow.status_code == 200
+        assert read.active == 0
+        assert admission_rejections.value(
+            ("read", "queue_full")) == before + 1
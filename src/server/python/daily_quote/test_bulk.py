@@ -0,0 +1,160 @@
+# test_bulk.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the bulk ingestion helpers in the 'daily_quote' project.
+
+This test suite verifies that the incremental parsers decode request bodies
+correctly whatever the way the bytes are split into chunks, that bodies
+are received within their deadline, and that quotes already stored are not
+inserted again.
+"""
+
+import asyncio
+import pytest
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .bulk import (
+    insert_quotes, iter_file, iter_json_array, iter_ndjson, spool_body)
+from .quote_model import Quote, QuoteRequest
+
+
+def parse(parser, body: bytes, chunk_size: int):
+    """
+    Run a parser over a body split into chunks of the given size.
+
+    Args:
+        parser: The incremental parser to run.
+        body (bytes): The raw body to parse.
+        chunk_size (int): The size of each chunk fed to the parser.
+
+    Returns:
+        list: The decoded items.
+    """
+    async def chunks():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    async def collect():
+        return [item async for item in parser(chunks())]
+
+    return asyncio.run(collect())
+
+
+class TestBulk:
+    """
+    A test class for the incremental JSON array and NDJSON parsers and the
+    insertion of quotes.
+    """
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+    def test_json_array(self, chunk_size: int):
+        """
+        Test that a JSON array is decoded item by item.
+
+        The body contains multi-byte characters and strings with brackets
+        and commas, so splitting it in small chunks exercises every state.
+
+        Args:
+            chunk_size (int): The size of each chunk fed to the parser.
+        """
+        body = ' [ {"author": "Zoë", "text": "a, [b] }"} ,{"x": 1}]\n'
+        items = parse(iter_json_array, body.encode(), chunk_size)
+
+        assert items == [{"author": "Zoë", "text": "a, [b] }"}, {"x": 1}]
+
+    def test_json_array_empty(self):
+        """
+        Test that an empty JSON array yields no item.
+        """
+        assert parse(iter_json_array, b"[]", 1) == []
+
+    @pytest.mark.parametrize("body", [b'{"a": 1}', b'[{"a": 1}', b'[1 2]',
+                                      b'[1] [2]'])
+    def test_json_array_malformed(self, body: bytes):
+        """
+        Test that a malformed or truncated JSON array is rejected.
+
+        Args:
+            body (bytes): The malformed body.
+        """
+        with pytest.raises(ValueError):
+            parse(iter_json_array, body, 2)
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+    def test_ndjson(self, chunk_size: int):
+        """
+        Test that NDJSON lines are decoded, skipping blank lines.
+
+        Args:
+            chunk_size (int): The size of each chunk fed to the parser.
+        """
+        body = b'{"a": 1}\n\n{"b": "\xc3\xa9"}\r\n{"c": 3}'
+        items = parse(iter_ndjson, body, chunk_size)
+
+        assert items == [{"a": 1}, {"b": "é"}, {"c": 3}]
+
+    def test_spool_body(self):
+        """
+        Test that a received body is read back from the start.
+        """
+        async def chunks():
+            for chunk in (b"[1, ", b"2]"):
+                await asyncio.sleep(0)
+                yield chunk
+
+        async def spool():
+            with await spool_body(chunks(), 1.0) as body:
+                return [item async for item in iter_json_array(
+                    iter_file(body))]
+
+        assert asyncio.run(spool()) == [1, 2]
+
+    def test_spool_body_timeout(self):
+        """
+        Test that a body not received in time is rejected.
+        """
+        async def chunks():
+            yield b"[1, "
+            await asyncio.sleep(10)
+            yield b"2]"
+
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(spool_body(chunks(), 0.05))
+
+    def test_insert_quotes(self, session: Session, async_engine):
+        """
+        Test that stored and repeated quotes get the ID of the stored copy.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+        """
+        session.add(Quote(author="John Doe", text="Stored"))
+        session.commit()
+        quotes = [QuoteRequest(author="John Doe", text=text)
+                  for text in ("New", "Stored", "New", "Other")]
+
+        async def insert():
+            async with AsyncSession(async_engine) as async_session:
+                ids = await insert_quotes(async_session, quotes)
+                await async_session.commit()
+                return ids
+
+        ids = asyncio.run(insert())
+
+        assert ids == [2, 1, 2, 3]
+        assert session.exec(select(func.count(Quote.id))).one() == 3
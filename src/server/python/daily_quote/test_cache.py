@@ -0,0 +1,130 @@
+# test_cache.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the in-memory caches in the 'daily_quote' project.
+
+This test suite verifies the eviction order, the expiry of entries and the
+detection of writes from other connections.
+"""
+
+import sqlite3
+import time
+from .cache import LRUCache, ResponseCache
+
+
+class TestCache:
+    """
+    A test class for the LRU and response caches.
+    """
+
+    def test_eviction(self):
+        """
+        Test that the least recently used entry is evicted first.
+        """
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+        assert cache.stats() == {"size": 2, "hits": 3, "misses": 1,
+                                 "evictions": 1}
+
+    def test_expiry(self):
+        """
+        Test that entries older than the time to live are not returned.
+        """
+        cache = LRUCache(ttl=-1)
+        cache.set("a", 1)
+
+        assert cache.get("a") is None
+
+    def test_data_version(self, tmp_path):
+        """
+        Test that a commit from another connection clears the cache.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        database = str(tmp_path / "test.db")
+        writer = sqlite3.connect(database)
+        writer.execute("CREATE TABLE t (x)")
+        writer.commit()
+        cache = ResponseCache()
+        cache.validate(database)
+        cache.set("a", 1)
+
+        cache.validate(database)
+        assert cache.get("a") == 1
+
+        writer.execute("INSERT INTO t VALUES (1)")
+        writer.commit()
+        cache.validate(database)
+        assert cache.get("a") is None
+
+        cache.close()
+        writer.close()
+
+    def test_generation(self):
+        """
+        Test that a value read before the cache was cleared is not cached.
+        """
+        cache = ResponseCache()
+        generation = cache.generation
+
+        cache.set("a", 1, generation)
+        cache.clear()
+        cache.set("b", 2, generation)
+        cache.set("c", 3, cache.generation)
+
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert cache.get("c") == 3
+
+    def test_data_version_busy(self, tmp_path):
+        """
+        Test that the cache is cleared at once, instead of waiting, when
+        another connection locks the database.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        database = str(tmp_path / "test.db")
+        writer = sqlite3.connect(database, isolation_level=None)
+        writer.execute("CREATE TABLE t (x)")
+        cache = ResponseCache()
+        cache.validate(database)
+        cache.set("a", 1)
+
+        writer.execute("BEGIN EXCLUSIVE")
+        writer.execute("INSERT INTO t VALUES (1)")
+        start = time.monotonic()
+        cache.validate(database)
+
+        assert time.monotonic() - start < 1
+        assert cache.get("a") is None
+        writer.execute("COMMIT")
+        cache.validate(database)
+        cache.set("a", 1)
+        cache.validate(database)
+        assert cache.get("a") == 1
+
+        cache.close()
+        writer.close()
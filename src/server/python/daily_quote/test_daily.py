@@ -0,0 +1,69 @@
+# test_daily.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the quote of the day in the 'daily_quote' project.
+
+This test suite verifies that the background precomputation of the quote of
+the day keeps running after a failed attempt.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+from . import daily
+from .daily import DailyQuoteCache, pick_daily_quote
+from .quote_model import Quote
+
+
+class TestDaily:
+    """
+    A test class for the quote of the day.
+    """
+
+    def test_run_error(self, session: Session, async_engine, monkeypatch):
+        """
+        Test that a failed precomputation is retried.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+            monkeypatch (MonkeyPatch): The pytest fixture to patch the picks.
+        """
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+        cache = DailyQuoteCache(retry_interval=0.05)
+        failures = []
+
+        async def pick_once_failing(session, day):
+            if not failures:
+                failures.append(day)
+                raise OperationalError("INSERT", {}, Exception("locked"))
+            return await pick_daily_quote(session, day)
+
+        monkeypatch.setattr(daily, "pick_daily_quote", pick_once_failing)
+
+        async def run():
+            task = asyncio.create_task(cache.run(async_engine))
+            await asyncio.sleep(0.3)
+            task.cancel()
+
+        asyncio.run(run())
+        today = datetime.now(timezone.utc).date()
+
+        assert failures == [today]
+        assert cache._quotes[today].text == "Hello World!"
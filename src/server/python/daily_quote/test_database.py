@@ -0,0 +1,230 @@
+# test_database.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the database engines and settings of the 'daily_quote'
+project.
+
+This test suite verifies that the settings are read from the environment,
+that the engines apply them to every connection, that they record their
+statements in the metrics, and that the schema is created once and older
+databases are brought up to date.
+"""
+
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel
+from . import metrics
+from .database import (
+    create_async_engines, create_schema, create_sync_engine, database_file)
+from .schema import SCHEMA_VERSION
+from .settings import Settings
+
+
+class TestDatabase:
+    """
+    A test class for the database engines and settings.
+    """
+
+    def test_settings_from_env(self):
+        """
+        Test that environment variables override the defaults.
+        """
+        settings = Settings.from_env({
+            "DAILY_QUOTE_DATABASE_PATH": "/tmp/quotes.db",
+            "DAILY_QUOTE_ECHO": "true",
+            "DAILY_QUOTE_READ_POOL_SIZE": "3",
+            "DAILY_QUOTE_POOL_TIMEOUT": "1.5",
+        })
+
+        assert settings.database_path == "/tmp/quotes.db"
+        assert settings.echo is True
+        assert settings.read_pool_size == 3
+        assert settings.pool_timeout == 1.5
+        assert settings.journal_mode == Settings.journal_mode
+
+    def test_pragmas(self, tmp_path):
+        """
+        Test that new connections are tuned with the configured pragmas.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        settings = Settings(database_path=str(tmp_path / "test.db"),
+                            busy_timeout=1234)
+        engine = create_sync_engine(settings)
+
+        with engine.connect() as connection:
+            journal_mode = connection.exec_driver_sql(
+                "PRAGMA journal_mode").scalar()
+            busy_timeout = connection.exec_driver_sql(
+                "PRAGMA busy_timeout").scalar()
+        engine.dispose()
+
+        assert journal_mode == "wal"
+        assert busy_timeout == 1234
+
+    def test_read_only_engine(self, tmp_path):
+        """
+        Test that the read-only engine reads but cannot write.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        settings = Settings(database_path=str(tmp_path / "test.db"))
+        engine = create_sync_engine(settings)
+        SQLModel.metadata.create_all(engine)
+        engine.dispose()
+        write_engine, read_engine = create_async_engines(settings)
+
+        async def run():
+            async with read_engine.connect() as connection:
+                count = (await connection.exec_driver_sql(
+                    "SELECT count(*) FROM quote")).scalar()
+                with pytest.raises(OperationalError):
+                    await connection.exec_driver_sql(
+                        "INSERT INTO quote (author, text) VALUES ('a', 'b')")
+            await read_engine.dispose()
+            await write_engine.dispose()
+            return count
+
+        assert asyncio.run(run()) == 0
+        assert database_file(read_engine) == settings.database_path
+        assert database_file(write_engine) == settings.database_path
+
+    def test_metrics(self, tmp_path):
+        """
+        Test that the engines count and time their statements and checkouts.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        settings = Settings(database_path=str(tmp_path / "test.db"))
+        engine = create_sync_engine(settings)
+        SQLModel.metadata.create_all(engine)
+        engine.dispose()
+        write_engine, read_engine = create_async_engines(settings)
+        labels = ("read", "SELECT")
+        statements = metrics.statements_total.value(labels)
+        durations = metrics.statement_duration.count(labels)
+        checkouts = metrics.pool_wait.count(("read",))
+
+        async def run():
+            async with read_engine.connect() as connection:
+                await connection.exec_driver_sql("SELECT count(*) FROM quote")
+                with pytest.raises(OperationalError):
+                    await connection.exec_driver_sql("SELECT * FROM missing")
+            await read_engine.dispose()
+            await write_engine.dispose()
+
+        asyncio.run(run())
+
+        assert metrics.statements_total.value(labels) == statements + 1
+        assert metrics.statement_duration.count(labels) == durations + 1
+        assert metrics.pool_wait.count(("read",)) == checkouts + 1
+
+    def test_create_schema(self, tmp_path):
+        """
+        Test that the schema is only created or updated when the version
+        stamped in the database is not current.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        path = tmp_path / "test.db"
+        engine = create_sync_engine(Settings(database_path=str(path)))
+        trigger = ("SELECT count(*) FROM sqlite_master "
+                   "WHERE name = 'author_after_insert'")
+
+        assert create_schema(engine)
+        with sqlite3.connect(path) as connection:
+            assert connection.execute(
+                "PRAGMA user_version").fetchone() == (SCHEMA_VERSION,)
+            connection.execute("DROP TRIGGER author_after_insert")
+        connection.close()
+        assert not create_schema(engine)
+        with sqlite3.connect(path) as connection:
+            assert connection.execute(trigger).fetchone() == (0,)
+            connection.execute("PRAGMA user_version = 0")
+        connection.close()
+        assert create_schema(engine)
+        engine.dispose()
+
+        with sqlite3.connect(path) as connection:
+            assert connection.execute(trigger).fetchone() == (1,)
+        connection.close()
+
+    def test_create_schema_concurrently(self, tmp_path):
+        """
+        Test that workers starting together against a new database create
+        it once, without failing.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        settings = Settings(database_path=str(tmp_path / "test.db"))
+        engines = [create_sync_engine(settings) for _ in range(4)]
+        barrier = threading.Barrier(len(engines))
+
+        def start(engine) -> bool:
+            barrier.wait()
+            return create_schema(engine)
+
+        with ThreadPoolExecutor(len(engines)) as executor:
+            created = list(executor.map(start, engines))
+        for engine in engines:
+            engine.dispose()
+
+        assert created.count(True) == 1
+
+    def test_quote_count_migration(self, tmp_path):
+        """
+        Test that databases created before the quote count get it, and the
+        triggers maintaining it.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        path = tmp_path / "test.db"
+        with sqlite3.connect(path) as connection:
+            connection.execute("CREATE TABLE quote (id INTEGER PRIMARY KEY, "
+                               "author VARCHAR, text VARCHAR)")
+            connection.execute("CREATE TABLE quote_stats (id INTEGER "
+                               "PRIMARY KEY, version INTEGER, "
+                               "modified_at INTEGER)")
+            connection.execute("INSERT INTO quote_stats VALUES (1, 2, 0)")
+            connection.executemany(
+                "INSERT INTO quote (author, text) VALUES (?, ?)",
+                [("John Doe", "Hello"), ("Jane Doe", "World")])
+        connection.close()
+        engine = create_sync_engine(Settings(database_path=str(path)))
+        SQLModel.metadata.create_all(engine)
+        engine.dispose()
+
+        with sqlite3.connect(path) as connection:
+            count = connection.execute(
+                "SELECT quote_count FROM quote_stats").fetchone()[0]
+            connection.execute("INSERT INTO quote (author, text) "
+                               "VALUES ('John Doe', 'Again')")
+            stats = connection.execute(
+                "SELECT version, quote_count FROM quote_stats").fetchone()
+        connection.close()
+        assert count == 2
+        assert stats == (3, 3)
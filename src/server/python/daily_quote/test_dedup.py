@@ -0,0 +1,87 @@
+# test_dedup.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the deduplication of quotes in the 'daily_quote' project.
+
+This test suite verifies that the content hash ignores differences of case
+and whitespace, and that databases created before it can be backfilled.
+"""
+
+import sqlite3
+from sqlmodel import SQLModel, create_engine
+from .dedup import backfill_content_hashes
+from .quote_model import content_hash
+from .search import rebuild_index
+
+
+class TestDedup:
+    """
+    A test class for the deduplication of quotes.
+    """
+
+    def test_content_hash(self):
+        """
+        Test that the hash only depends on the normalized content.
+        """
+        assert content_hash("John Doe", "Hello World!") == \
+            content_hash(" JOHN  doe", "hello\tworld!\n")
+        assert content_hash("John Doe", "Hello World!") != \
+            content_hash("John Doe", "Hello World")
+        assert content_hash("a b", "c") != content_hash("a", "b c")
+        assert len(content_hash("John Doe", "Hello World!")) == 16
+
+    def test_backfill(self, tmp_path):
+        """
+        Test that quotes stored before the hash existed get one, and that
+        their duplicates are found and deleted.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        database = str(tmp_path / "test.db")
+        with sqlite3.connect(database) as connection:
+            connection.execute("CREATE TABLE quote (id INTEGER PRIMARY KEY, "
+                               "author VARCHAR, text VARCHAR)")
+            connection.executemany(
+                "INSERT INTO quote (author, text) VALUES (?, ?)",
+                [("John Doe", "Hello World!"),
+                 ("Lewis Hamilton", "Still we rise!"),
+                 ("john doe", "Hello world!"),
+                 ("John Doe", "Hello again!"),
+                 ("JOHN DOE", "HELLO WORLD!")])
+        connection.close()
+        # Creating the tables adds the missing column, as the application
+        # does when it starts, and the search index is built as a database
+        # this old would need.
+        engine = create_engine(f"sqlite:///{database}")
+        SQLModel.metadata.create_all(engine)
+        engine.dispose()
+        rebuild_index(database)
+
+        hashed, duplicates = backfill_content_hashes(database, batch_size=2)
+        again = backfill_content_hashes(database, delete_duplicates=True)
+
+        assert (hashed, duplicates) == (3, [3, 5])
+        assert again == (0, [3, 5])
+        with sqlite3.connect(database) as connection:
+            rows = connection.execute(
+                "SELECT id, content_hash FROM quote ORDER BY id").fetchall()
+        connection.close()
+        assert rows == [
+            (1, content_hash("John Doe", "Hello World!")),
+            (2, content_hash("Lewis Hamilton", "Still we rise!")),
+            (4, content_hash("John Doe", "Hello again!"))]
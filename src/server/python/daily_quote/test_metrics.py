@@ -0,0 +1,97 @@
+# test_metrics.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the metrics of the 'daily_quote' project.
+
+This test suite verifies that counters, gauges and histograms are rendered
+in the Prometheus text format.
+"""
+
+from . import metrics
+from .cache import LRUCache
+from .metrics import (
+    CallbackMetric, Counter, Gauge, Histogram, Registry, _cache_hit_ratio)
+
+
+class TestMetrics:
+    """
+    A test class for the metrics.
+    """
+
+    def test_counter_and_gauge(self):
+        """
+        Test that counters and gauges render one sample per label values.
+        """
+        registry = Registry()
+        counter = registry.register(Counter(
+            "requests_total", "Requests.", ("route",)))
+        gauge = registry.register(Gauge("in_flight", "In flight."))
+        counter.inc(("read_quotes",))
+        counter.inc(("read_quotes",), 2)
+        counter.inc(('say "hi"',))
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+
+        assert registry.render().splitlines() == [
+            "# HELP requests_total Requests.",
+            "# TYPE requests_total counter",
+            'requests_total{route="read_quotes"} 3',
+            'requests_total{route="say \\"hi\\""} 1',
+            "# HELP in_flight In flight.",
+            "# TYPE in_flight gauge",
+            "in_flight 1",
+        ]
+
+    def test_histogram(self):
+        """
+        Test that histograms render cumulative buckets, a sum and a count.
+        """
+        histogram = Histogram("latency_seconds", "Latency.", ("route",),
+                              buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, ("daily",))
+
+        assert histogram.count(("daily",)) == 4
+        assert histogram.render()[2:] == [
+            'latency_seconds_bucket{route="daily",le="0.1"} 2',
+            'latency_seconds_bucket{route="daily",le="1"} 3',
+            'latency_seconds_bucket{route="daily",le="+Inf"} 4',
+            'latency_seconds_sum{route="daily"} 2.65',
+            'latency_seconds_count{route="daily"} 4',
+        ]
+
+    def test_callback(self, monkeypatch):
+        """
+        Test that callback metrics read their values when rendered, such as
+        the hit ratio of a cache.
+
+        Args:
+            monkeypatch (MonkeyPatch): The pytest fixture restoring the
+            watched caches after the test.
+        """
+        cache = LRUCache()
+        monkeypatch.setitem(metrics._caches, "test", cache)
+        metric = CallbackMetric("cache_hit_ratio", "Hit ratio.", "gauge",
+                                ("cache",), _cache_hit_ratio)
+        cache.set("key", "value")
+        cache.get("key")
+        cache.get("key")
+        cache.get("other")
+
+        assert 'cache_hit_ratio{cache="test"} 0.6666666666666666' in \
+            metric.render()
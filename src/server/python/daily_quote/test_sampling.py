@@ -0,0 +1,99 @@
+# test_sampling.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the random quote sampling in the 'daily_quote' project.
+
+This test suite verifies that rejection sampling copes with gaps in the
+range of quote IDs and never returns the same quote twice.
+"""
+
+import asyncio
+import random
+from collections import Counter
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .quote_model import Quote
+from .sampling import SMALL_RANGE, sample_quotes
+
+
+def sample(async_engine, n: int, rng: random.Random, times: int = 1):
+    """
+    Run the sampling against the test database.
+
+    Args:
+        async_engine (AsyncEngine): The asynchronous test database engine.
+        n (int): The number of quotes to draw.
+        rng (random.Random): The random number generator to draw IDs with.
+        times (int): The number of times to run the sampling.
+
+    Returns:
+        List[List[QuoteResponse]]: The drawn quotes, for each run.
+    """
+    async def run():
+        async with AsyncSession(async_engine) as session:
+            return [await sample_quotes(session, n, rng)
+                    for _ in range(0, times)]
+
+    return asyncio.run(run())
+
+
+class TestSampling:
+    """
+    A test class for the random quote sampling.
+    """
+
+    def test_sparse_range(self, session: Session, async_engine):
+        """
+        Test that every quote can be drawn when half of the IDs are missing.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+        """
+        ids = list(range(1, 2 * SMALL_RANGE, 2))
+        for id in ids:
+            session.add(Quote(id=id, author="John Doe", text=f"Quote {id}"))
+        session.commit()
+
+        quotes, = sample(async_engine, len(ids) + 10, random.Random(42))
+
+        assert sorted(quote.id for quote in quotes) == ids
+
+    def test_uniform(self, session: Session, async_engine):
+        """
+        Test that quotes next to large gaps are not drawn more often.
+
+        Seeking to the first ID after a random point would pick the quote
+        after the gap almost every time, rejection sampling must not.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+        """
+        after_gap = 3 * SMALL_RANGE
+        ids = list(range(1, SMALL_RANGE)) + \
+            list(range(after_gap, 4 * SMALL_RANGE))
+        session.add_all(
+            Quote(id=id, author="John Doe", text=f"Quote {id}") for id in ids)
+        session.commit()
+        draws = sample(async_engine, 1, random.Random(42), times=200)
+
+        counts = Counter(quotes[0].id for quotes in draws)
+
+        assert sum(counts.values()) == 200
+        assert set(counts) <= set(ids)
+        assert counts[after_gap] < 5
@@ -0,0 +1,75 @@
+# test_search.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the full-text search helpers in the 'daily_quote' project.
+
+This test suite verifies the translation of user queries to FTS5 queries,
+the cursors, and the rebuild of the index of an existing database.
+"""
+
+import sqlite3
+import pytest
+from .search import (
+    build_match_query, decode_cursor, encode_cursor, rebuild_index)
+
+
+class TestSearch:
+    """
+    A test class for the full-text search helpers.
+    """
+
+    def test_build_match_query(self):
+        """
+        Test that terms are quoted and prefixes are kept.
+        """
+        assert build_match_query('still "rise" OR wor*') == \
+            '"still" "rise" "OR" "wor"*'
+        assert build_match_query("still rise", prefix=True) == \
+            '"still"* "rise"*'
+        with pytest.raises(ValueError):
+            build_match_query("*?")
+
+    def test_cursor(self):
+        """
+        Test that a cursor decodes to the values it was made from.
+        """
+        assert decode_cursor(encode_cursor(-1.5, 42)) == (-1.5, 42)
+        with pytest.raises(ValueError):
+            decode_cursor("not a cursor")
+
+    def test_rebuild_index(self, tmp_path):
+        """
+        Test that the index of a database created without it is built.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        database = str(tmp_path / "old.db")
+        with sqlite3.connect(database) as connection:
+            connection.execute("CREATE TABLE quote (id INTEGER PRIMARY KEY, "
+                               "author VARCHAR, text VARCHAR)")
+            connection.execute("INSERT INTO quote (author, text) VALUES "
+                               "('John Doe', 'Hello World!')")
+        connection.close()
+
+        rebuild_index(database)
+
+        with sqlite3.connect(database) as connection:
+            rows = connection.execute("SELECT rowid FROM quote_fts WHERE "
+                                      "quote_fts MATCH 'world'").fetchall()
+        connection.close()
+        assert rows == [(1,)]
@@ -0,0 +1,80 @@
+# test_serialization.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the JSON serialization of the 'daily_quote' project.
+
+This test suite verifies that quote rows are encoded exactly as the
+response model would encode them, and decoded back, with and without
+'orjson'.
+"""
+
+from typing import List
+import json
+import pytest
+from pydantic import TypeAdapter
+from . import serialization
+from .quote_model import QuoteResponse
+from .serialization import dump_quote_rows, loads
+
+ROWS = [(1, "John Doe", "Hello World!"),
+        (2, "Søren Kierkegaard", 'Life is "lived" forwards…\n'),
+        (3, "", "\\   \U0001F600")]
+
+
+class TestSerialization:
+    """
+    A test class for the JSON serialization.
+    """
+
+    @pytest.mark.parametrize("orjson", [serialization.orjson, None])
+    def test_dump_quote_rows(self, monkeypatch, orjson):
+        """
+        Test that rows are encoded like a list of 'QuoteResponse'.
+
+        Args:
+            monkeypatch (MonkeyPatch): The pytest fixture used to disable
+            'orjson'.
+            orjson (Optional[ModuleType]): The 'orjson' module, or None to
+            use the standard library encoder.
+        """
+        monkeypatch.setattr(serialization, "orjson", orjson)
+        expected = TypeAdapter(List[QuoteResponse]).dump_json(
+            [QuoteResponse(id=id, author=author, text=text)
+             for id, author, text in ROWS])
+
+        assert dump_quote_rows(ROWS) == expected
+        assert dump_quote_rows([]) == b"[]"
+
+    @pytest.mark.parametrize("orjson", [serialization.orjson, None])
+    def test_loads(self, monkeypatch, orjson):
+        """
+        Test that encoded quotes are decoded back, and that malformed
+        documents raise the standard library error.
+
+        Args:
+            monkeypatch (MonkeyPatch): The pytest fixture used to disable
+            'orjson'.
+            orjson (Optional[ModuleType]): The 'orjson' module, or None to
+            use the standard library decoder.
+        """
+        monkeypatch.setattr(serialization, "orjson", orjson)
+
+        assert loads(dump_quote_rows(ROWS)) == [
+            {"author": author, "text": text, "id": id}
+            for id, author, text in ROWS]
+        with pytest.raises(json.JSONDecodeError):
+            loads('{"author": ')
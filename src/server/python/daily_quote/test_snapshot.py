@@ -0,0 +1,132 @@
+# test_snapshot.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the quote snapshot of the 'daily_quote' project.
+
+This test suite verifies that a snapshot serves the same pages and quotes by
+ID as the database it was built from, that it draws random quotes from it,
+and that it is rebuilt and mapped again when the quote table changes.
+"""
+
+import random
+from sqlmodel import Session, delete, select
+from .quote_model import Quote
+from .serialization import dump_quote_rows
+from .snapshot import QuoteSnapshot, SnapshotManager, build_snapshot
+
+
+def fill(session: Session):
+    """
+    Store quotes with gaps in their IDs and non-ASCII text.
+
+    Args:
+        session (Session): The session to store the quotes with.
+    """
+    session.add_all([Quote(author=f"Author {i % 7}", text=f"Quote n°{i} ✓")
+                     for i in range(1, 201)])
+    session.commit()
+    session.exec(delete(Quote).where(Quote.id % 3 == 0))
+    session.commit()
+
+
+class TestSnapshot:
+    """
+    A test class for the quote snapshot.
+    """
+
+    def test_page(self, session: Session, database_path, tmp_path):
+        """
+        Test that pages match the ones encoded from the database.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            database_path (Path): The path of the test database file.
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        fill(session)
+        path = str(tmp_path / "quotes.snapshot")
+        version = build_snapshot(str(database_path), path)
+        snapshot = QuoteSnapshot(path)
+        rows = session.exec(
+            select(Quote.id, Quote.author, Quote.text).order_by(Quote.id)
+        ).all()
+
+        assert snapshot.version == version > 0
+        assert snapshot.count == len(rows)
+        for offset, limit, after_id in [(0, 10, None), (125, 10, None),
+                                        (130, 10, None), (500, 10, None),
+                                        (0, 10, 99), (5, 100, 2),
+                                        (0, 10, 300)]:
+            expected = [row for row in rows
+                        if after_id is None or row[0] > after_id]
+            expected = expected[offset:offset + limit]
+            body, last_id = snapshot.page(offset, limit, after_id)
+            assert body == dump_quote_rows(expected)
+            assert last_id == (expected[-1][0] if len(expected) == limit
+                               else None)
+        assert snapshot.find(3) is None
+        assert snapshot.quote(snapshot.find(200)).text == "Quote n°200 ✓"
+        snapshot.close()
+
+    def test_sample(self, session: Session, database_path, tmp_path):
+        """
+        Test that random quotes are distinct and stored.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            database_path (Path): The path of the test database file.
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        fill(session)
+        path = str(tmp_path / "quotes.snapshot")
+        build_snapshot(str(database_path), path)
+        snapshot = QuoteSnapshot(path)
+
+        drawn = snapshot.sample(50, random.Random(0))
+        ids = set(session.exec(select(Quote.id)).all())
+        assert len({quote.id for quote in drawn}) == 50
+        assert {quote.id for quote in drawn} <= ids
+        snapshot.close()
+
+    def test_refresh(self, session: Session, database_path, tmp_path):
+        """
+        Test that the snapshot is only rebuilt when the table changed, and
+        that the previous mapping stays readable until it is replaced.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            database_path (Path): The path of the test database file.
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        manager = SnapshotManager(str(tmp_path / "quotes.snapshot"))
+        session.add(Quote(author="John Doe", text="Hello World!"))
+        session.commit()
+
+        assert manager.refresh(str(database_path)) is True
+        assert manager.refresh(str(database_path)) is False
+        manager.reload()
+        first = manager.current
+        session.add(Quote(author="John Doe", text="Hello again!"))
+        session.commit()
+        assert manager.refresh(str(database_path)) is True
+        assert first.count == 1 and first.page(0, 10)[0].startswith(b"[{")
+        manager.reload()
+
+        assert manager.current is not first
+        assert manager.current.count == 2
+        assert manager.builds == 2
+        manager.close()
@@ -0,0 +1,166 @@
+# test_stream.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the streaming of new quotes in the 'daily_quote' project.
+
+This test suite verifies that the broadcaster fans quotes out to every
+subscriber, disconnects the slow ones, follows the quote table even after a
+failed read, and that streams resume from the last event ID without
+repeating quotes.
+"""
+
+import asyncio
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+from . import stream
+from .quote_model import Quote
+from .serialization import dump_quote
+from .stream import (
+    QuoteBroadcaster, event_stream, format_event, read_quotes_after)
+
+
+class TestStream:
+    """
+    A test class for the broadcaster and the event streams.
+    """
+
+    def test_publish(self):
+        """
+        Test that events reach every subscriber, and that a subscriber whose
+        buffer is full is evicted once it has read it.
+        """
+        broadcaster = QuoteBroadcaster(buffer_size=2)
+
+        async def run():
+            fast = broadcaster.subscribe()
+            slow = broadcaster.subscribe()
+            received = []
+            for id in range(1, 4):
+                broadcaster.publish((id, b"{}"))
+                received.append(await fast.get(1))
+            return received, [await slow.get(1) for _ in range(3)]
+
+        received, slow_received = asyncio.run(run())
+
+        assert [event[0] for event in received] == [1, 2, 3]
+        assert [event and event[0] for event in slow_received] == [1, 2, None]
+        assert broadcaster.evictions == 1
+        assert broadcaster.subscribers == 1
+
+    def test_run(self, session: Session, async_engine):
+        """
+        Test that the broadcaster publishes the quotes added after it started,
+        in ID order.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+        """
+        session.add(Quote(author="John Doe", text="Old"))
+        session.commit()
+        broadcaster = QuoteBroadcaster(interval=10.0)
+
+        async def run():
+            subscription = broadcaster.subscribe()
+            task = asyncio.create_task(broadcaster.run(async_engine))
+            await asyncio.sleep(0.1)
+            session.add_all([Quote(author="John Doe", text=text)
+                             for text in ("New", "Newer")])
+            session.commit()
+            broadcaster.notify()
+            events = [await subscription.get(1) for _ in range(2)]
+            task.cancel()
+            return events
+
+        events = asyncio.run(run())
+
+        assert events == [(2, dump_quote(2, "John Doe", "New")),
+                          (3, dump_quote(3, "John Doe", "Newer"))]
+
+    def test_run_error(self, session: Session, async_engine, monkeypatch):
+        """
+        Test that the broadcaster keeps publishing after a failed read.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+            monkeypatch (MonkeyPatch): The pytest fixture to patch the reads.
+        """
+        broadcaster = QuoteBroadcaster(interval=10.0)
+        failures = []
+
+        async def read_once_failing(session, last_id):
+            if not failures:
+                failures.append(last_id)
+                raise OperationalError("SELECT", {}, Exception("locked"))
+            return await read_quotes_after(session, last_id)
+
+        monkeypatch.setattr(stream, "read_quotes_after", read_once_failing)
+
+        async def run():
+            subscription = broadcaster.subscribe()
+            task = asyncio.create_task(broadcaster.run(async_engine))
+            await asyncio.sleep(0.1)
+            session.add(Quote(author="John Doe", text="New"))
+            session.commit()
+            broadcaster.notify()
+            await asyncio.sleep(0.1)
+            broadcaster.notify()
+            event = await subscription.get(1)
+            task.cancel()
+            return event
+
+        event = asyncio.run(run())
+
+        assert failures == [0]
+        assert event == (1, dump_quote(1, "John Doe", "New"))
+
+    def test_event_stream(self, session: Session, async_engine):
+        """
+        Test that a resumed stream sends the missed quotes, then the live
+        ones, each once.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+        """
+        session.add_all([Quote(author="John Doe", text=str(i))
+                         for i in range(3)])
+        session.commit()
+        broadcaster = QuoteBroadcaster()
+
+        async def run():
+            stream = event_stream(broadcaster, async_engine, last_event_id=1,
+                                  keepalive=0.01)
+            chunks = [await stream.__anext__() for _ in range(3)]
+            # Already sent from the database, then a live quote.
+            broadcaster.publish((3, b"{}"))
+            broadcaster.publish((4, b"{}"))
+            chunks.append(await stream.__anext__())
+            chunks.append(await stream.__anext__())
+            broadcaster.close()
+            chunks.extend([chunk async for chunk in stream])
+            return chunks
+
+        chunks = asyncio.run(run())
+
+        assert chunks[0] == b"retry: 1000\n\n"
+        assert chunks[1] == format_event((2, dump_quote(2, "John Doe", "1")))
+        assert chunks[2] == format_event((3, dump_quote(3, "John Doe", "2")))
+        assert chunks[3] == b"id: 4\nevent: quote\ndata: {}\n\n"
+        assert set(chunks[4:]) <= {b": keepalive\n\n"}
+        assert broadcaster.subscribers == 0
@@ -0,0 +1,142 @@
+# test_transfer.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the import and export of quotes in the 'daily_quote' project.
+
+This test suite verifies that imports skip duplicates and leave the search
+index, the author table and the triggers as row by row inserts would, that
+failed imports change nothing, and that exports restore the same quotes.
+"""
+
+import io
+import sqlite3
+import pytest
+from .transfer import export_quotes, import_quotes, read_csv, read_jsonl
+
+JSONL = b"""{"author": "John Doe", "text": "Hello World!"}
+{"author": "Jane Doe", "text": "Goodbye World!", "id": 7}
+
+{"author": "JOHN DOE", "text": "hello  world!"}
+"""
+
+
+def _query(database: str, sql: str) -> list:
+    with sqlite3.connect(database) as connection:
+        rows = connection.execute(sql).fetchall()
+    connection.close()
+    return rows
+
+
+class TestTransfer:
+    """
+    A test class for the import and export of quotes.
+    """
+
+    def test_import(self, tmp_path):
+        """
+        Test that imported quotes are deduplicated, searchable, counted per
+        author, and that the triggers still apply afterwards.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        database = str(tmp_path / "test.db")
+
+        assert import_quotes(
+            database, read_jsonl(io.BytesIO(JSONL))) == (2, 1)
+        assert import_quotes(database, [(None, "Jane Doe", "Hi!")]) == (1, 0)
+        with sqlite3.connect(database) as connection:
+            connection.execute("INSERT INTO quote (author, text) "
+                               "VALUES ('John Doe', 'Bye!')")
+        connection.close()
+
+        assert _query(database, "SELECT id, author, text FROM quote") == [
+            (1, "John Doe", "Hello World!"), (2, "Jane Doe", "Goodbye World!"),
+            (3, "Jane Doe", "Hi!"), (4, "John Doe", "Bye!")]
+        assert _query(database, "SELECT rowid FROM quote_fts "
+                      "WHERE quote_fts MATCH 'world OR hi OR bye'") == [
+            (1,), (2,), (3,), (4,)]
+        assert _query(database, "SELECT name, quote_count FROM author "
+                      "ORDER BY name") == [("Jane Doe", 2), ("John Doe", 2)]
+        assert _query(database, "SELECT version, quote_count FROM quote_stats") == [
+            (3, 4)]
+        assert _query(database, "SELECT v FROM quote_fts_config "
+                      "WHERE k = 'hashsize'") in ([], [(1024 * 1024,)])
+
+    def test_import_ids(self, tmp_path):
+        """
+        Test that quotes keep their ID when restored into an empty database,
+        and that they are refused, changing nothing, otherwise.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+        """
+        database = str(tmp_path / "test.db")
+        data = io.StringIO("text,id,author\nHi!,7,Jane Doe\nBye!,3,John Doe\n")
+
+        assert import_quotes(database, read_csv(data, keep_ids=True)) == (
+            2, 0)
+        assert _query(database, "SELECT id, text FROM quote") == [
+            (3, "Bye!"), (7, "Hi!")]
+        with pytest.raises(ValueError):
+            import_quotes(database, [(8, "Jane Doe", "New")])
+        assert _query(database, "SELECT count(*) FROM quote") == [(2,)]
+        assert len(_query(database, "SELECT name FROM sqlite_master "
+                          "WHERE type = 'trigger'")) == 9
+
+    def test_read_malformed(self):
+        """
+        Test that malformed lines are reported with their number.
+        """
+        with pytest.raises(ValueError, match="Line 2"):
+            list(read_jsonl(io.BytesIO(b'{"author": "a", "text": "b"}\n[]')))
+        with pytest.raises(ValueError, match="Line 1"):
+            list(read_jsonl(io.BytesIO(b'{"author": "a", "text": 1}')))
+        with pytest.raises(ValueError, match="Line 2"):
+            list(read_csv(io.StringIO("author,text\na\n")))
+        with pytest.raises(ValueError, match="id"):
+            list(read_csv(io.StringIO("author,text\n"), keep_ids=True))
+
+    @pytest.mark.parametrize("format", ["csv", "jsonl"])
+    def test_export(self, tmp_path, format):
+        """
+        Test that an export restores the same quotes into a new database.
+
+        Args:
+            tmp_path (Path): The pytest temporary directory for the test.
+            format (str): The format of the export.
+        """
+        database = str(tmp_path / "test.db")
+        quotes = [(None, "John Doe", 'Hello, "World"!\n'),
+                  (None, "Søren", "…"), (None, "Jane Doe", "Bye!")]
+        import_quotes(database, quotes)
+        with sqlite3.connect(database) as connection:
+            connection.execute("DELETE FROM quote WHERE id = 2")
+        connection.close()
+        file = io.BytesIO()
+
+        assert export_quotes(database, file, format) == 2
+
+        file.seek(0)
+        if format == "csv":
+            rows = read_csv(io.TextIOWrapper(file, newline=""), keep_ids=True)
+        else:
+            rows = read_jsonl(file, keep_ids=True)
+        copy = str(tmp_path / "copy.db")
+        import_quotes(copy, rows)
+        assert _query(copy, "SELECT id, author, text FROM quote") == [
+            (1, "John Doe", 'Hello, "World"!\n'), (3, "Jane Doe", "Bye!")]
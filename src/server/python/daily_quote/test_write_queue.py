@@ -0,0 +1,72 @@
+# test_write_queue.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+Test suite for the group commit writer in the 'daily_quote' project.
+
+This test suite verifies that concurrent submissions are committed in few
+transactions and that each submitter gets the ID of its own quote.
+"""
+
+import asyncio
+import pytest
+from sqlmodel import Session, select
+from .quote_model import Quote, QuoteRequest
+from .write_queue import GroupCommitWriter
+
+
+class TestWriteQueue:
+    """
+    A test class for the group commit writer.
+    """
+
+    def test_submit(self, session: Session, async_engine):
+        """
+        Test that concurrent quotes are batched and get their own IDs.
+
+        Args:
+            session (Session): A SQLModel session instance for database interaction.
+            async_engine (AsyncEngine): The asynchronous test database engine.
+        """
+        n = 20
+        writer = GroupCommitWriter(max_batch=8, max_delay=0.05)
+
+        async def run():
+            task = asyncio.create_task(writer.run(async_engine))
+            await asyncio.sleep(0)
+            ids = await asyncio.gather(*[
+                writer.submit(QuoteRequest(author="John Doe", text=str(i)))
+                for i in range(n)])
+            await writer.stop()
+            await task
+            return ids
+
+        ids = asyncio.run(run())
+
+        assert sorted(ids) == list(range(1, n + 1))
+        assert writer.batches < n
+        for i, id in enumerate(ids):
+            assert session.exec(
+                select(Quote.text).where(Quote.id == id)).one() == str(i)
+
+    def test_submit_not_running(self):
+        """
+        Test that quotes are rejected when the writer is not running.
+        """
+        writer = GroupCommitWriter()
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(writer.submit(QuoteRequest(author="a", text="b")))
@@ -0,0 +1,374 @@
+# transfer.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module imports and exports the quote database of the 'daily_quote'
+project as CSV or JSON Lines files.
+
+Files are streamed, so memory stays bounded whatever their size. Imports
+insert the quotes with raw executemany statements, in a single transaction
+that first drops the triggers of the quote table, and its secondary indexes
+when it is empty. The search index, the author table and the indexes are
+then updated in one pass each, which is far faster than maintaining them
+row by row, and the triggers and indexes are restored before committing. A
+failed import rolls everything back, the dropped triggers and indexes
+included.
+
+Quotes already stored, or repeated in the file, are skipped, keeping the
+oldest copy. Writes from the application wait for the import to finish.
+"""
+
+import csv
+import io
+import itertools
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Optional, Tuple
+from .database import create_schema, create_sync_engine
+from .quote_model import content_hash
+from .serialization import dump_quote, loads
+from .settings import Settings
+
+# The file formats, named after the extension of their files.
+FORMATS = ("csv", "jsonl")
+
+# The number of quotes inserted per executemany call.
+CHUNK_SIZE = 50_000
+
+# The memory, in bytes, the search index fills with new terms before writing
+# them out during imports, and by default. A larger buffer writes fewer
+# segments to merge, which makes indexing a large import several times
+# faster.
+FTS_HASH_SIZE = 64 * 1024 * 1024
+DEFAULT_FTS_HASH_SIZE = 1024 * 1024
+
+# A quote read from a file: its ID, or None if it has none or IDs are not
+# kept, its author and its text.
+Row = Tuple[Optional[int], str, str]
+
+
+class Progress:
+    """
+    Report of the progress of a transfer, written at most twice a second.
+
+    Attributes:
+        rows (int): The number of quotes transferred so far.
+    """
+
+    def __init__(self, verb: str, stream: IO[str] = sys.stderr,
+                 interval: float = 0.5):
+        self.rows = 0
+        self._verb = verb
+        self._stream = stream
+        self._interval = interval
+        self._start = self._last = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        """
+        float: The number of seconds since the transfer started.
+        """
+        return time.perf_counter() - self._start
+
+    def update(self, rows: int):
+        """
+        Count transferred quotes, and report the progress if it is time to.
+
+        Args:
+            rows (int): The number of quotes transferred since the last call.
+        """
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last >= self._interval:
+            self._last = now
+            self._write("\r")
+
+    def finish(self, message: str = ""):
+        """
+        Report the final count.
+
+        Args:
+            message (str): Text appended to the report.
+        """
+        self._write("\r")
+        self._stream.write(f"{message}\n")
+        self._stream.flush()
+
+    def _write(self, prefix: str):
+        elapsed = self.elapsed
+        rate = self.rows / elapsed if elapsed > 0 else 0.0
+        self._stream.write(f"{prefix}{self._verb} {self.rows} quotes in "
+                           f"{elapsed:.1f} s ({rate:,.0f} quotes/s)")
+        self._stream.flush()
+
+
+def _check_row(id, author, text, keep_ids: bool, line: int) -> Row:
+    if type(author) is not str or type(text) is not str:
+        raise ValueError(f"Line {line}: author and text must be strings")
+    if not keep_ids:
+        return None, author, text
+    if type(id) is str and id.isdigit():
+        id = int(id)
+    if type(id) is not int or id < 1:
+        raise ValueError(f"Line {line}: the ID must be a positive integer")
+    return id, author, text
+
+
+def read_csv(file: IO[str], keep_ids: bool = False) -> Iterator[Row]:
+    """
+    Read quotes from a CSV file.
+
+    The first line holds the column names, which must include 'author' and
+    'text', and 'id' when the IDs are kept. Other columns are ignored.
+
+    Args:
+        file (IO[str]): The file, opened with newline=''.
+        keep_ids (bool): Whether to read the IDs of the quotes.
+
+    Yields:
+        Row: The quotes.
+
+    Raises:
+        ValueError: If a column is missing or a row is malformed.
+    """
+    reader = csv.reader(file)
+    header = next(reader, None) or []
+    required = ("id", "author", "text") if keep_ids else ("author", "text")
+    missing = [name for name in required if name not in header]
+    if missing:
+        raise ValueError(f"Missing CSV columns: {', '.join(missing)}")
+    id_column = header.index("id") if keep_ids else None
+    author_column = header.index("author")
+    text_column = header.index("text")
+    width = max(author_column, text_column, id_column or 0)
+    for line, fields in enumerate(reader, 2):
+        if len(fields) <= width:
+            raise ValueError(f"Line {line}: expected {len(header)} fields")
+        yield _check_row(
+            fields[id_column] if keep_ids else None,
+            fields[author_column], fields[text_column], keep_ids, line)
+
+
+def read_jsonl(file: IO[bytes], keep_ids: bool = False) -> Iterator[Row]:
+    """
+    Read quotes from a JSON Lines file.
+
+    Each non-empty line holds a JSON object with 'author' and 'text' keys,
+    and an 'id' key when the IDs are kept. Other keys are ignored.
+
+    Args:
+        file (IO[bytes]): The file, opened in binary mode, which spares
+        decoding the lines before parsing them.
+        keep_ids (bool): Whether to read the IDs of the quotes.
+
+    Yields:
+        Row: The quotes.
+
+    Raises:
+        ValueError: If a line is not a JSON object with the expected keys.
+    """
+    for line, data in enumerate(file, 1):
+        if data.isspace():
+            continue
+        try:
+            item = loads(data)
+            id = item.get("id") if keep_ids else None
+            author, text = item["author"], item["text"]
+        except (AttributeError, KeyError, TypeError,
+                json.JSONDecodeError) as error:
+            raise ValueError(f"Line {line}: expected a JSON object with "
+                             f"'author' and 'text' keys ({error})") from None
+        yield _check_row(id, author, text, keep_ids, line)
+
+
+def import_quotes(database: str, rows: Iterable[Row],
+                  progress: Optional[Progress] = None) -> Tuple[int, int]:
+    """
+    Insert quotes in bulk, creating the database if needed.
+
+    Quotes with an ID are inserted with it, which is only allowed into an
+    empty database, so that a backup restores the same IDs.
+
+    Args:
+        database (str): The path of the SQLite database file.
+        rows (Iterable[Row]): The quotes to insert.
+        progress (Optional[Progress]): The report to update as quotes are
+        read.
+
+    Returns:
+        Tuple[int, int]: The number of quotes inserted and the number of
+        duplicates skipped.
+
+    Raises:
+        ValueError: If a row is malformed, or if quotes with an ID are
+        inserted into a database which already holds quotes.
+        sqlite3.IntegrityError: If two quotes have the same ID.
+    """
+    engine = create_sync_engine(Settings(database_path=database))
+    create_schema(engine)
+    engine.dispose()
+    connection = sqlite3.connect(database, isolation_level=None)
+    # These only apply to this connection, so the application keeps its own
+    # settings. A crash during the import may corrupt the database, as with
+    # any other 'synchronous = OFF' write, but the import is then retried
+    # from scratch anyway.
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.execute("PRAGMA cache_size = -524288")
+    connection.execute("PRAGMA temp_store = MEMORY")
+    try:
+        connection.execute("BEGIN IMMEDIATE")
+        result = _load(connection, rows, progress)
+        connection.execute("COMMIT")
+    except BaseException:
+        if connection.in_transaction:
+            connection.execute("ROLLBACK")
+        connection.close()
+        raise
+    # Fold the write-ahead log, which holds every written page, back into
+    # the database, and refresh the statistics of the query planner.
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connection.execute("PRAGMA optimize")
+    connection.close()
+    return result
+
+
+def _set_fts_hash_size(connection: sqlite3.Connection,
+                       size: int) -> Optional[int]:
+    # The search index buffers new terms in memory up to this size before
+    # writing them as a segment, which it later merges with the others.
+    # Returns the previous size, or None if this SQLite does not support it.
+    try:
+        previous = connection.execute(
+            "SELECT v FROM quote_fts_config WHERE k = 'hashsize'").fetchone()
+        connection.execute("INSERT INTO quote_fts (quote_fts, rank) "
+                           "VALUES ('hashsize', ?)", (size,))
+    except sqlite3.OperationalError:
+        return None
+    return previous[0] if previous else DEFAULT_FTS_HASH_SIZE
+
+
+def _load(connection: sqlite3.Connection, rows: Iterable[Row],
+          progress: Optional[Progress]) -> Tuple[int, int]:
+    last_id = connection.execute(
+        "SELECT coalesce(max(id), 0) FROM quote").fetchone()[0]
+    # Every trigger on the quote table is dropped, then created again from
+    # its definition, and their work is done in one pass over the imported
+    # quotes. When the table is empty, so are its indexes, which are dropped
+    # too and then built in one sort each. Indexing a few quotes one by one
+    # is faster than indexing a large table again, however. The unique index
+    # on the content hash is always kept, as it skips the duplicates.
+    deferred = connection.execute(
+        "SELECT type, name, sql FROM sqlite_master WHERE tbl_name = 'quote' "
+        "AND (type = 'trigger' OR type = 'index' AND ?) AND sql IS NOT NULL "
+        "AND name != 'ix_quote_content_hash'", (last_id == 0,)).fetchall()
+    for type, name, _ in deferred:
+        connection.execute(f'DROP {type.upper()} "{name}"')
+    read = inserted = 0
+    rows = iter(rows)
+    while True:
+        chunk = [(id, author, text, content_hash(author, text))
+                 for id, author, text in itertools.islice(rows, CHUNK_SIZE)]
+        if not chunk:
+            break
+        if chunk[0][0] is not None and last_id:
+            raise ValueError("Quotes can only be imported with their ID "
+                             "into an empty database")
+        inserted += connection.executemany(
+            "INSERT INTO quote (id, author, text, content_hash) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT (content_hash) DO NOTHING",
+            chunk).rowcount
+        read += len(chunk)
+        if progress is not None:
+            progress.update(len(chunk))
+    for _, _, sql in deferred:
+        connection.execute(sql)
+    # Imported quotes come after every stored one, whether they got a new
+    # ID or were imported into an empty database with theirs.
+    hash_size = _set_fts_hash_size(connection, FTS_HASH_SIZE)
+    connection.execute(
+        "INSERT INTO quote_fts (rowid, author, text) "
+        "SELECT id, author, text FROM quote WHERE id > ?", (last_id,))
+    if hash_size is not None:
+        _set_fts_hash_size(connection, hash_size)
+    connection.execute(
+        "INSERT INTO author (name, quote_count) "
+        "SELECT author, count(*) FROM quote WHERE id > ? "
+        "GROUP BY author COLLATE NOCASE "
+        "ON CONFLICT (name) DO UPDATE "
+        "SET quote_count = quote_count + excluded.quote_count", (last_id,))
+    connection.execute(
+        "UPDATE quote_stats SET version = version + 1, "
+        "quote_count = quote_count + ?, "
+        "modified_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = 1",
+        (inserted,))
+    return inserted, read - inserted
+
+
+def export_quotes(database: str, file: IO, format: str,
+                  progress: Optional[Progress] = None) -> int:
+    """
+    Write every quote to a file, in ID order.
+
+    The quotes are read in a single read transaction, so the file is a
+    consistent snapshot even while the application writes.
+
+    Args:
+        database (str): The path of the SQLite database file.
+        file (IO): The binary file to write to.
+        format (str): The format of the file, one of FORMATS.
+        progress (Optional[Progress]): The report to update as quotes are
+        written.
+
+    Returns:
+        int: The number of quotes written.
+    """
+    connection = sqlite3.connect(
+        f"file:{Path(database).resolve()}?mode=ro", uri=True,
+        isolation_level=None)
+    writer = None
+    if format == "csv":
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="",
+                                write_through=True)
+        writer = csv.writer(text)
+        writer.writerow(("id", "author", "text"))
+    exported = 0
+    try:
+        connection.execute("BEGIN")
+        cursor = connection.execute(
+            "SELECT id, author, text FROM quote ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            if not rows:
+                break
+            if writer is not None:
+                writer.writerows(rows)
+            else:
+                file.write(b"".join(
+                    dump_quote(id, author, text) + b"\n"
+                    for id, author, text in rows))
+            exported += len(rows)
+            if progress is not None:
+                progress.update(len(rows))
+        connection.execute("COMMIT")
+    finally:
+        connection.close()
+        if writer is not None:
+            # The caller owns the file, which must stay open.
+            text.detach()
+    return exported
@@ -0,0 +1,153 @@
+# write_queue.py
+#
+# Copyright (C) 2024 Felix GAIDON
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <https://www.gnu.org/licenses/>.
+
+"""
+This module implements group commit of new quotes for the 'daily_quote'
+project.
+
+SQLite commits one transaction at a time, and each commit waits for the
+disk. Under concurrent load, committing every quote on its own caps write
+throughput at the disk's sync rate. With group commit, requests hand their
+quote to a queue, and a single writer task inserts everything queued within
+a few milliseconds in one transaction. Each request still only returns once
+the transaction holding its quote is committed, with the ID of its quote.
+"""
+
+import asyncio
+from typing import List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .bulk import insert_quotes
+from .quote_model import QuoteRequest
+from .settings import settings
+
+
+class GroupCommitWriter:
+    """
+    Single writer inserting queued quotes in batches.
+
+    A batch is committed as soon as it holds 'max_batch' quotes, or
+    'max_delay' seconds after its first quote was queued.
+
+    Attributes:
+        max_batch (int): The maximum number of quotes per transaction.
+        max_delay (float): The maximum number of seconds a quote waits for
+        more quotes before its batch is committed.
+        batches (int): The number of transactions committed so far.
+    """
+
+    def __init__(self, max_batch: int = 128, max_delay: float = 0.005):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self._queue: Optional[asyncio.Queue] = None
+
+    @property
+    def running(self) -> bool:
+        """
+        bool: Whether the writer task is running and accepts quotes.
+        """
+        return self._queue is not None
+
+    async def submit(self, quote: QuoteRequest) -> int:
+        """
+        Queue a quote and wait until the transaction holding it commits.
+
+        Args:
+            quote (QuoteRequest): The quote to insert.
+
+        Returns:
+            int: The ID assigned to the quote.
+
+        Raises:
+            RuntimeError: If the writer is not running.
+            Exception: Any error raised while inserting the batch.
+        """
+        if self._queue is None:
+            raise RuntimeError("The group commit writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((quote, future))
+        return await future
+
+    async def run(self, engine: AsyncEngine):
+        """
+        Insert queued quotes until 'stop' is called.
+
+        This coroutine is meant to run as a background task for the lifetime
+        of the application.
+
+        Args:
+            engine (AsyncEngine): The read-write engine to insert quotes with.
+        """
+        queue = self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(engine, batch)
+
+    async def stop(self):
+        """
+        Commit the quotes already queued, then stop the writer.
+
+        Quotes submitted after this call are rejected.
+        """
+        if self._queue is not None:
+            queue, self._queue = self._queue, None
+            await queue.put(None)
+
+    async def _flush(self, engine: AsyncEngine,
+                     batch: List[Tuple[QuoteRequest, asyncio.Future]]):
+        try:
+            async with AsyncSession(engine) as session:
+                ids = await insert_quotes(
+                    session, [quote for quote, _ in batch])
+                await session.commit()
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self.batches += 1
+        for id, (_, future) in zip(ids, batch):
+            # The request may have been cancelled while waiting.
+            if not future.done():
+                future.set_result(id)
+
+
+# The writer used by the routes when group commit is enabled.
+quote_writer = GroupCommitWriter(
+    settings.group_commit_max_batch,
+    settings.group_commit_max_delay_ms / 1000)